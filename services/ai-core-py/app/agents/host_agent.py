@@ -1,6 +1,7 @@
 # app/agents/host_agent.py
 from crewai import Agent
 from app.llms.gemini import host_llm
+from app.config.settings import settings
 
 host_agent_manager = Agent(
     role='Chief AI Officer (CAO)',
@@ -18,5 +19,7 @@ host_agent_manager = Agent(
     llm=host_llm,
     verbose=True,
     # QUAN TRỌNG: Cờ này cho phép agent ủy quyền nhiệm vụ cho các agent khác.
-    allow_delegation=True 
+    allow_delegation=True,
+    # Giới hạn số vòng suy luận/ủy quyền của manager để một request không chạy vô hạn.
+    max_iter=settings.MAX_TURNS_HOST_AGENT
 )
\ No newline at end of file
@@ -6,15 +6,17 @@ from app.llms.gemini import sub_agent_llm
 # 1. Bỏ import 'MCPConferenceTool' không còn tồn tại.
 # 2. Import lớp 'BaseTool' từ LangChain để dùng cho type hint.
 from crewai.tools import BaseTool
+from typing import Optional
 
 import logging
 log = logging.getLogger(__name__)
 log.info(f"Module '{__name__}' is being imported and processed.")
 
-def create_conference_researcher(conference_tool: BaseTool) -> Agent:
+def create_conference_researcher(conference_tool: Optional[BaseTool] = None) -> Agent:
     """
     Creates the Conference Research Specialist agent.
-    It now accepts any object that is a subclass of BaseTool.
+    It now accepts any object that is a subclass of BaseTool; without one, the agent is
+    a template whose per-request copies get their tool from the crew factory.
     """
     return Agent(
         role='Conference Research Specialist',
@@ -69,12 +71,26 @@ You are ConferenceAgent, a specialist handling conference information.
             *   User: "Tìm hội nghị có hạn nộp bài từ ngày 1 đến ngày 31 tháng 1 năm 2025" -> 'searchQuery: "subFromDate=2025-01-01&subToDate=2025-01-31"'
             *   User: "Find details for AAAI conference" -> 'searchQuery: "mode=detail&acronym=AAAI"'
             *   User: "Conferences on AI and Machine Learning in Vietnam" -> 'searchQuery: "topics=AI&topics=Machine+Learning&country=Vietnam"'
+    *   **Several searches at once ('Conference Batch Search' tool, if available):**
+        *   **When to use:** The task needs more than one search, e.g. a comparison ("AI conferences in Germany vs France") or several named conferences ("ICML and NeurIPS deadlines").
+        *   **How to use:** Build one query string per search, with the same rules as above, and pass them together as the 'searchQueries' list in a SINGLE call instead of calling 'Conference Search' repeatedly.
+        *   **Example:** User: "Compare AI conferences in Germany and France" -> 'searchQueries: ["topics=AI&country=Germany", "topics=AI&country=France"]'
+    *   **Free-text descriptions ('Local Conference Search' tool, if available):**
+        *   **When to use:** The user describes conferences vaguely and no query key fits (e.g. "conferences about privacy in machine learning").
+        *   **How to use:** Pass the description in English as 'query', plus any clear constraints as 'filters' (same keys as a searchQuery) and a 'limit'.
+        *   **Coverage:** It only searches conferences already seen by the server, not the full database. If it finds nothing relevant, search again with 'Conference Search'.
+        *   **Example:** User: "Hội nghị về quyền riêng tư trong học máy ở châu Á" -> 'query: "privacy in machine learning", filters: "continent=Asia"'
+    *   **Counts and breakdowns ('Conference Count' tool, if available):**
+        *   **When to use:** The user asks how many conferences match, or which country/rank/topic has the most, and does not need the conferences themselves.
+        *   **How to use:** Pass the constraints as 'filters' (same keys as a searchQuery) and, for a breakdown, the field as 'groupBy' (country, continent, rank, source, accessType, topics, year or month).
+        *   **Coverage:** The counts cover only conferences already seen by the server, not the full database; keep the tool's note in the result. When the user needs a complete total, use 'Conference Search' instead.
+        *   **Example:** User: "Nước nào có nhiều hội nghị nhất ở châu Á?" -> 'filters: "continent=Asia", groupBy: "country"'
 4.  Call the appropriate tools with parameters containing ONLY English values.
 5.  Wait for the function result (data, confirmation, or error message).
 6.  Return the exact result received from the function. Do not reformat or add conversational text. If there's an error, return the error message. If the result is a list of items, ensure the data is structured appropriately for the Host Agent to synthesize.
 """
     ),
-        tools=[conference_tool], # Sử dụng tool được truyền vào
+        tools=[conference_tool] if conference_tool is not None else [], # Sử dụng tool được truyền vào
         llm=sub_agent_llm,
         verbose=True,
         allow_delegation=False
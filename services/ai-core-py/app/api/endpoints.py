@@ -1,18 +1,45 @@
+import asyncio
 import json
+import math
+import time
 import traceback  # <<< THÊM IMPORT NÀY
 from fastapi import APIRouter, Request # <<< Thêm Request để có thể log chi tiết hơn
+from typing import AsyncIterator, Optional
+import litellm
 from pydantic import BaseModel
-from starlette.responses import StreamingResponse
+from starlette.responses import JSONResponse, StreamingResponse
 import logging
 log = logging.getLogger(__name__)
 log.info(f"Module '{__name__}' is being imported and processed.")
 
 # Import hàm điều phối chính từ crew.py
-from app.crew import create_and_run_crew
+from app.crew import answer_query, conference_session_pool
+from app.llms.gemini import llm_response_cache
+from app.llms.semantic_cache import semantic_answer_cache
+from app.llms.router import model_router
+from app.llms.rate_limiter import RateLimitWaitTimeout, gemini_rate_limiter
+from app.streaming.coalescer import ChatCoalescer
+from app.runtime.admission import AdmissionRejected, AdmissionTicket, admission_controller
+from app.runtime.cancellation import ClientDisconnected
+from app.runtime.deadline import DEADLINE_HEADER, Deadline
+from app.runtime.cassette import RECORD, REPLAY, Cassette, bind_cassette
+from app.conversation.store import ConversationStore, ConversationTurn, bind_turn, conversation_store
+from app.observability.metrics import REGISTRY
+from app.observability.tracing import REQUEST_ID_HEADER, RequestTrace, bind_trace, new_request_id, record_span
+from app.routing.intent_router import classify_intent, answer_small_talk
+from app.config.settings import settings
 
 # Khởi tạo router
 router = APIRouter()
 
+# Gộp các câu hỏi giống hệt nhau đang chạy đồng thời vào một lượt chạy crew (tùy chọn).
+chat_coalescer = ChatCoalescer(
+    enabled=settings.CHAT_COALESCING_ENABLED,
+    window_seconds=settings.CHAT_COALESCING_WINDOW_SECONDS,
+)
+
+CHAT_REQUESTS = REGISTRY.counter("aicore_chat_requests", "Chat requests by how they ended.", ["outcome"])
+
 # --- Pydantic Model để xác thực dữ liệu đầu vào ---
 class ChatRequest(BaseModel):
     """
@@ -21,6 +48,90 @@ class ChatRequest(BaseModel):
     query: str
     user_id: str
     conversation_id: str
+    # Ngân sách thời gian còn lại của gateway (mili giây); có thể gửi qua header X-Request-Deadline-Ms.
+    deadline_ms: Optional[int] = None
+    # Chỉ dùng khi CASSETTE_MODE=replay: tên file cassette trong CASSETTE_DIR để phát lại.
+    cassette: Optional[str] = None
+
+def _open_cassette(chat_request: ChatRequest, trace: RequestTrace) -> Optional[Cassette]:
+    """Returns the cassette to record this request to, or to replay it from, per CASSETTE_MODE."""
+    if settings.CASSETTE_MODE == RECORD:
+        return Cassette.recording(trace.request_id, query=chat_request.query)
+    if settings.CASSETTE_MODE == REPLAY and chat_request.cassette:
+        return Cassette.for_replay(chat_request.cassette)
+    return None
+
+
+def _save_cassette(cassette: Optional[Cassette], answer: Optional[str]) -> None:
+    if cassette is None or cassette.replaying:
+        return
+    try:
+        cassette.save(answer=answer)
+    except OSError as e:
+        # Không để lỗi ghi file làm hỏng câu trả lời của người dùng.
+        log.warning(f"Could not save cassette {cassette.path}: {e}")
+
+
+def _open_turn(chat_request: ChatRequest) -> Optional[ConversationTurn]:
+    """Starts this request's conversation turn from the state the conversation's last request left."""
+    if conversation_store is None:
+        return None
+    previous = conversation_store.get(ConversationStore.key(chat_request.user_id, chat_request.conversation_id))
+    return ConversationTurn(previous, settings.CONVERSATION_MAX_RESULT_CHARS)
+
+
+def _save_turn(chat_request: ChatRequest, turn: Optional[ConversationTurn], answer: Optional[str]) -> None:
+    if conversation_store is None or turn is None or not answer:
+        return
+    state = turn.next_state(chat_request.query)
+    if state is not None:
+        conversation_store.put(ConversationStore.key(chat_request.user_id, chat_request.conversation_id), state)
+
+
+async def _answer_with_slot(
+    ticket: AdmissionTicket, inputs: dict, crew_events, cancel_token, deadline: Deadline, trace: RequestTrace,
+    cassette: Optional[Cassette] = None,
+    chat_request: Optional[ChatRequest] = None,
+    turn: Optional[ConversationTurn] = None,
+) -> str:
+    """Runs the query while holding a crew slot; the slot is freed when the run ends or is cancelled."""
+    answer = None
+    try:
+        # Lượt chạy là một task riêng (có thể được nhiều request dùng chung): trace của request khởi tạo nó.
+        with bind_trace(trace), bind_cassette(cassette), bind_turn(turn):
+            answer = await answer_query(inputs, event_stream=crew_events, cancel_token=cancel_token, deadline=deadline)
+            return answer
+    finally:
+        ticket.release()
+        _save_cassette(cassette, answer)
+        if chat_request is not None:
+            _save_turn(chat_request, turn, answer)
+
+
+async def _watch_disconnect(http_request: Request, client_gone: asyncio.Event) -> None:
+    """Polls the ASGI connection and sets `client_gone` once the SSE client has disconnected."""
+    while not await http_request.is_disconnected():
+        await asyncio.sleep(settings.SSE_DISCONNECT_POLL_SECONDS)
+    client_gone.set()
+
+
+def _busy_event(e: AdmissionRejected) -> dict:
+    return {'type': 'busy', 'message': e.reason, 'retry_after': e.retry_after_seconds}
+
+
+async def _traced_stream(stream: AsyncIterator[str], trace: RequestTrace, outcome: dict) -> AsyncIterator[str]:
+    """Records time to the first SSE event and total stream time, then logs the request's span summary."""
+    first_event = True
+    try:
+        async for chunk in stream:
+            if first_event:
+                record_span("sse_first_event", time.perf_counter() - trace.started, trace)
+                first_event = False
+            yield chunk
+    finally:
+        record_span("sse_total", time.perf_counter() - trace.started, trace)
+        CHAT_REQUESTS.labels(outcome["value"]).inc()
+        log.info(trace.summary())
 
 # --- API Endpoint chính ---
 @router.post("/chat/invoke")
@@ -36,29 +147,143 @@ async def invoke_chat(chat_request: ChatRequest, http_request: Request): # <<< T
     # Lấy thông tin client để log, giúp việc truy vết dễ dàng hơn
     client_host = http_request.client.host if http_request.client else "unknown"
 
+    # Request id gắn mọi span (LLM, MCP, SSE) của request này lại với nhau, kể cả phía MCP server.
+    trace = RequestTrace(new_request_id(chat_request.conversation_id))
+    trace_headers = {REQUEST_ID_HEADER: trace.request_id}
+
+    # Ghi lại / phát lại mọi lời gọi LLM và MCP của request (CASSETTE_MODE).
+    try:
+        cassette = _open_cassette(chat_request, trace)
+    except (OSError, ValueError) as e:
+        return JSONResponse(
+            status_code=400, content={"type": "error", "message": f"Cannot load cassette: {e}"}, headers=trace_headers
+        )
+
+    # Trạng thái hội thoại: tìm kiếm, trang và kết quả của lượt trước (cho "find 5 more", "which of them...").
+    turn = _open_turn(chat_request)
+    # Câu hỏi nối tiếp chỉ có nghĩa trong hội thoại của nó: chỉ gộp với request cùng hội thoại.
+    # (Request gộp vào lượt chạy của hội thoại khác không lưu trạng thái; câu sau của nó chạy đầy đủ.)
+    coalescing_scope = (
+        ConversationStore.key(chat_request.user_id, chat_request.conversation_id)
+        if turn is not None and turn.previous is not None else ""
+    )
+
+    # Hạn chót của request: mọi bước chờ phía sau (hàng đợi, LLM, MCP, API upstream) lấy timeout từ đây.
+    deadline = Deadline.for_request(chat_request.deadline_ms, http_request.headers.get(DEADLINE_HEADER))
+
+    # 0. Phân loại ý định trước: lời chào / trò chuyện xã giao không cần tới crew và MCP.
+    decision = classify_intent(chat_request.query)
+    log.info(
+        f"Intent decision for user '{chat_request.user_id}': intent={decision.intent}, "
+        f"confidence={decision.confidence:.2f}, fast_path={decision.use_fast_path}, reason={decision.reason}"
+    )
+
+    # Kiểm soát tải: nếu hàng đợi crew đã đầy thì trả 429 ngay, không mở stream SSE.
+    if not decision.use_fast_path and chat_coalescer.joinable(chat_request.query, coalescing_scope) is None:
+        try:
+            admission_controller.check(chat_request.user_id)
+        except AdmissionRejected as e:
+            print(f"Rejected request from {client_host} for user '{chat_request.user_id}': {e.reason}")
+            CHAT_REQUESTS.labels("rejected").inc()
+            return JSONResponse(
+                status_code=429,
+                content=_busy_event(e),
+                headers={"Retry-After": str(math.ceil(e.retry_after_seconds)), **trace_headers},
+            )
+
+    # Kết quả cuối của stream, được ghi vào counter khi stream kết thúc.
+    outcome = {"value": "abandoned"}
+
     async def event_stream():
         """
         An asynchronous generator that yields events for the SSE stream.
         This function orchestrates the crew execution and handles streaming responses.
         """
         print(f"Received request from {client_host} for user '{chat_request.user_id}'. Query: '{chat_request.query}'")
+
+        # Theo dõi kết nối: khi client rời đi, ngừng chờ hàng đợi / rời lượt chạy crew
+        # (lượt chạy bị hủy khi không còn client nào theo dõi nó).
+        client_gone = asyncio.Event()
+        disconnect_watcher = asyncio.create_task(_watch_disconnect(http_request, client_gone))
         
         try:
-            # 1. Gửi sự kiện trạng thái đầu tiên để client biết quá trình đã bắt đầu
-            yield f"data: {json.dumps({'type': 'status', 'step': 'crew_kickoff', 'message': 'Crew is starting the task...'})}\n\n"
-            
-            # 2. Gọi hàm điều phối chính, nơi toàn bộ logic AI diễn ra
-            # Hàm này quản lý vòng đời của MCP client và thực thi crew.
-            result = await create_and_run_crew(inputs)
-            
-            # 3. Trích xuất kết quả cuối cùng từ output của CrewAI
-            # `.raw` thường chứa chuỗi văn bản cuối cùng mà manager agent tổng hợp.
-            final_message = result.raw
-            
+            if decision.use_fast_path:
+                yield f"data: {json.dumps({'type': 'status', 'step': 'fast_path', 'message': 'Answering directly...'})}\n\n"
+                with bind_trace(trace), bind_cassette(cassette):
+                    final_message = await answer_small_talk(chat_request.query, decision)
+                _save_cassette(cassette, final_message)
+            else:
+                # 1. Xin một slot crew (trừ khi có thể nhập vào một lượt chạy giống hệt đang diễn ra).
+                #    Trong lúc chờ, client nhận vị trí của mình trong hàng đợi.
+                ticket = None
+                if chat_coalescer.joinable(chat_request.query, coalescing_scope) is None:
+                    ticket = admission_controller.enqueue(chat_request.user_id)
+                    try:
+                        async for position in ticket.wait_for_slot(
+                            min(settings.CREW_QUEUE_TIMEOUT_SECONDS, deadline.remaining()), stop=client_gone
+                        ):
+                            yield f"data: {json.dumps({'type': 'status', 'step': 'queued', 'position': position, 'message': f'Waiting for a free worker (position {position})...'})}\n\n"
+                        # Gửi sự kiện trạng thái để client biết quá trình đã bắt đầu
+                        yield f"data: {json.dumps({'type': 'status', 'step': 'crew_kickoff', 'message': 'Crew is starting the task...'})}\n\n"
+                    except BaseException:
+                        # Client rời đi khi chưa bắt đầu chạy: rời hàng đợi / trả slot.
+                        ticket.cancel()
+                        raise
+
+                # 2. Gọi hàm điều phối chính, nơi toàn bộ logic AI diễn ra, trong một task riêng.
+                # Trong lúc crew chạy, các sự kiện trung gian (ủy quyền, gọi tool, token câu trả lời)
+                # được đẩy qua hàng đợi có giới hạn từ thread executor và stream ngay cho client.
+                # `answer_query` thử bộ biên dịch truy vấn cục bộ trước, rồi mới tới crew đầy đủ.
+                crew_run, started = chat_coalescer.join_or_start(
+                    chat_request.query,
+                    lambda crew_events, cancel_token: _answer_with_slot(
+                        ticket, inputs, crew_events, cancel_token, deadline, trace, cassette, chat_request, turn
+                    ),
+                    queue_size=settings.SSE_EVENT_QUEUE_SIZE,
+                    scope=coalescing_scope,
+                )
+                if not started and ticket is not None:
+                    # Một lượt chạy giống hệt đã bắt đầu trong lúc chờ: trả lại slot vừa nhận.
+                    ticket.release()
+                if not started:
+                    yield f"data: {json.dumps({'type': 'status', 'step': 'coalesced', 'message': 'Joining an identical request already in progress...'})}\n\n"
+                async for event in crew_run.subscribe(stop=client_gone):
+                    yield f"data: {json.dumps(event)}\n\n"
+
+                # 3. Kết quả cuối cùng (chuỗi văn bản đã được tổng hợp)
+                final_message = await crew_run.result()
+
+            if final_message is None:
+                # Crew bị hủy hoặc dừng khi chưa có câu trả lời (kể cả câu trả lời một phần): báo lỗi, không gửi 'result' rỗng.
+                print(f"Crew stopped without an answer for user '{chat_request.user_id}'.")
+                outcome["value"] = "error"
+                yield f"data: {json.dumps({'type': 'error', 'message': 'The request stopped before an answer was ready. Please try again.'})}\n\n"
+                return
+
             # 4. Gửi sự kiện kết quả cuối cùng về cho client
             print(f"Crew finished successfully for user '{chat_request.user_id}'. Sending final result.")
+            outcome["value"] = "answered"
             yield f"data: {json.dumps({'type': 'result', 'message': final_message})}\n\n"
 
+        except ClientDisconnected:
+            # Không còn ai để gửi tới; tài nguyên đã được giải phóng ở các khối finally.
+            print(f"Client for user '{chat_request.user_id}' disconnected; request abandoned.")
+            outcome["value"] = "disconnected"
+
+        except AdmissionRejected as e:
+            # Hàng đợi đầy hoặc chờ quá lâu: báo 'busy' thay vì làm chậm mọi người.
+            print(f"Shedding request for user '{chat_request.user_id}': {e.reason}")
+            outcome["value"] = "busy"
+            yield f"data: {json.dumps(_busy_event(e))}\n\n"
+
+        except (RateLimitWaitTimeout, litellm.RateLimitError) as e:
+            # Hết quota Gemini (sau khi đã chờ / thử lại): báo 'busy' kèm thời gian nên thử lại.
+            print(f"Gemini rate limit hit for user '{chat_request.user_id}': {e}")
+            outcome["value"] = "rate_limited"
+            retry_after = getattr(e, "retry_after_seconds", settings.CREW_BUSY_RETRY_AFTER_SECONDS)
+            busy = AdmissionRejected("The AI model is rate limited right now; please retry shortly.", retry_after)
+            yield f"data: {json.dumps(_busy_event(busy))}\n\n"
+
         except Exception as e:
             # --- PHẦN GỠ LỖI QUAN TRỌNG NHẤT ---
             # 5. Nếu có bất kỳ lỗi nào xảy ra trong quá trình thực thi của crew:
@@ -72,10 +297,72 @@ async def invoke_chat(chat_request: ChatRequest, http_request: Request): # <<< T
             
             # Tạo một thông báo lỗi thân thiện để gửi về cho client
             error_message = f"An unexpected error occurred on the server: {e}"
+            outcome["value"] = "error"
             
             # Gửi sự kiện lỗi về cho client
             yield f"data: {json.dumps({'type': 'error', 'message': error_message})}\n\n"
 
+        finally:
+            disconnect_watcher.cancel()
+
     # Trả về một StreamingResponse, sử dụng generator `event_stream`
     # và đặt media type là "text/event-stream" để trình duyệt hiểu đây là SSE.
-    return StreamingResponse(event_stream(), media_type="text/event-stream")
\ No newline at end of file
+    return StreamingResponse(
+        _traced_stream(event_stream(), trace, outcome), media_type="text/event-stream", headers=trace_headers
+    )
+
+# --- Endpoint thống kê cache, dùng để định cỡ cache ---
+@router.get("/stats/cache")
+async def cache_stats():
+    """
+    Returns hit/miss/eviction counters of the conference API response cache, read from the
+    stats://cache resource of one pooled MCP server (each server process has its own cache).
+    """
+    async with conference_session_pool.lease() as session:
+        result = await session.read_resource("stats://cache")
+    return json.loads(result.contents[0].text)
+
+
+# --- Endpoint thống kê gộp request (tỉ lệ coalescing) ---
+@router.get("/stats/coalescing")
+async def coalescing_stats():
+    """Returns how many chat requests shared an in-flight crew run instead of starting one."""
+    return chat_coalescer.stats()
+
+
+# --- Endpoint thống kê trạng thái hội thoại (câu hỏi nối tiếp, phân trang) ---
+@router.get("/stats/conversations")
+async def conversation_stats():
+    """Returns size and hit/miss/expiry counters of the conversation state store."""
+    return conversation_store.stats() if conversation_store is not None else {"enabled": False}
+
+
+# --- Endpoint thống kê kiểm soát tải (slot crew đang chạy, hàng đợi) ---
+@router.get("/stats/admission")
+async def admission_stats():
+    """Returns active crew runs, queued requests and admission/rejection counters."""
+    return admission_controller.stats()
+
+
+# --- Endpoint thống kê cache LLM (khớp chính xác và ngữ nghĩa) ---
+@router.get("/stats/llm-cache")
+async def llm_cache_stats():
+    """Returns counters of the exact-match LLM response cache and the semantic answer cache."""
+    return {
+        "exact": llm_response_cache.stats() if llm_response_cache is not None else {"enabled": False},
+        "semantic": semantic_answer_cache.stats() if semantic_answer_cache is not None else {"enabled": False},
+    }
+
+
+# --- Endpoint thống kê phân tầng model (số lời gọi, độ trễ, token ước lượng theo tầng) ---
+@router.get("/stats/model-tiers")
+async def model_tier_stats():
+    """Returns per-tier call counts, latency and estimated token usage of the model router."""
+    return model_router.stats() if model_router is not None else {"enabled": False}
+
+
+# --- Endpoint thống kê giới hạn tốc độ Gemini (độ trễ chờ trong hàng, số lần 429) ---
+@router.get("/stats/gemini-rate-limit")
+async def gemini_rate_limit_stats():
+    """Returns queueing delay, in-flight calls and 429 counters of the shared Gemini rate limiter."""
+    return gemini_rate_limiter.stats() if gemini_rate_limiter is not None else {"enabled": False}
@@ -21,9 +21,147 @@ class Settings(BaseSettings):
     # Maximum turns for the host agent loop to prevent infinite loops
     MAX_TURNS_HOST_AGENT: int = 5
 
+    # --- Intent Router (fast path for greetings / small talk) ---
+    INTENT_ROUTER_ENABLED: bool = True
+    # Minimum classifier confidence for bypassing the crew
+    INTENT_ROUTER_CONFIDENCE_THRESHOLD: float = 0.85
+    # Answer plain greetings with a canned reply instead of an LLM call
+    INTENT_ROUTER_CANNED_GREETINGS: bool = True
+
+    # --- Query Compiler (searchQuery without the worker LLM) ---
+    QUERY_COMPILER_ENABLED: bool = True
+    # Share of meaningful words the compiler must explain before bypassing the worker agent
+    QUERY_COMPILER_MIN_CONFIDENCE: float = 1.0
+
+    # --- Batch Conference Search ---
+    # Give the worker agent a tool that runs several searchQueries concurrently in one call
+    CONFERENCE_BATCH_TOOL_ENABLED: bool = True
+
+    # --- Local Conference Search ---
+    # Give the worker agent a free-text search over the MCP server's local index (no upstream call)
+    CONFERENCE_LOCAL_SEARCH_TOOL_ENABLED: bool = True
+    # Give the worker agent a count / group-by tool over the same local index
+    CONFERENCE_COUNT_TOOL_ENABLED: bool = True
+
+    # --- SSE Streaming ---
+    # Stream the manager's final-answer tokens to the client as they are generated
+    STREAM_MANAGER_TOKENS: bool = True
+    # Bounded queue between the crew thread and the SSE generator
+    SSE_EVENT_QUEUE_SIZE: int = 256
+    # How often an open SSE stream checks whether its client is still connected
+    SSE_DISCONNECT_POLL_SECONDS: float = 1.0
+
+    # --- Crew Admission Control ---
+    # Crew runs executing at once (also the size of the dedicated crew thread pool)
+    CREW_MAX_CONCURRENT_RUNS: int = 4
+    # Requests allowed to wait for a free crew worker; beyond this they get 429 / 'busy'
+    CREW_MAX_QUEUED_REQUESTS: int = 32
+    # Per-user share of the wait queue; waiting users are served round-robin
+    CREW_MAX_QUEUED_PER_USER: int = 3
+    CREW_QUEUE_TIMEOUT_SECONDS: float = 60.0
+    # Retry-After hint sent with rejected requests
+    CREW_BUSY_RETRY_AFTER_SECONDS: float = 5.0
+    # After a cancellation, how long to wait for the crew thread to stop before discarding its MCP session
+    CREW_CANCEL_GRACE_SECONDS: float = 5.0
+
+    # --- Request Deadlines ---
+    # Time budget per chat request when the gateway sends none (body 'deadline_ms' or X-Request-Deadline-Ms)
+    REQUEST_DEFAULT_DEADLINE_SECONDS: float = 90.0
+    REQUEST_MAX_DEADLINE_SECONDS: float = 300.0
+    # Time kept back for the partial answer: no new crew LLM step starts inside it
+    DEADLINE_RESERVE_SECONDS: float = 8.0
+    # Max characters of gathered tool output given to the partial-answer LLM call
+    PARTIAL_ANSWER_MAX_CHARS: int = 6000
+
+    # --- Chat Request Coalescing ---
+    # Identical queries (ignoring case/punctuation) arriving within the window share one crew run
+    CHAT_COALESCING_ENABLED: bool = False
+    CHAT_COALESCING_WINDOW_SECONDS: float = 5.0
+
     # --- Database/Service URLs (nếu có) ---
     CONFERENCE_API_URL: str = "https://confhub.ddns.net/database/api/v1/conference"
 
+    # --- Conference API HTTP Client ---
+    CONFERENCE_API_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    CONFERENCE_API_READ_TIMEOUT_SECONDS: float = 20.0
+    # Retries after the first attempt, for transport errors, 429 and 5xx responses
+    CONFERENCE_API_MAX_RETRIES: int = 2
+    CONFERENCE_API_BACKOFF_BASE_SECONDS: float = 0.25
+    CONFERENCE_API_BACKOFF_MAX_SECONDS: float = 4.0
+    CONFERENCE_API_MAX_CONNECTIONS: int = 20
+
+    # --- Model Tiering ---
+    # Route each crew LLM call to a tier by step type, prompt length and request complexity;
+    # when enabled the tier models replace HOST_AGENT_MODEL_NAME / SUB_AGENT_MODEL_NAME
+    MODEL_TIERING_ENABLED: bool = True
+    MODEL_TIER_LIGHT: str = "gemini-2.0-flash-lite"
+    MODEL_TIER_STANDARD: str = "gemini-2.0-flash"
+    MODEL_TIER_STRONG: str = "gemini-2.5-flash"
+    # Prompts longer than this (estimated tokens) start one tier higher
+    MODEL_TIER_LONG_PROMPT_TOKENS: int = 8000
+    # Requests scoring at least this (0-1) start one tier higher
+    MODEL_TIER_COMPLEXITY_THRESHOLD: float = 0.6
+
+    # --- Gemini Rate Limiting ---
+    # Shared client-side limits for all Gemini calls of this process (match the project's quota)
+    GEMINI_RATE_LIMIT_ENABLED: bool = True
+    GEMINI_REQUESTS_PER_MINUTE: int = 60
+    GEMINI_TOKENS_PER_MINUTE: int = 1_000_000
+    GEMINI_MAX_CONCURRENT_CALLS: int = 8
+    # Completion tokens reserved per call before the real size is known
+    GEMINI_COMPLETION_TOKENS_ESTIMATE: int = 1000
+    # Longest a call waits for capacity (also bounded by the request deadline)
+    GEMINI_RATE_LIMIT_MAX_WAIT_SECONDS: float = 30.0
+    # Retries after a 429; every 429 pauses all calls with exponential, jittered backoff
+    GEMINI_RATE_LIMIT_MAX_RETRIES: int = 3
+    GEMINI_RATE_LIMIT_BACKOFF_BASE_SECONDS: float = 2.0
+    GEMINI_RATE_LIMIT_BACKOFF_MAX_SECONDS: float = 30.0
+
+    # --- LLM Response Cache ---
+    # Exact-match cache of completions keyed by model, temperature and message hash
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_MAX_MEMORY_BYTES: int = 16 * 1024 * 1024
+    # Optional SQLite file so cached completions survive restarts
+    LLM_CACHE_DB_PATH: str | None = None
+    LLM_CACHE_MAX_DISK_BYTES: int = 256 * 1024 * 1024
+    # Reuse a previous final answer for a near-identical query (needs sentence-transformers)
+    LLM_SEMANTIC_CACHE_ENABLED: bool = False
+    LLM_SEMANTIC_CACHE_MODEL: str = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+    # Minimum cosine similarity between the new and the cached query
+    LLM_SEMANTIC_CACHE_THRESHOLD: float = 0.95
+    # Answers are reused only while the conference data behind them is fresh
+    LLM_SEMANTIC_CACHE_TTL_SECONDS: float = 300.0
+    LLM_SEMANTIC_CACHE_MAX_ENTRIES: int = 1000
+
+    # --- MCP Session Pool Configuration ---
+    # Number of warm MCP server subprocesses kept alive for crew runs
+    MCP_POOL_SIZE: int = 2
+    # How long a request waits for a free session before failing
+    MCP_POOL_ACQUIRE_TIMEOUT_SECONDS: float = 30.0
+    # Idle sessions are pinged at this interval; dead servers are respawned
+    MCP_POOL_HEALTH_CHECK_INTERVAL_SECONDS: float = 30.0
+    MCP_POOL_PING_TIMEOUT_SECONDS: float = 5.0
+
+    # --- Conversation State (follow-ups and pagination) ---
+    # Last searchQuery, page and results per conversation, so "find 5 more" fetches the next page directly
+    CONVERSATION_STORE_ENABLED: bool = True
+    CONVERSATION_STORE_MAX_ENTRIES: int = 10000
+    # Conversations idle for longer than this start over
+    CONVERSATION_STORE_TTL_SECONDS: float = 1800.0
+    # Optional SQLite file so conversations survive restarts
+    CONVERSATION_STORE_DB_PATH: str | None = None
+    # Tool output kept per conversation for answering questions about earlier results
+    CONVERSATION_MAX_RESULT_CHARS: int = 20000
+
+    # --- Record/Replay Cassettes ---
+    # off | record (save every LLM and MCP tool call of each chat request) | replay (answer them from a cassette)
+    CASSETTE_MODE: str = "off"
+    # Where cassettes are written, and the only place replay requests may load them from
+    CASSETTE_DIR: str = "cassettes"
+    # original: sleep for the recorded latency of each call | zero: return immediately
+    CASSETTE_REPLAY_LATENCY: str = "original"
+    # Fail a replayed call with no exact match instead of using the next recorded call in order
+    CASSETTE_REPLAY_STRICT: bool = False
 
 
     # --- LangSmith Configuration ---
@@ -0,0 +1,93 @@
+# services/ai-core-py/app/conversation/follow_up.py
+import re
+from dataclasses import dataclass
+from typing import List, Optional
+
+from app.conversation.store import ConversationState, split_paging, with_paging
+from app.query_compiler.compiler import compile_query
+from app.query_compiler.gazetteer import DETAIL_WORDS, FOLLOW_UP_WORDS, RESULT_REFERENCE_WORDS
+from app.routing.intent_router import normalize_query
+
+import logging
+log = logging.getLogger(__name__)
+log.info(f"Module '{__name__}' is being imported and processed.")
+
+NEXT_PAGE = "next_page"
+FROM_RESULTS = "from_results"
+NO_MORE_RESULTS = "no_more_results"
+
+_NEXT_PAGE_WORDS = [word for word in FOLLOW_UP_WORDS if word not in RESULT_REFERENCE_WORDS]
+
+
+def _alternation(phrases: List[str]) -> str:
+    return r"\b(?:" + "|".join(re.escape(p) for p in sorted(phrases, key=len, reverse=True)) + r")\b"
+
+
+_NEXT_PAGE = re.compile(_alternation(_NEXT_PAGE_WORDS))
+_REFERENCE = re.compile(_alternation(RESULT_REFERENCE_WORDS))
+_EXPLICIT_PAGE = re.compile(r"\b(?:page|trang|pagina|seite)\s+(\d{1,3})\b")
+_COUNT = re.compile(r"\b(\d{1,3})\b")
+_DETAIL = re.compile(_alternation(DETAIL_WORDS))
+_ACRONYM_FIELD = re.compile(r'"acronym"\s*:\s*"([^"]+)"')
+# "thêm" (thêm nữa) mất dấu thành "them", trùng với từ tham chiếu tiếng Anh: xét trên câu gốc.
+_VI_MORE = re.compile(r"(?<!\w)thêm(?!\w)")
+# Từ còn lại không làm thay đổi một yêu cầu trang kế tiếp ("5 more results").
+_PAGING_NOUNS = {"result", "results", "ones", "one", "items", "page", "ket", "qua", "cai", "trang"}
+
+
+@dataclass
+class FollowUp:
+    kind: str
+    reason: str
+    # Chỉ có với NEXT_PAGE: searchQuery của trang cần lấy.
+    search_query: str = ""
+
+
+def resolve_follow_up(query: str, state: ConversationState) -> Optional[FollowUp]:
+    """
+    Decides whether `query` continues the conversation's last search without new filters:
+    another page of it (fetched directly, no agent), or a question about results already
+    fetched (answered from them). Anything else returns None and runs the full pipeline.
+    """
+    normalized = normalize_query(query)
+    # Bỏ các từ nối tiếp rồi biên dịch phần còn lại: nếu vẫn còn bộ lọc thì đây là một tìm kiếm mới.
+    stripped = _REFERENCE.sub(" ", _NEXT_PAGE.sub(" ", normalized))
+    compiled = compile_query(stripped)
+    new_filters = [(key, value) for key, value in compiled.params if key not in ("mode", "perPage", "page")]
+
+    # 1. Hỏi về một hội nghị đã có trong kết quả ("tell me more about NeurIPS").
+    folded = query.casefold()
+    shown_acronyms = {a for _, output in state.results for a in _ACRONYM_FIELD.findall(output)}
+    mentioned = sorted(a for a in shown_acronyms if re.search(rf"(?<!\w){re.escape(a.casefold())}(?!\w)", folded))
+    if mentioned and not new_filters:
+        if _DETAIL.search(normalized) and "mode=detail" not in state.search_query:
+            # Kết quả đã lấy chỉ có bản tóm tắt: cần tra cứu lại ở chế độ chi tiết.
+            return None
+        return FollowUp(FROM_RESULTS, f"mentions {mentioned} from earlier results")
+
+    # 2. Câu hỏi về các kết quả vừa hiển thị ("which of them are online?"), kể cả khi có điều kiện lọc.
+    asks_next_page = bool(_NEXT_PAGE.search(normalized) or _VI_MORE.search(folded))
+    if state.results and not asks_next_page and _REFERENCE.search(normalized):
+        return FollowUp(FROM_RESULTS, "refers to earlier results")
+    if new_filters:
+        return None
+
+    # 3. Trang kế tiếp của cùng tìm kiếm ("find 5 more", "trang 3").
+    explicit_page = _EXPLICIT_PAGE.search(normalized)
+    if not (asks_next_page or explicit_page):
+        return None
+    # "tell me more about X": X không phải bộ lọc cũng không có trong kết quả, nên đây không phải phân trang.
+    if any(not word.isdigit() and word not in _PAGING_NOUNS for word in compiled.unexplained):
+        return None
+    filters, page, per_page = split_paging(state.search_query)
+    if explicit_page:
+        return FollowUp(NEXT_PAGE, "explicit page", with_paging(filters, int(explicit_page.group(1)), per_page))
+    if state.exhausted:
+        return FollowUp(NO_MORE_RESULTS, "the last page had fewer results than perPage")
+    count = _COUNT.search(normalized)
+    wanted = int(count.group(1)) if count else per_page
+    shown = page * per_page
+    if wanted < 1 or shown % wanted:
+        # Không biểu diễn được "thêm N" bằng một trang: để agent tự xử lý.
+        return None
+    return FollowUp(NEXT_PAGE, f"{wanted} more after {shown}", with_paging(filters, shown // wanted + 1, wanted))
@@ -0,0 +1,306 @@
+# services/ai-core-py/app/conversation/store.py
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from app.config.settings import settings
+
+import logging
+log = logging.getLogger(__name__)
+log.info(f"Module '{__name__}' is being imported and processed.")
+
+# Mặc định của API khi searchQuery không ghi rõ phân trang (cũng là mặc định trong prompt của worker).
+DEFAULT_PER_PAGE = 5
+PAGING_KEYS = ("page", "perPage")
+NO_RESULTS_PREFIX = "No conferences found"
+# "N+ more": MCP dừng đọc trang giữa chừng, chỉ biết cận dưới của số bản ghi.
+_OMITTED_NOTE = re.compile(r"^\((\d+)(\+?) more conference\(s\) omitted", re.MULTILINE)
+# Header của từng phần trong kết quả của tool batch: "## Search 2: <searchQuery> (5 conference(s))".
+# Phần bị lỗi không có số lượng.
+_BATCH_HEADER = re.compile(r"^## Search \d+: (.*?)(?: \((\d+)(\+?) conference\(s\)\))?$", re.MULTILINE)
+# Ghi chú MCP thêm vào cuối kết quả (vd. khi trả dữ liệu cache cũ lúc API gặp sự cố).
+_TRAILING_NOTE = re.compile(r"^\(Note: .*\)$", re.MULTILINE)
+
+
+def split_paging(search_query: str) -> Tuple[str, int, int]:
+    """Splits a searchQuery into its filters (without paging), page and perPage."""
+    params = parse_qsl(search_query, keep_blank_values=False)
+    values = dict(params)
+
+    def as_int(key: str, default: int) -> int:
+        try:
+            return max(1, int(values.get(key, default)))
+        except ValueError:
+            return default
+
+    filters = urlencode([(k, v) for k, v in params if k not in PAGING_KEYS])
+    return filters, as_int("page", 1), as_int("perPage", DEFAULT_PER_PAGE)
+
+
+def with_paging(filters: str, page: int, per_page: int) -> str:
+    return "&".join(part for part in (filters, urlencode([("perPage", per_page), ("page", page)])) if part)
+
+
+def split_batch_output(output: str) -> List[Tuple[str, str]]:
+    """
+    Splits a get_conferences_batch output into (searchQuery, section) pairs, one per successful
+    search. Each section keeps its header, whose count includes conferences listed in an
+    earlier section.
+    """
+    headers = list(_BATCH_HEADER.finditer(output))
+    sections = []
+    for header, following in zip(headers, headers[1:] + [None]):
+        if header.group(2) is None:
+            continue
+        section = output[header.start():following.start() if following else len(output)].strip()
+        sections.append((header.group(1), section))
+    return sections
+
+
+def count_records(output: str) -> Optional[int]:
+    """Number of conferences in a get_conferences output (JSON, table or one batch section), or None if it cannot tell."""
+    header = _BATCH_HEADER.match(output)
+    if header is not None:
+        return int(header.group(2)) if header.group(2) is not None and not header.group(3) else None
+    text = _TRAILING_NOTE.sub("", output).strip()
+    if text.startswith(NO_RESULTS_PREFIX):
+        return 0
+    omitted = _OMITTED_NOTE.search(text)
+    if omitted and omitted.group(2):
+        return None
+    body = text[:omitted.start()].strip() if omitted else text
+    extra = int(omitted.group(1)) if omitted else 0
+    if body.startswith("["):
+        try:
+            records = json.loads(body)
+        except ValueError:
+            return None
+        return len(records) + extra if isinstance(records, list) else None
+    if body.startswith("{"):
+        return 1 + extra
+    lines = [line for line in body.splitlines() if line.strip()]
+    # Định dạng bảng: dòng đầu là header.
+    return max(0, len(lines) - 1) + extra if " | " in (lines[0] if lines else "") else None
+
+
+@dataclass
+class ConversationState:
+    """What a conversation last searched for, which page it reached and the results it has seen."""
+    search_query: str
+    page: int = 1
+    per_page: int = DEFAULT_PER_PAGE
+    # Trang vừa lấy ít hơn perPage bản ghi: không còn trang nào sau nó.
+    exhausted: bool = False
+    # Các cặp (searchQuery, output của tool) đã lấy cho bộ lọc hiện tại, cũ nhất trước.
+    results: List[Tuple[str, str]] = field(default_factory=list)
+    last_query: str = ""
+    updated_at: float = field(default_factory=time.time)
+
+    @property
+    def filters(self) -> str:
+        return split_paging(self.search_query)[0]
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, text: str) -> "ConversationState":
+        data = json.loads(text)
+        data["results"] = [tuple(item) for item in data.get("results", [])]
+        return cls(**data)
+
+
+class ConversationTurn:
+    """
+    Collects the conference searches of one chat request, to update the conversation's state.
+    `previous` is the state before this request (None for a new conversation).
+    """
+
+    def __init__(self, previous: Optional[ConversationState] = None, max_result_chars: int = 20000):
+        self.previous = previous
+        self.max_result_chars = max_result_chars
+        self._searches: List[Tuple[str, str]] = []
+        self._lock = threading.Lock()
+
+    def record_search(self, search_query: str, output: str) -> None:
+        # Lỗi của tool không phải là kết quả: không đưa vào trạng thái hội thoại.
+        if output.startswith("Error"):
+            return
+        with self._lock:
+            self._searches.append((search_query, output))
+
+    def next_state(self, query: str) -> Optional[ConversationState]:
+        """State after this request: the last search made, plus earlier pages of the same filters."""
+        with self._lock:
+            searches = list(self._searches)
+        if not searches:
+            # Không tra cứu gì (vd. trả lời từ kết quả cũ): giữ nguyên trạng thái trước.
+            return self.previous
+
+        search_query, output = searches[-1]
+        filters, page, per_page = split_paging(search_query)
+        previous = self.previous
+        results = list(previous.results) if previous is not None and previous.filters == filters else []
+        results.extend(s for s in searches if split_paging(s[0])[0] == filters)
+
+        # Giữ các kết quả mới nhất trong giới hạn ký tự.
+        kept, used = [], 0
+        for item in reversed(results):
+            used += len(item[1])
+            if used > self.max_result_chars and kept:
+                break
+            kept.append(item)
+        kept.reverse()
+
+        count = count_records(output)
+        return ConversationState(
+            search_query=search_query,
+            page=page,
+            per_page=per_page,
+            exhausted=count is not None and count < per_page,
+            results=kept,
+            last_query=query,
+        )
+
+
+class ConversationStore:
+    """
+    Conversation states keyed by user and conversation id, expiring `ttl_seconds` after their last update.
+
+    An in-memory LRU of at most `max_entries` conversations sits in front of an
+    optional SQLite file, so follow-ups still work after a restart or when the
+    memory entry was evicted.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, ConversationState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {"hits": 0, "disk_hits": 0, "misses": 0, "expired": 0, "writes": 0, "evictions": 0}
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._open_db(db_path)
+
+    @staticmethod
+    def key(user_id: str, conversation_id: str) -> str:
+        # Gồm cả user_id: một conversation_id đoán được không cho phép đọc kết quả của người khác.
+        return f"{user_id}\x1f{conversation_id}"
+
+    # --- Public API ---
+    def get(self, key: str) -> Optional[ConversationState]:
+        with self._lock:
+            state = self._entries.get(key)
+            source = "hits"
+            if state is None and self._db is not None:
+                state = self._load_from_db(key)
+                source = "disk_hits"
+            if state is None:
+                self._counters["misses"] += 1
+                return None
+            if time.time() - state.updated_at > self.ttl_seconds:
+                self._entries.pop(key, None)
+                self._delete_from_db(key)
+                self._counters["expired"] += 1
+                return None
+            self._insert(key, state)
+            self._counters[source] += 1
+            return state
+
+    def put(self, key: str, state: ConversationState) -> None:
+        state.updated_at = time.time()
+        with self._lock:
+            self._insert(key, state)
+            self._counters["writes"] += 1
+            if self._db is not None:
+                self._save_to_db(key, state)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counters)
+            stats["size"] = len(self._entries)
+            stats["max_entries"] = self.max_entries
+        lookups = stats["hits"] + stats["disk_hits"] + stats["misses"] + stats["expired"]
+        stats["hit_ratio"] = round((stats["hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+    # --- In-memory LRU (caller holds the lock) ---
+    def _insert(self, key: str, state: ConversationState) -> None:
+        self._entries[key] = state
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    # --- On-disk backing store (caller holds the lock) ---
+    def _open_db(self, db_path: str) -> None:
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS conversations (key TEXT PRIMARY KEY, state TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS conversations_updated_at ON conversations (updated_at)")
+        self._db.commit()
+        log.info(f"Conversation store backed by SQLite at {db_path}.")
+
+    def _load_from_db(self, key: str) -> Optional[ConversationState]:
+        row = self._db.execute("SELECT state FROM conversations WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        try:
+            return ConversationState.from_json(row[0])
+        except (ValueError, TypeError) as e:
+            log.warning(f"Discarding unreadable conversation state: {e}")
+            return None
+
+    def _save_to_db(self, key: str, state: ConversationState) -> None:
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO conversations (key, state, updated_at) VALUES (?, ?, ?)",
+                (key, state.to_json(), state.updated_at),
+            )
+            # Dọn các hội thoại đã hết hạn cùng lúc với lần ghi.
+            self._db.execute("DELETE FROM conversations WHERE updated_at < ?", (time.time() - self.ttl_seconds,))
+            self._db.commit()
+        except sqlite3.Error as e:
+            log.warning(f"Failed to persist conversation state: {e}")
+
+    def _delete_from_db(self, key: str) -> None:
+        if self._db is None:
+            return
+        try:
+            self._db.execute("DELETE FROM conversations WHERE key = ?", (key,))
+            self._db.commit()
+        except sqlite3.Error as e:
+            log.warning(f"Failed to delete conversation state: {e}")
+
+
+conversation_store = ConversationStore(
+    max_entries=settings.CONVERSATION_STORE_MAX_ENTRIES,
+    ttl_seconds=settings.CONVERSATION_STORE_TTL_SECONDS,
+    db_path=settings.CONVERSATION_STORE_DB_PATH,
+) if settings.CONVERSATION_STORE_ENABLED else None
+
+
+# --- Liên kết lượt hội thoại với request (giống cassette: ContextVar, truyền tường minh vào tool) ---
+_current_turn: ContextVar[Optional[ConversationTurn]] = ContextVar("conversation_turn", default=None)
+
+
+def current_turn() -> Optional[ConversationTurn]:
+    return _current_turn.get()
+
+
+@contextmanager
+def bind_turn(turn: Optional[ConversationTurn]) -> Iterator[None]:
+    token = _current_turn.set(turn)
+    try:
+        yield
+    finally:
+        _current_turn.reset(token)
@@ -1,16 +1,31 @@
 import asyncio
 import sys
 import os
-from crewai import Crew, Process
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
+import time
+from typing import Optional
+from crewai import Crew
+from mcp import StdioServerParameters
 
+from app.config.settings import settings
 from app.llms.gemini import host_llm
-# 1. Import cả manager và hàm tạo worker
-from app.agents.host_agent import host_agent_manager
-from app.agents.mcp_sub_agents import create_conference_researcher
-from app.tasks.research_tasks import conference_research_task
-from app.tools.mcp_conference_tool import create_mcp_conference_tool
+from app.llms.semantic_cache import semantic_answer_cache
+# 1. Crew của mỗi request là bản sao từ template dựng sẵn (manager, worker, task)
+from app.crew_factory import conference_crew_factory
+from app.tasks.research_tasks import direct_answer_prompt, follow_up_answer_prompt, partial_answer_prompt
+from app.tools.mcp_conference_tool import (
+    create_mcp_conference_batch_tool, create_mcp_conference_tool, create_mcp_count_tool, create_mcp_local_search_tool,
+    call_conference_tool,
+)
+from app.query_compiler.compiler import compile_query
+from app.mcp_client.session_pool import MCPSessionPool
+from app.streaming.crew_events import CrewEventStream, bind_event_stream, stream_tokens_from
+from app.runtime.admission import crew_executor
+from app.runtime.cancellation import CancellationToken, CrewCancelled, bind_cancellation
+from app.runtime.deadline import Deadline, bind_deadline
+from app.observability.tracing import RequestTrace, bind_trace, current_trace, record_span, span
+from app.runtime.cassette import Cassette, bind_cassette, current_cassette
+from app.conversation.store import ConversationState, current_turn
+from app.conversation.follow_up import FROM_RESULTS, NEXT_PAGE, FollowUp, resolve_follow_up
 import logging
 log = logging.getLogger(__name__)
 log.info(f"Module '{__name__}' is being imported and processed.")
@@ -52,46 +67,357 @@ conference_server_params = StdioServerParameters(
     env={
         **os.environ, # Kế thừa tất cả các biến môi trường hiện tại
         "PYTHONPATH": os.getcwd() + os.pathsep + os.environ.get("PYTHONPATH", ""),
+        # Tiến trình con phải nói chuyện qua stdio, không mở HTTP server riêng.
+        "MCP_TRANSPORT": "stdio",
     }
 )
 
+# 6. Pool các MCP session "ấm", được khởi động/đóng bởi lifespan của FastAPI (xem main.py).
+#    Mỗi lần chạy crew chỉ mượn một session thay vì spawn một tiến trình MCP mới.
+conference_session_pool = MCPSessionPool(
+    server_params=conference_server_params,
+    size=settings.MCP_POOL_SIZE,
+    acquire_timeout_seconds=settings.MCP_POOL_ACQUIRE_TIMEOUT_SECONDS,
+    health_check_interval_seconds=settings.MCP_POOL_HEALTH_CHECK_INTERVAL_SECONDS,
+    ping_timeout_seconds=settings.MCP_POOL_PING_TIMEOUT_SECONDS,
+)
+
 # --- KẾT THÚC PHẦN CẢI TIẾN ---
 
+# Token câu trả lời cuối của manager được chuyển tiếp tới client qua SSE.
+stream_tokens_from(host_llm)
+
+
+def _kickoff_with_event_stream(
+    research_crew: Crew,
+    inputs: dict,
+    event_stream: Optional[CrewEventStream],
+    cancel_token: Optional[CancellationToken] = None,
+    deadline: Optional[Deadline] = None,
+    trace: Optional[RequestTrace] = None,
+    cassette: Optional[Cassette] = None,
+):
+    """Runs `kickoff` in the executor thread with the request's event stream, cancellation token, deadline, trace and cassette bound to that thread."""
+    with bind_event_stream(event_stream), bind_cancellation(cancel_token), bind_deadline(deadline), bind_trace(trace), bind_cassette(cassette):
+        try:
+            with span("crew_kickoff"):
+                return research_crew.kickoff(inputs)
+        except CrewCancelled as e:
+            print(f"Crew kickoff stopped early: {e}")
+            return None
 
-async def create_and_run_crew(inputs: dict):
+
+async def create_and_run_crew(
+    inputs: dict,
+    event_stream: Optional[CrewEventStream] = None,
+    cancel_token: Optional[CancellationToken] = None,
+    deadline: Optional[Deadline] = None,
+):
     """
-    Manages the entire lifecycle: connects to MCP, creates the wrapper tool,
-    initializes and runs the crew, and cleans up the connection.
+    Leases a warm MCP session from the pool, creates the wrapper tool,
+    initializes and runs the crew, and returns the session to the pool.
+    Progress events (delegations, tool calls, answer tokens) go to `event_stream` if given.
+    If the awaiting task is cancelled, `cancel_token` stops the crew at its next LLM/tool step.
+    With a `deadline`, LLM and MCP calls time out at the remaining budget and the crew
+    stops (with a None result) once only the reserve for a partial answer is left.
+    Returns (result, used_tools): `used_tools` is True if the worker got any tool result.
     """
-    print(f"Attempting to start MCP server with command: {' '.join(CONFERENCE_MCP_COMMAND)}")
-    
-    async with stdio_client(conference_server_params) as (read, write):
-        print("MCP stdio_client context entered.")
-        async with ClientSession(read, write) as session:
-            print("MCP ClientSession context entered. Initializing session...")
-            await session.initialize()
-            print("MCP Session initialized successfully.")
-
-            main_loop = asyncio.get_running_loop()
-            mcp_conference_tool = create_mcp_conference_tool(session=session, loop=main_loop)
-            conference_researcher_agent = create_conference_researcher(mcp_conference_tool)
-            
-            # --- THAY ĐỔI QUAN TRỌNG ---
-            # 2. Cấu hình Crew một cách tường minh
-            research_crew = Crew(
-                agents=[conference_researcher_agent], # Danh sách các worker
-                tasks=[conference_research_task],
-                process=Process.hierarchical,
-                # 3. Chỉ định rõ ai là manager
-                manager_agent=host_agent_manager,
-                # Bỏ `manager_llm` vì manager đã có llm của riêng nó
-                verbose=True
-            )
+    cancel_token = cancel_token or CancellationToken()
+    # Thread của executor không kế thừa context của request: truyền trace, cassette và lượt hội thoại tường minh.
+    trace = current_trace()
+    cassette = current_cassette()
+    turn = current_turn()
+    leasing = time.perf_counter()
+    async with conference_session_pool.lease() as session:
+        record_span("mcp_lease", time.perf_counter() - leasing)
+        print("MCP session leased from pool.")
 
-            # loop.run_in_executor vẫn là cách đúng để chạy kickoff
-            result = await main_loop.run_in_executor(
-                None,
-                research_crew.kickoff,
-                inputs
+        main_loop = asyncio.get_running_loop()
+        with span("crew_build"):
+            mcp_conference_tool = create_mcp_conference_tool(
+                session=session, loop=main_loop, cancel_token=cancel_token, deadline=deadline, trace=trace,
+                cassette=cassette, turn=turn
+            )
+            # Câu hỏi so sánh ("AI in Germany vs France"): nhiều searchQuery trong một bước của agent.
+            mcp_conference_batch_tool = create_mcp_conference_batch_tool(
+                session=session, loop=main_loop, cancel_token=cancel_token, deadline=deadline, trace=trace,
+                cassette=cassette, turn=turn
+            ) if settings.CONFERENCE_BATCH_TOOL_ENABLED else None
+            # Mô tả mơ hồ ("hội nghị về quyền riêng tư trong ML"): tìm trong chỉ mục cục bộ của MCP server.
+            mcp_local_search_tool = create_mcp_local_search_tool(
+                session=session, loop=main_loop, cancel_token=cancel_token, deadline=deadline, trace=trace,
+                cassette=cassette
+            ) if settings.CONFERENCE_LOCAL_SEARCH_TOOL_ENABLED else None
+            # "Có bao nhiêu hội nghị ở châu Á?": chỉ cần số lượng, không cần bản ghi.
+            mcp_count_tool = create_mcp_count_tool(
+                session=session, loop=main_loop, cancel_token=cancel_token, deadline=deadline, trace=trace,
+                cassette=cassette
+            ) if settings.CONFERENCE_COUNT_TOOL_ENABLED else None
+            # 2. Crew phân cấp riêng cho request này (manager, worker và task đều là bản sao,
+            #    vì CrewAI sửa chúng trong lúc chạy và các request chạy song song).
+            research_crew = conference_crew_factory.build(
+                mcp_conference_tool, mcp_conference_batch_tool, mcp_local_search_tool, mcp_count_tool
             )
-            return result
\ No newline at end of file
+
+        # loop.run_in_executor vẫn là cách đúng để chạy kickoff, nhưng trên pool crew riêng có giới hạn
+        kickoff = main_loop.run_in_executor(
+            crew_executor,
+            _kickoff_with_event_stream,
+            research_crew,
+            inputs,
+            event_stream,
+            cancel_token,
+            deadline,
+            trace,
+            cassette
+        )
+        try:
+            result = await asyncio.shield(kickoff)
+        except asyncio.CancelledError:
+            # Client đã rời đi: báo cho thread crew dừng ở bước kế tiếp, và chờ nó thoát một
+            # chút để session không bị cho mượn lại trong khi thread vẫn còn dùng.
+            cancel_token.cancel("request cancelled")
+            done, _ = await asyncio.wait({kickoff}, timeout=settings.CREW_CANCEL_GRACE_SECONDS)
+            if not done:
+                print("Cancelled crew is still running; discarding its MCP session.")
+                conference_session_pool.discard(session)
+            raise
+    # Worker là bản sao riêng của request: tools_results chỉ chứa kết quả tool của lượt chạy này.
+    return result, any(bool(agent.tools_results) for agent in research_crew.agents)
+
+
+
+def _synthesize_with_event_stream(
+    messages: list,
+    event_stream: Optional[CrewEventStream],
+    cancel_token: Optional[CancellationToken] = None,
+    deadline: Optional[Deadline] = None,
+    trace: Optional[RequestTrace] = None,
+    cassette: Optional[Cassette] = None,
+) -> Optional[str]:
+    """Runs the single synthesis LLM call in the executor thread, streaming all of its tokens."""
+    if event_stream is not None:
+        event_stream.stream_all_tokens = True
+    # enforce=False: lời gọi tổng hợp là bước cuối, được dùng cả phần thời gian dự trữ.
+    with bind_event_stream(event_stream), bind_cancellation(cancel_token), bind_deadline(deadline, enforce=False), bind_trace(trace), bind_cassette(cassette):
+        try:
+            return host_llm.call(messages)
+        except CrewCancelled as e:
+            print(f"Answer synthesis stopped early: {e}")
+            return None
+
+
+async def run_compiled_query(
+    query: str,
+    search_query: str,
+    event_stream: Optional[CrewEventStream] = None,
+    cancel_token: Optional[CancellationToken] = None,
+    deadline: Optional[Deadline] = None,
+) -> str:
+    """
+    Fast path for queries the local compiler understood: calls the MCP tool directly with
+    the compiled searchQuery and synthesizes the answer with one LLM call, skipping the
+    manager delegation and the worker agent.
+    """
+    if event_stream is not None:
+        event_stream.emit({"type": "tool_start", "tool": "get_conferences", "agent": None, "searchQuery": search_query})
+    leasing = time.perf_counter()
+    async with conference_session_pool.lease() as session:
+        record_span("mcp_lease", time.perf_counter() - leasing)
+        tool_output = await call_conference_tool(session, search_query, deadline)
+    if event_stream is not None:
+        event_stream.emit({"type": "tool_finish", "tool": "get_conferences", "searchQuery": search_query})
+
+    messages = [{
+        "role": "user",
+        "content": direct_answer_prompt.format(query=query, search_query=search_query, tool_output=tool_output),
+    }]
+    cancel_token = cancel_token or CancellationToken()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(
+            crew_executor,
+            _synthesize_with_event_stream,
+            messages,
+            event_stream,
+            cancel_token,
+            deadline,
+            current_trace(),
+            current_cassette()
+        )
+    except asyncio.CancelledError:
+        # Ngừng stream câu trả lời ở chunk kế tiếp thay vì để thread chạy hết.
+        cancel_token.cancel("request cancelled")
+        raise
+
+
+def _format_findings(findings: list, max_chars: Optional[int] = None) -> str:
+    """Joins the tool outputs gathered so far, newest first, within `max_chars` (PARTIAL_ANSWER_MAX_CHARS)."""
+    max_chars = max_chars or settings.PARTIAL_ANSWER_MAX_CHARS
+    parts, used = [], 0
+    for source, text in reversed(findings):
+        remaining = max_chars - used
+        if remaining <= 0:
+            break
+        part = f"[{source}]\n{text[:remaining]}"
+        parts.append(part)
+        used += len(part)
+    return "\n\n".join(parts)
+
+
+async def answer_partially(
+    query: str,
+    deadline: Deadline,
+    event_stream: Optional[CrewEventStream] = None,
+    cancel_token: Optional[CancellationToken] = None,
+) -> str:
+    """
+    Builds the best answer possible from the tool outputs gathered before the deadline,
+    with one short LLM call in the reserved time.
+    """
+    if event_stream is not None:
+        event_stream.emit({"type": "status", "step": "deadline", "remaining": round(deadline.remaining(), 1)})
+    findings = deadline.findings()
+    if not findings or deadline.remaining() < 1.0:
+        return (
+            "Sorry, I could not finish researching your request in time. "
+            "Please try again, or narrow the request down (for example by rank, country or date)."
+        )
+
+    messages = [{
+        "role": "user",
+        "content": partial_answer_prompt.format(query=query, findings=_format_findings(findings)),
+    }]
+    cancel_token = cancel_token or CancellationToken()
+    try:
+        partial = await asyncio.get_running_loop().run_in_executor(
+            crew_executor,
+            _synthesize_with_event_stream,
+            messages,
+            event_stream,
+            cancel_token,
+            deadline,
+            current_trace(),
+            current_cassette()
+        )
+    except asyncio.CancelledError:
+        cancel_token.cancel("request cancelled")
+        raise
+    return partial or "Sorry, I could not finish researching your request in time."
+
+
+async def answer_follow_up(
+    query: str,
+    follow_up: FollowUp,
+    state: ConversationState,
+    event_stream: Optional[CrewEventStream] = None,
+    cancel_token: Optional[CancellationToken] = None,
+    deadline: Optional[Deadline] = None,
+) -> Optional[str]:
+    """
+    Answers a follow-up of the conversation's last search without the crew: the next page
+    is fetched directly like a compiled query, a question about the results already shown
+    is answered from them with one LLM call, and "more" after the last page needs no call.
+    """
+    if event_stream is not None:
+        event_stream.emit({"type": "status", "step": "follow_up", "kind": follow_up.kind, "reason": follow_up.reason})
+    if follow_up.kind == NEXT_PAGE:
+        return await run_compiled_query(query, follow_up.search_query, event_stream, cancel_token, deadline)
+    if follow_up.kind != FROM_RESULTS:
+        return (
+            "That was everything I found for your previous search - there are no more matching conferences. "
+            "You could broaden the search, for example with another rank, country or date range."
+        )
+
+    messages = [{
+        "role": "user",
+        "content": follow_up_answer_prompt.format(
+            query=query,
+            previous_query=state.last_query,
+            results=_format_findings(state.results, settings.CONVERSATION_MAX_RESULT_CHARS),
+        ),
+    }]
+    cancel_token = cancel_token or CancellationToken()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(
+            crew_executor,
+            _synthesize_with_event_stream,
+            messages,
+            event_stream,
+            cancel_token,
+            deadline,
+            current_trace(),
+            current_cassette()
+        )
+    except asyncio.CancelledError:
+        cancel_token.cancel("request cancelled")
+        raise
+
+
+async def answer_query(
+    inputs: dict,
+    event_stream: Optional[CrewEventStream] = None,
+    cancel_token: Optional[CancellationToken] = None,
+    deadline: Optional[Deadline] = None,
+) -> str:
+    """
+    Answers a conference query. Tries the deterministic query compiler first and falls
+    back to the full hierarchical crew when it is not confident. If the crew is stopped
+    by the `deadline`, a partial answer is built from what it had found so far.
+    A near-identical query answered recently is served from the semantic answer cache.
+    A follow-up of the conversation's last search ("find 5 more", "which of them are online?")
+    is answered from the conversation state instead.
+    """
+    # Câu hỏi nối tiếp phụ thuộc vào hội thoại: xét trước cache ngữ nghĩa (vốn chỉ so câu hỏi).
+    turn = current_turn()
+    if turn is not None and turn.previous is not None:
+        follow_up = resolve_follow_up(inputs["query"], turn.previous)
+        if follow_up is not None:
+            log.info(f"Follow-up of the previous search: kind={follow_up.kind}, reason={follow_up.reason}")
+            return await answer_follow_up(inputs["query"], follow_up, turn.previous, event_stream, cancel_token, deadline)
+
+    # Khi ghi / phát lại cassette, luôn chạy toàn bộ pipeline thay vì dùng lại câu trả lời cũ.
+    if semantic_answer_cache is not None and current_cassette() is None:
+        hit = await asyncio.to_thread(semantic_answer_cache.lookup, inputs["query"])
+        if hit is not None:
+            answer, similarity = hit
+            if event_stream is not None:
+                event_stream.emit({"type": "status", "step": "semantic_cache", "similarity": round(similarity, 4)})
+            return answer
+
+    compiled = None
+    if settings.QUERY_COMPILER_ENABLED:
+        try:
+            compiled = compile_query(inputs["query"])
+        except Exception as e:
+            # Lỗi của bộ biên dịch không được làm hỏng request: để crew xử lý câu hỏi.
+            log.warning(f"Query compiler failed, falling back to the crew: {e}")
+    if compiled is not None:
+        log.info(
+            f"Query compiler: searchQuery='{compiled.search_query}', confidence={compiled.confidence}, "
+            f"confident={compiled.confident}, reason={compiled.reason}"
+        )
+        if compiled.confident:
+            if event_stream is not None:
+                event_stream.emit({"type": "status", "step": "query_compiled", "searchQuery": compiled.search_query})
+            answer = await run_compiled_query(inputs["query"], compiled.search_query, event_stream, cancel_token, deadline)
+            _remember_answer(inputs["query"], answer)
+            return answer
+
+    result, used_tools = await create_and_run_crew(
+        inputs, event_stream=event_stream, cancel_token=cancel_token, deadline=deadline
+    )
+    if result is None:
+        if deadline is not None and deadline.running_low and not (cancel_token and cancel_token.cancelled):
+            return await answer_partially(inputs["query"], deadline, event_stream, cancel_token)
+        return None
+    # `.raw` thường chứa chuỗi văn bản cuối cùng mà manager agent tổng hợp.
+    if used_tools:
+        # Chỉ nhớ câu trả lời dựa trên dữ liệu tool (không nhớ câu trả lời một phần hay không tra cứu).
+        _remember_answer(inputs["query"], result.raw)
+    return result.raw
+
+
+def _remember_answer(query: str, answer: Optional[str]) -> None:
+    if semantic_answer_cache is not None and answer:
+        # Tính embedding tốn CPU: ghi vào cache ở nền thay vì giữ câu trả lời lại.
+        asyncio.get_running_loop().run_in_executor(None, semantic_answer_cache.store, query, answer)
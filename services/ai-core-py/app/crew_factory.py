@@ -0,0 +1,116 @@
+# services/ai-core-py/app/crew_factory.py
+import uuid
+from typing import List, Optional
+
+from crewai import Agent, Crew, Process, Task
+from crewai.agents.cache.cache_handler import CacheHandler
+from crewai.agents.tools_handler import ToolsHandler
+from crewai.tools import BaseTool
+from crewai.utilities.token_counter_callback import TokenProcess
+
+from app.agents.host_agent import host_agent_manager
+from app.agents.mcp_sub_agents import create_conference_researcher
+from app.tasks.research_tasks import conference_research_task
+
+import logging
+log = logging.getLogger(__name__)
+log.info(f"Module '{__name__}' is being imported and processed.")
+
+
+class CrewFactory:
+    """
+    Builds the research crew of each request from templates validated once at startup.
+
+    Constructing a `Crew` and its agents runs every pydantic validator again, builds
+    agent executors that `kickoff` throws away, and opens the task output store. The
+    factory does that once for a template crew; `build()` then returns shallow copies
+    (no validation) with every field CrewAI mutates during a run replaced by a fresh
+    value: the task's agent and output, each agent's executor, tools, tool results and
+    caches, and the crew's tool cache and execution logs. Templates are never run or modified, so concurrent builds
+    from any thread are safe without a lock.
+    """
+
+    def __init__(self, manager: Agent, worker: Agent, task: Task):
+        self._manager = manager
+        self._worker = worker
+        self._task = task
+        self._crew = Crew(
+            agents=[worker],
+            tasks=[task],
+            process=Process.hierarchical,
+            manager_agent=manager,
+            verbose=True,
+        )
+
+    def build(
+        self,
+        conference_tool: BaseTool,
+        batch_tool: Optional[BaseTool] = None,
+        local_search_tool: Optional[BaseTool] = None,
+        count_tool: Optional[BaseTool] = None,
+    ) -> Crew:
+        """
+        Returns an isolated crew whose worker searches with `conference_tool` (and `batch_tool`,
+        `local_search_tool` and `count_tool`, if given).
+        """
+        # Cache kết quả tool của CrewAI chỉ có hiệu lực trong một lượt chạy (như khi tạo Crew mới).
+        cache_handler = CacheHandler()
+        tools = [tool for tool in (conference_tool, batch_tool, local_search_tool, count_tool) if tool is not None]
+        worker = self._copy_agent(self._worker, tools, cache_handler)
+        manager = self._copy_agent(self._manager, [], CacheHandler())
+        crew = self._crew.model_copy(update={
+            "id": uuid.uuid4(),
+            "agents": [worker],
+            "tasks": [self._copy_task(self._task)],
+            "manager_agent": manager,
+            "usage_metrics": None,
+            "execution_logs": [],
+        })
+        crew._cache_handler = cache_handler
+        crew._inputs = None
+        return crew
+
+    @staticmethod
+    def _copy_agent(template: Agent, tools: List[BaseTool], cache_handler: CacheHandler) -> Agent:
+        agent = template.model_copy(update={
+            "id": uuid.uuid4(),
+            "tools": list(tools),
+            "agent_executor": None,
+            "crew": None,
+            # CrewAI nối kết quả từng lần gọi tool vào danh sách này: bản sao cần danh sách riêng.
+            "tools_results": [],
+        })
+        # Agent mẫu có cache / bộ đếm token riêng: bản sao không được dùng chung với lượt chạy khác.
+        agent._token_process = TokenProcess()
+        agent._times_executed = 0
+        # Như BaseAgent.set_cache_handler, nhưng không tạo executor: kickoff sẽ tạo lại.
+        agent.tools_handler = ToolsHandler()
+        if agent.cache:
+            agent.cache_handler = cache_handler
+            agent.tools_handler.cache = cache_handler
+        return agent
+
+    @staticmethod
+    def _copy_task(template: Task) -> Task:
+        return template.model_copy(update={
+            "id": uuid.uuid4(),
+            "agent": None,
+            "output": None,
+            "tools": list(template.tools or []),
+            "processed_by_agents": set(),
+            "used_tools": 0,
+            "tools_errors": 0,
+            "delegations": 0,
+            "retry_count": 0,
+            "start_time": None,
+            "end_time": None,
+            "prompt_context": None,
+        })
+
+
+# Template dựng một lần khi khởi động; mỗi request chỉ lấy một bản sao qua `build()`.
+conference_crew_factory = CrewFactory(
+    manager=host_agent_manager,
+    worker=create_conference_researcher(),
+    task=conference_research_task,
+)
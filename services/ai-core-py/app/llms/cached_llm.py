@@ -0,0 +1,67 @@
+# app/llms/cached_llm.py
+from typing import Any, Dict, List, Optional, Union
+
+from crewai.utilities.events import (
+    crewai_event_bus,
+    LLMCallCompletedEvent,
+    LLMCallStartedEvent,
+    LLMStreamChunkEvent,
+)
+from crewai.utilities.events.llm_events import LLMCallType
+
+from app.llms.llm_cache import LLMResponseCache, llm_cache_key
+from app.llms.rate_limited_llm import RateLimitedLLM
+
+
+class CachedLLM(RateLimitedLLM):
+    """
+    RateLimitedLLM that answers repeated prompts from an exact-match `LLMResponseCache`.
+
+    Only plain text completions are cached (never calls that may execute functions).
+    A hit emits the same events as a real call, so SSE token streaming, cancellation
+    and deadline checks behave exactly as they do for a live completion.
+    """
+
+    def __init__(self, *args: Any, response_cache: Optional[LLMResponseCache] = None, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.response_cache = response_cache
+
+    def active_model(self) -> str:
+        """Model the current call goes to; subclasses that route calls override this."""
+        return self.model
+
+    @property
+    def effective_temperature(self) -> Optional[float]:
+        # Cấu hình hiện tại truyền temperature qua `config`, không qua tham số `temperature`.
+        if self.temperature is not None:
+            return self.temperature
+        config = self.additional_params.get("config") or {}
+        return config.get("temperature")
+
+    def call(
+        self,
+        messages: Union[str, List[Dict[str, str]]],
+        tools: Optional[List[dict]] = None,
+        callbacks: Optional[List[Any]] = None,
+        available_functions: Optional[Dict[str, Any]] = None,
+    ) -> Union[str, Any]:
+        if self.response_cache is None or available_functions:
+            return super().call(messages, tools, callbacks, available_functions)
+
+        key = llm_cache_key(self.active_model(), self.effective_temperature, messages, tools, self.stop)
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            return self._replay(cached, messages, tools, callbacks)
+
+        response = super().call(messages, tools, callbacks, available_functions)
+        if isinstance(response, str) and response.strip():
+            self.response_cache.set(key, response)
+        return response
+
+    def _replay(self, response: str, messages: Any, tools: Optional[List[dict]], callbacks: Optional[List[Any]]) -> str:
+        crewai_event_bus.emit(self, event=LLMCallStartedEvent(messages=messages, tools=tools, callbacks=callbacks))
+        if self.stream:
+            # Cả câu trả lời trong một chunk: bộ lọc token của SSE vẫn tìm thấy 'Final Answer:'.
+            crewai_event_bus.emit(self, event=LLMStreamChunkEvent(chunk=response))
+        crewai_event_bus.emit(self, event=LLMCallCompletedEvent(response=response, call_type=LLMCallType.LLM_CALL))
+        return response
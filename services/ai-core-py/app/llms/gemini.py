@@ -1,21 +1,44 @@
 # app/llms/gemini.py
 
-# SỬA LỖI Ở ĐÂY: Import lớp LLM trực tiếp từ crewai
-from crewai import LLM 
+# Lớp LLM của crewai, mở rộng để timeout mỗi lời gọi theo deadline của request
+# và trả lời lại các prompt trùng lặp từ cache; khi bật phân tầng, model được chọn theo từng lời gọi.
+# Mọi lời gọi thật tới Gemini đi qua bộ giới hạn tốc độ dùng chung.
+# Khi request có cassette, lời gọi được ghi lại hoặc phát lại từ cassette thay vì gọi Gemini.
+from app.llms.replayable_llm import ReplayableLLM
+from app.llms.llm_cache import LLMResponseCache
+from app.llms.router import MANAGER, WORKER, model_router
+from app.llms.rate_limiter import gemini_rate_limiter
 from app.config.settings import settings
 
+# Cache dùng chung cho cả hai LLM; key đã gồm tên model và temperature.
+llm_response_cache = LLMResponseCache(
+    max_memory_bytes=settings.LLM_CACHE_MAX_MEMORY_BYTES,
+    db_path=settings.LLM_CACHE_DB_PATH,
+    max_disk_bytes=settings.LLM_CACHE_MAX_DISK_BYTES,
+) if settings.LLM_CACHE_ENABLED else None
+
 # Khởi tạo LLM cho Host Agent (Manager)
-host_llm = LLM(
+# stream=True để token của câu trả lời cuối được đẩy qua SSE ngay khi sinh ra.
+host_llm = ReplayableLLM(
     model=f"gemini/{settings.HOST_AGENT_MODEL_NAME}",
     config={
         "temperature": 0.3
-    }
+    },
+    stream=settings.STREAM_MANAGER_TOKENS,
+    response_cache=llm_response_cache,
+    router=model_router,
+    rate_limiter=gemini_rate_limiter,
+    llm_role=MANAGER
 )
 
 # Khởi tạo LLM cho các Sub Agent (Workers)
-sub_agent_llm = LLM(
+sub_agent_llm = ReplayableLLM(
     model=f"gemini/{settings.SUB_AGENT_MODEL_NAME}",
     config={
         "temperature": 0.1
-    }
-)
\ No newline at end of file
+    },
+    response_cache=llm_response_cache,
+    router=model_router,
+    rate_limiter=gemini_rate_limiter,
+    llm_role=WORKER
+)
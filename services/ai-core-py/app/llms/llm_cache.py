@@ -0,0 +1,151 @@
+# app/llms/llm_cache.py
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Union
+
+import logging
+log = logging.getLogger(__name__)
+log.info(f"Module '{__name__}' is being imported and processed.")
+
+
+def llm_cache_key(
+    model: str,
+    temperature: Optional[float],
+    messages: Union[str, List[Dict[str, Any]]],
+    tools: Optional[List[dict]] = None,
+    stop: Optional[List[str]] = None,
+) -> str:
+    """Hashes everything that determines an LLM completion: model, sampling settings, messages and tools."""
+    material = json.dumps(
+        {"model": model, "temperature": temperature, "stop": stop or [], "messages": messages, "tools": tools or []},
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Exact-match cache of LLM completions, keyed by `llm_cache_key`.
+
+    A byte-bounded in-memory LRU sits in front of an optional SQLite file. Both layers
+    evict by size: the least recently used completions go first once the total length
+    of the cached texts exceeds `max_memory_bytes` / `max_disk_bytes`.
+    """
+
+    def __init__(self, max_memory_bytes: int, db_path: Optional[str] = None, max_disk_bytes: int = 0):
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {
+            "hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0, "disk_evictions": 0,
+        }
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._open_db(db_path)
+
+    # --- Public API ---
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return value
+            if self._db is not None:
+                value = self._load_from_db(key)
+                if value is not None:
+                    self._counters["disk_hits"] += 1
+                    self._insert(key, value)
+                    return value
+            self._counters["misses"] += 1
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._insert(key, value)
+            self._counters["writes"] += 1
+            if self._db is not None:
+                self._save_to_db(key, value)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counters)
+            stats["size"] = len(self._entries)
+            stats["memory_bytes"] = self._memory_bytes
+            stats["max_memory_bytes"] = self.max_memory_bytes
+        lookups = stats["hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+    # --- In-memory LRU giới hạn theo byte (caller holds the lock) ---
+    def _insert(self, key: str, value: str) -> None:
+        size = len(value.encode("utf-8"))
+        if size > self.max_memory_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous.encode("utf-8"))
+        self._entries[key] = value
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._memory_bytes -= len(evicted.encode("utf-8"))
+            self._counters["evictions"] += 1
+
+    # --- On-disk backing store (caller holds the lock) ---
+    def _open_db(self, db_path: str) -> None:
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache (last_used)")
+        self._db.commit()
+        log.info(f"LLM response cache backed by SQLite at {db_path}.")
+
+    def _load_from_db(self, key: str) -> Optional[str]:
+        row = self._db.execute("SELECT value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        try:
+            self._db.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+        except sqlite3.Error as e:
+            log.warning(f"Failed to touch LLM cache entry: {e}")
+        return row[0]
+
+    def _save_to_db(self, key: str, value: str) -> None:
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, len(value.encode("utf-8")), time.time()),
+            )
+            self._evict_disk()
+            self._db.commit()
+        except sqlite3.Error as e:
+            log.warning(f"Failed to persist LLM cache entry: {e}")
+
+    def _evict_disk(self) -> None:
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        # Bỏ các entry ít được dùng gần đây nhất cho tới khi tổng kích thước về dưới ngưỡng.
+        excess = total - self.max_disk_bytes
+        freed = 0
+        doomed = []
+        for key, size in self._db.execute("SELECT key, size FROM llm_cache ORDER BY last_used ASC"):
+            doomed.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._db.executemany("DELETE FROM llm_cache WHERE key = ?", doomed)
+        self._counters["disk_evictions"] += len(doomed)
@@ -0,0 +1,69 @@
+# app/llms/rate_limited_llm.py
+from typing import Any, Dict, List, Optional, Union
+
+import litellm
+
+from app.config.settings import settings
+from app.llms.rate_limiter import GeminiRateLimiter, PRIORITY_INTERMEDIATE, PRIORITY_SYNTHESIS
+from app.llms.request_aware_llm import RequestAwareLLM
+from app.llms.router import SYNTHESIS, WORKER, ModelRouter, estimate_tokens
+from app.observability.tracing import span
+
+
+class RateLimitedLLM(RequestAwareLLM):
+    """
+    RequestAwareLLM whose calls go through the shared `GeminiRateLimiter`.
+
+    Each call waits for request/token capacity (final synthesis ahead of intermediate
+    steps). A 429 is reported to the limiter, which slows every caller down, and the
+    call is retried up to GEMINI_RATE_LIMIT_MAX_RETRIES times before the error is raised.
+    """
+
+    def __init__(
+        self,
+        *args: Any,
+        rate_limiter: Optional[GeminiRateLimiter] = None,
+        llm_role: str = WORKER,
+        **kwargs: Any,
+    ):
+        super().__init__(*args, **kwargs)
+        self.rate_limiter = rate_limiter
+        self.llm_role = llm_role
+
+    def call(
+        self,
+        messages: Union[str, List[Dict[str, str]]],
+        tools: Optional[List[dict]] = None,
+        callbacks: Optional[List[Any]] = None,
+        available_functions: Optional[Dict[str, Any]] = None,
+    ) -> Union[str, Any]:
+        if self.rate_limiter is None:
+            return super().call(messages, tools, callbacks, available_functions)
+
+        message_list = [{"role": "user", "content": messages}] if isinstance(messages, str) else messages
+        step = ModelRouter.classify_step(self.llm_role, message_list)
+        priority = PRIORITY_SYNTHESIS if step == SYNTHESIS else PRIORITY_INTERMEDIATE
+        prompt_tokens = sum(estimate_tokens(str(m.get("content") or "")) for m in message_list)
+        estimated_tokens = prompt_tokens + settings.GEMINI_COMPLETION_TOKENS_ESTIMATE
+
+        attempt = 0
+        while True:
+            with span("gemini_queue_wait"):
+                permit = self.rate_limiter.acquire(estimated_tokens, priority)
+            try:
+                response = super().call(messages, tools, callbacks, available_functions)
+            except litellm.RateLimitError:
+                self.rate_limiter.release(permit)
+                self.rate_limiter.on_rate_limited()
+                if attempt >= settings.GEMINI_RATE_LIMIT_MAX_RETRIES:
+                    raise
+                # Lần xin quyền kế tiếp sẽ chờ hết khoảng tạm dừng do 429.
+                attempt += 1
+                continue
+            except BaseException:
+                self.rate_limiter.release(permit)
+                raise
+            completion_tokens = estimate_tokens(response) if isinstance(response, str) else 0
+            self.rate_limiter.release(permit, actual_tokens=prompt_tokens + completion_tokens)
+            self.rate_limiter.on_success()
+            return response
@@ -0,0 +1,237 @@
+# app/llms/rate_limiter.py
+import heapq
+import itertools
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from app.config.settings import settings
+from app.runtime.cancellation import current_cancellation
+from app.runtime.deadline import current_deadline
+
+import logging
+log = logging.getLogger(__name__)
+log.info(f"Module '{__name__}' is being imported and processed.")
+
+# Độ ưu tiên trong hàng đợi (số nhỏ được phục vụ trước): câu trả lời cuối trước các bước trung gian.
+PRIORITY_SYNTHESIS = 0
+PRIORITY_INTERMEDIATE = 1
+
+
+class RateLimitWaitTimeout(TimeoutError):
+    """
+    No Gemini capacity became available in time.
+
+    A TimeoutError on purpose: CrewAI re-raises it instead of re-running the whole
+    task, which would only add more calls to an already saturated quota.
+    """
+
+    def __init__(self, waited_seconds: float, retry_after_seconds: float):
+        super().__init__(f"Waited {waited_seconds:.1f}s for Gemini capacity.")
+        self.retry_after_seconds = retry_after_seconds
+
+
+class _TokenBucket:
+    """Refills continuously at `rate_per_minute`; holds at most one minute of capacity."""
+
+    def __init__(self, rate_per_minute: float):
+        self.rate_per_minute = rate_per_minute
+        self.level = float(rate_per_minute)
+        self._updated = time.monotonic()
+
+    def refill(self, now: float, rate_factor: float) -> None:
+        rate = self.rate_per_minute * rate_factor
+        self.level = min(float(self.rate_per_minute), self.level + (now - self._updated) * rate / 60.0)
+        self._updated = now
+
+    def seconds_until(self, amount: float, rate_factor: float) -> float:
+        missing = min(amount, self.rate_per_minute) - self.level
+        if missing <= 0:
+            return 0.0
+        return missing * 60.0 / (self.rate_per_minute * rate_factor)
+
+
+class GeminiPermit:
+    """Capacity granted for one Gemini call; release it when the call ends."""
+
+    __slots__ = ("estimated_tokens", "released")
+
+    def __init__(self, estimated_tokens: int):
+        self.estimated_tokens = estimated_tokens
+        self.released = False
+
+
+class GeminiRateLimiter:
+    """
+    Shared client-side governor for all Gemini calls of the process.
+
+    Calls wait in one priority queue (synthesis first, then FIFO) until both token
+    buckets (requests/minute and tokens/minute) have room and fewer than
+    `max_concurrent` calls are in flight. A 429 from Gemini pauses everyone for an
+    exponentially growing, jittered backoff and halves the effective rate, which then
+    recovers gradually with each successful call (AIMD).
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        max_concurrent: int,
+        max_wait_seconds: float,
+        backoff_base_seconds: float,
+        backoff_max_seconds: float,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_wait_seconds = max_wait_seconds
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self._requests = _TokenBucket(requests_per_minute)
+        self._tokens = _TokenBucket(tokens_per_minute)
+        self._condition = threading.Condition()
+        self._waiters: List[Tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        # Hệ số tốc độ thích ứng (0.1..1) và thời điểm hết tạm dừng sau 429.
+        self._rate_factor = 1.0
+        self._paused_until = 0.0
+        self._consecutive_429 = 0
+        self._queue_delays: Deque[float] = deque(maxlen=1000)
+        self._counters: Dict[str, int] = {"granted": 0, "queued": 0, "timeouts": 0, "rate_limited": 0}
+        self._delay_total = 0.0
+        self._delay_max = 0.0
+
+    # --- Xin / trả quyền gọi ---
+    def acquire(self, estimated_tokens: int, priority: int = PRIORITY_INTERMEDIATE) -> GeminiPermit:
+        """
+        Blocks until the call may go out. The wait is bounded by the request deadline
+        (if one is bound to this thread) and `max_wait_seconds`; a cancelled request
+        stops waiting at once.
+        """
+        deadline = current_deadline()
+        cancel_token = current_cancellation()
+        max_wait = self.max_wait_seconds if deadline is None else min(self.max_wait_seconds, deadline.remaining())
+        started = time.monotonic()
+        entry = (priority, next(self._sequence))
+        with self._condition:
+            heapq.heappush(self._waiters, entry)
+            try:
+                queued = False
+                while True:
+                    now = time.monotonic()
+                    wait = self._wait_time(entry, estimated_tokens, now)
+                    if wait <= 0:
+                        heapq.heappop(self._waiters)
+                        self._grant(estimated_tokens, now - started, queued)
+                        return GeminiPermit(estimated_tokens)
+                    queued = True
+                    elapsed = now - started
+                    if elapsed >= max_wait:
+                        self._counters["timeouts"] += 1
+                        raise RateLimitWaitTimeout(elapsed, self._retry_after(now))
+                    # Thức dậy định kỳ để kiểm tra hủy request, dù không có ai notify.
+                    self._condition.wait(timeout=min(wait, 0.5, max_wait - elapsed))
+                    if cancel_token is not None:
+                        cancel_token.raise_if_cancelled()
+            except BaseException:
+                if entry in self._waiters:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                    self._condition.notify_all()
+                raise
+
+    def release(self, permit: GeminiPermit, actual_tokens: Optional[int] = None) -> None:
+        with self._condition:
+            if permit.released:
+                return
+            permit.released = True
+            self._in_flight -= 1
+            if actual_tokens is not None:
+                # Điều chỉnh bucket theo lượng token thực tế so với ước lượng lúc xin quyền.
+                self._tokens.level -= actual_tokens - permit.estimated_tokens
+            self._condition.notify_all()
+
+    # --- Phản hồi từ Gemini ---
+    def on_success(self) -> None:
+        with self._condition:
+            self._consecutive_429 = 0
+            if self._rate_factor < 1.0:
+                self._rate_factor = min(1.0, self._rate_factor + 0.05)
+
+    def on_rate_limited(self) -> float:
+        """Records a 429: pauses all callers for a jittered backoff and halves the rate. Returns the pause."""
+        with self._condition:
+            self._counters["rate_limited"] += 1
+            self._consecutive_429 += 1
+            self._rate_factor = max(0.1, self._rate_factor / 2)
+            ceiling = min(self.backoff_max_seconds, self.backoff_base_seconds * (2 ** (self._consecutive_429 - 1)))
+            pause = random.uniform(ceiling / 2, ceiling)
+            self._paused_until = max(self._paused_until, time.monotonic() + pause)
+            log.warning(
+                f"Gemini returned 429; pausing calls for {pause:.1f}s, rate factor now {self._rate_factor:.2f}."
+            )
+            self._condition.notify_all()
+            return pause
+
+    # --- Nội bộ (caller holds the lock) ---
+    def _wait_time(self, entry: Tuple[int, int], estimated_tokens: int, now: float) -> float:
+        self._requests.refill(now, self._rate_factor)
+        self._tokens.refill(now, self._rate_factor)
+        if self._waiters[0] != entry:
+            # Chưa tới lượt: chờ tới khi được notify (người đứng trước được cấp quyền hoặc rời hàng).
+            return 0.5
+        if self._in_flight >= self.max_concurrent:
+            return 0.5
+        return max(
+            self._paused_until - now,
+            self._requests.seconds_until(1, self._rate_factor),
+            self._tokens.seconds_until(estimated_tokens, self._rate_factor),
+        )
+
+    def _grant(self, estimated_tokens: int, delay: float, queued: bool) -> None:
+        self._requests.level -= 1
+        self._tokens.level -= estimated_tokens
+        self._in_flight += 1
+        self._counters["granted"] += 1
+        if queued:
+            self._counters["queued"] += 1
+        self._queue_delays.append(delay)
+        self._delay_total += delay
+        self._delay_max = max(self._delay_max, delay)
+        # Người kế tiếp trong hàng có thể đã đủ điều kiện.
+        self._condition.notify_all()
+
+    def _retry_after(self, now: float) -> float:
+        return max(1.0, self._paused_until - now, self._requests.seconds_until(1, self._rate_factor))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            delays = sorted(self._queue_delays)
+            granted = self._counters["granted"]
+            now = time.monotonic()
+            return {
+                **self._counters,
+                "inFlight": self._in_flight,
+                "waiting": len(self._waiters),
+                "rateFactor": round(self._rate_factor, 3),
+                "pausedForSeconds": round(max(0.0, self._paused_until - now), 2),
+                "queueDelayAvgMs": round(1000 * self._delay_total / granted, 1) if granted else 0.0,
+                "queueDelayP50Ms": round(1000 * delays[len(delays) // 2], 1) if delays else 0.0,
+                "queueDelayP95Ms": round(1000 * delays[int(len(delays) * 0.95)], 1) if delays else 0.0,
+                "queueDelayMaxMs": round(1000 * self._delay_max, 1),
+            }
+
+
+# None khi tắt: các lời gọi Gemini đi thẳng như trước.
+gemini_rate_limiter: Optional[GeminiRateLimiter] = (
+    GeminiRateLimiter(
+        requests_per_minute=settings.GEMINI_REQUESTS_PER_MINUTE,
+        tokens_per_minute=settings.GEMINI_TOKENS_PER_MINUTE,
+        max_concurrent=settings.GEMINI_MAX_CONCURRENT_CALLS,
+        max_wait_seconds=settings.GEMINI_RATE_LIMIT_MAX_WAIT_SECONDS,
+        backoff_base_seconds=settings.GEMINI_RATE_LIMIT_BACKOFF_BASE_SECONDS,
+        backoff_max_seconds=settings.GEMINI_RATE_LIMIT_BACKOFF_MAX_SECONDS,
+    )
+    if settings.GEMINI_RATE_LIMIT_ENABLED else None
+)
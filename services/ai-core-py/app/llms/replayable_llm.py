@@ -0,0 +1,45 @@
+# app/llms/replayable_llm.py
+import time
+from typing import Any, Dict, List, Optional, Union
+
+from app.llms.tiered_llm import TieredLLM
+from app.observability.tracing import record_span
+from app.runtime.cassette import current_cassette
+
+
+class ReplayableLLM(TieredLLM):
+    """
+    TieredLLM whose calls are recorded to, or answered from, the request's `Cassette`.
+
+    Without a bound cassette it behaves exactly like TieredLLM. When recording, the
+    routed call runs as usual and its final text response is saved with its latency.
+    When replaying, the recorded response is returned (after the recorded latency,
+    unless replaying at zero latency) through the same events as a cache hit, so
+    streaming, cancellation and deadline checks still run.
+    """
+
+    def call(
+        self,
+        messages: Union[str, List[Dict[str, str]]],
+        tools: Optional[List[dict]] = None,
+        callbacks: Optional[List[Any]] = None,
+        available_functions: Optional[Dict[str, Any]] = None,
+    ) -> Union[str, Any]:
+        cassette = current_cassette()
+        if cassette is None:
+            return super().call(messages, tools, callbacks, available_functions)
+
+        if cassette.replaying:
+            entry = cassette.replay_llm(messages, tools)
+            delay = cassette.delay(entry)
+            if delay > 0:
+                time.sleep(delay)
+            record_span("llm_replay", delay, role=self.llm_role)
+            return self._replay(entry["response"], messages, tools, callbacks)
+
+        started = time.perf_counter()
+        response = super().call(messages, tools, callbacks, available_functions)
+        # Chỉ ghi câu trả lời dạng văn bản (giống cache): lời gọi hàm không phát lại được.
+        if isinstance(response, str):
+            cassette.record_llm(self.llm_role, messages, tools, response, time.perf_counter() - started)
+        return response
@@ -0,0 +1,26 @@
+# app/llms/request_aware_llm.py
+from typing import Any, Dict, List, Optional, Union
+
+from crewai import LLM
+
+from app.runtime.deadline import current_deadline
+
+
+class RequestAwareLLM(LLM):
+    """
+    crewai LLM whose per-call timeout follows the deadline of the request being served.
+
+    The LLM instances are shared by all requests, so the deadline is read from the
+    calling thread (see `bind_deadline`) instead of being stored on the instance.
+    """
+
+    def _prepare_completion_params(
+        self,
+        messages: Union[str, List[Dict[str, str]]],
+        tools: Optional[List[dict]] = None,
+    ) -> Dict[str, Any]:
+        params = super()._prepare_completion_params(messages, tools)
+        deadline = current_deadline()
+        if deadline is not None:
+            params["timeout"] = deadline.timeout(cap=params.get("timeout"))
+        return params
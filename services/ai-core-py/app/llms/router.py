@@ -0,0 +1,228 @@
+# app/llms/router.py
+import json
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Union
+
+from crewai.agents.parser import AgentAction, CrewAgentParser, OutputParserException
+
+from app.config.settings import settings
+
+import logging
+log = logging.getLogger(__name__)
+log.info(f"Module '{__name__}' is being imported and processed.")
+
+# Các tầng model, từ rẻ tới mạnh.
+LIGHT = "light"
+STANDARD = "standard"
+STRONG = "strong"
+TIERS = [LIGHT, STANDARD, STRONG]
+
+# Loại bước mà một lời gọi LLM đang phục vụ.
+DELEGATION = "delegation"
+TOOL_ARGS = "tool_args"
+SYNTHESIS = "synthesis"
+
+# Vai trò của LLM trong crew: manager (ủy quyền + tổng hợp) hay worker (dựng searchQuery).
+MANAGER = "manager"
+WORKER = "worker"
+
+# Tầng xuất phát của mỗi loại bước; độ dài prompt và độ phức tạp có thể đẩy lên một tầng.
+STEP_BASE_TIER = {DELEGATION: LIGHT, TOOL_ARGS: LIGHT, SYNTHESIS: STANDARD}
+
+# CrewAI thêm các thông điệp này khi lần trả lời trước sai định dạng ReAct.
+PARSE_RETRY_MARKER = "I did it wrong."
+REACT_MARKER = "Final Answer:"
+OBSERVATION_MARKER = "\nObservation:"
+
+# Dấu hiệu một yêu cầu có nhiều ràng buộc (so sánh, kết hợp điều kiện, khoảng thời gian).
+_COMPLEXITY_SIGNALS = re.compile(
+    r"\b(?:and|or|compare|comparison|versus|vs|between|except|both|và|hoặc|so sánh|giữa|ngoại trừ|cả)\b",
+    re.IGNORECASE,
+)
+_NUMBER = re.compile(r"\d+")
+# Các prompt của crew trích yêu cầu gốc dạng "...request: '<query>'." (xem app/tasks/research_tasks.py).
+_QUOTED_REQUEST = re.compile(r"request: '(.+?)'\.?\n", re.DOTALL)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), enough for routing and usage accounting."""
+    return (len(text) + 3) // 4
+
+
+def _content(message: Any) -> str:
+    if isinstance(message, dict):
+        return str(message.get("content") or "")
+    return str(message)
+
+
+def complexity_score(text: str) -> float:
+    """
+    Scores how demanding a request is, from 0 (a single simple lookup) to 1.
+    Counts constraint words, numbers (dates, ranks, counts) and length.
+    """
+    signals = len(_COMPLEXITY_SIGNALS.findall(text))
+    numbers = len(_NUMBER.findall(text))
+    words = len(text.split())
+    return min(1.0, 0.2 * signals + 0.1 * numbers + words / 400)
+
+
+@dataclass
+class RouteDecision:
+    step: str
+    tier: str
+    model: str
+    prompt_tokens: int
+    complexity: float
+    reason: str
+
+
+class _TierStats:
+    __slots__ = ("calls", "escalations_from", "latency_total", "latency_max", "prompt_tokens", "completion_tokens")
+
+    def __init__(self):
+        self.calls = 0
+        self.escalations_from = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+
+class ModelRouter:
+    """
+    Picks the Gemini model for each LLM call of a crew run.
+
+    The starting tier depends on the step (delegation and tool-argument building go to
+    the light model, final synthesis to the standard one) and is raised by one tier for
+    long prompts or complex requests. A response that fails to parse, or a tool call
+    whose arguments look unusable, is retried one tier up.
+    """
+
+    def __init__(self, models: Dict[str, str], long_prompt_tokens: int, complexity_threshold: float):
+        self.models = models
+        self.long_prompt_tokens = long_prompt_tokens
+        self.complexity_threshold = complexity_threshold
+        self._lock = threading.Lock()
+        self._tiers: Dict[str, _TierStats] = {tier: _TierStats() for tier in TIERS}
+        self._steps: Dict[str, int] = {DELEGATION: 0, TOOL_ARGS: 0, SYNTHESIS: 0}
+        self._escalation_reasons: Dict[str, int] = {}
+
+    # --- Phân loại bước ---
+    @staticmethod
+    def classify_step(llm_role: str, messages: List[Any]) -> str:
+        is_react = bool(messages) and REACT_MARKER in _content(messages[0])
+        # Chỉ xét các lượt của assistant: hướng dẫn định dạng ReAct trong prompt cũng chứa "Observation:".
+        has_observation = any(
+            OBSERVATION_MARKER in _content(m) for m in messages if isinstance(m, dict) and m.get("role") == "assistant"
+        )
+        if not is_react or has_observation:
+            # Lời gọi trực tiếp (fast path, câu trả lời một phần) hoặc đã có kết quả tool: tổng hợp.
+            return SYNTHESIS
+        return DELEGATION if llm_role == MANAGER else TOOL_ARGS
+
+    @staticmethod
+    def _request_text(messages: List[Any]) -> str:
+        # Độ phức tạp được tính trên yêu cầu của người dùng, không trên phần khuôn mẫu của prompt.
+        user_text = next((_content(m) for m in messages if isinstance(m, dict) and m.get("role") == "user"), "")
+        quoted = _QUOTED_REQUEST.search(user_text)
+        return quoted.group(1) if quoted else user_text
+
+    def route(self, llm_role: str, messages: Union[str, List[Any]]) -> RouteDecision:
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        step = self.classify_step(llm_role, messages)
+        prompt_tokens = sum(estimate_tokens(_content(m)) for m in messages)
+        complexity = complexity_score(self._request_text(messages))
+
+        tier_index = TIERS.index(STEP_BASE_TIER[step])
+        reasons = [f"step={step}"]
+        if prompt_tokens > self.long_prompt_tokens:
+            tier_index += 1
+            reasons.append(f"long_prompt={prompt_tokens}")
+        elif complexity >= self.complexity_threshold:
+            tier_index += 1
+            reasons.append(f"complexity={complexity:.2f}")
+        if PARSE_RETRY_MARKER in _content(messages[-1]):
+            # CrewAI đang yêu cầu làm lại sau một câu trả lời sai định dạng.
+            tier_index += 1
+            reasons.append("previous_parse_failure")
+        tier = TIERS[min(tier_index, len(TIERS) - 1)]
+        return RouteDecision(step, tier, self.models[tier], prompt_tokens, complexity, ", ".join(reasons))
+
+    # --- Nâng tầng ---
+    def escalation_reason(self, decision: RouteDecision, messages: Union[str, List[Any]], response: Any) -> Optional[str]:
+        """Returns why `response` should be retried on a stronger model, or None if it is usable."""
+        if decision.tier == TIERS[-1] or not isinstance(response, str):
+            return None
+        if not response.strip():
+            return "empty_response"
+        if isinstance(messages, str) or not messages or REACT_MARKER not in _content(messages[0]):
+            return None
+        try:
+            parsed = CrewAgentParser.parse_text(response)
+        except OutputParserException:
+            return "parse_failure"
+        if decision.step == TOOL_ARGS and isinstance(parsed, AgentAction):
+            try:
+                tool_input = json.loads(parsed.tool_input)
+            except (TypeError, ValueError):
+                return "invalid_tool_input"
+            search_query = tool_input.get("searchQuery") if isinstance(tool_input, dict) else None
+            if search_query is not None and "=" not in str(search_query):
+                # searchQuery phải là chuỗi key=value; câu văn tự do cho thấy model không hiểu nhiệm vụ.
+                return "low_confidence_tool_input"
+        return None
+
+    def escalate(self, decision: RouteDecision, reason: str) -> RouteDecision:
+        tier = TIERS[TIERS.index(decision.tier) + 1]
+        with self._lock:
+            self._tiers[decision.tier].escalations_from += 1
+            self._escalation_reasons[reason] = self._escalation_reasons.get(reason, 0) + 1
+        log.info(f"Escalating {decision.step} call from '{decision.tier}' to '{tier}': {reason}")
+        return RouteDecision(
+            decision.step, tier, self.models[tier], decision.prompt_tokens, decision.complexity, f"escalated: {reason}"
+        )
+
+    # --- Thống kê theo tầng ---
+    def record(self, decision: RouteDecision, response: Any, latency_seconds: float) -> None:
+        with self._lock:
+            stats = self._tiers[decision.tier]
+            stats.calls += 1
+            stats.latency_total += latency_seconds
+            stats.latency_max = max(stats.latency_max, latency_seconds)
+            stats.prompt_tokens += decision.prompt_tokens
+            stats.completion_tokens += estimate_tokens(response) if isinstance(response, str) else 0
+            self._steps[decision.step] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            tiers = {
+                tier: {
+                    "model": self.models[tier],
+                    "calls": s.calls,
+                    "escalatedAway": s.escalations_from,
+                    "avgLatencyMs": round(1000 * s.latency_total / s.calls, 1) if s.calls else 0.0,
+                    "maxLatencyMs": round(1000 * s.latency_max, 1),
+                    "promptTokensEst": s.prompt_tokens,
+                    "completionTokensEst": s.completion_tokens,
+                }
+                for tier, s in self._tiers.items()
+            }
+            return {"tiers": tiers, "steps": dict(self._steps), "escalations": dict(self._escalation_reasons)}
+
+
+# None khi tắt: mỗi LLM dùng model cố định của nó.
+model_router: Optional[ModelRouter] = (
+    ModelRouter(
+        models={
+            LIGHT: f"gemini/{settings.MODEL_TIER_LIGHT}",
+            STANDARD: f"gemini/{settings.MODEL_TIER_STANDARD}",
+            STRONG: f"gemini/{settings.MODEL_TIER_STRONG}",
+        },
+        long_prompt_tokens=settings.MODEL_TIER_LONG_PROMPT_TOKENS,
+        complexity_threshold=settings.MODEL_TIER_COMPLEXITY_THRESHOLD,
+    )
+    if settings.MODEL_TIERING_ENABLED else None
+)
@@ -0,0 +1,161 @@
+# app/llms/semantic_cache.py
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+from app.config.settings import settings
+from app.query_compiler.compiler import compile_query
+from app.streaming.coalescer import coalescing_key
+
+import logging
+log = logging.getLogger(__name__)
+log.info(f"Module '{__name__}' is being imported and processed.")
+
+try:
+    import numpy as np
+except ImportError:  # numpy đi kèm sentence-transformers; thiếu thì tầng ngữ nghĩa bị tắt
+    np = None
+
+
+def _numbers(query: str) -> FrozenSet[str]:
+    # Hai câu hỏi chỉ khác năm / hạng số ("2025" vs "2026") có embedding gần như trùng nhau,
+    # nhưng câu trả lời thì khác: các con số phải khớp tuyệt đối.
+    return frozenset(re.findall(r"\d+", query))
+
+
+def _params(query: str) -> Optional[FrozenSet[Tuple[str, str]]]:
+    # "AI conferences in Germany" / "... in Austria": embedding gần nhau nhưng bộ lọc khác.
+    # None khi bộ biên dịch không nhận ra bộ lọc nào (khi đó chỉ so embedding và số).
+    try:
+        compiled = compile_query(query)
+    except Exception as e:
+        log.warning(f"Query compiler failed in the semantic cache, treating the query as unfiltered: {e}")
+        return None
+    return frozenset(compiled.params) if compiled.search_query else None
+
+
+class _Answer:
+    __slots__ = ("query", "numbers", "params", "embedding", "answer", "stored_at")
+
+    def __init__(
+        self,
+        query: str,
+        numbers: FrozenSet[str],
+        params: Optional[FrozenSet[Tuple[str, str]]],
+        embedding: Any,
+        answer: str,
+        stored_at: float,
+    ):
+        self.query = query
+        self.numbers = numbers
+        self.params = params
+        self.embedding = embedding
+        self.answer = answer
+        self.stored_at = stored_at
+
+
+class SemanticAnswerCache:
+    """
+    Reuses a previous final answer for a new query whose embedding is within
+    `threshold` cosine similarity of a cached query. Both queries must mention the
+    same numbers and, when the query compiler recognizes filters in both, compile
+    to the same search parameters.
+
+    An answer is only reused while the tool results it was built from are still
+    fresh (`ttl_seconds`, aligned with the conference API cache TTL). The embedding
+    model is an optional dependency loaded lazily on CPU; without it the cache
+    simply never hits.
+    """
+
+    def __init__(self, model_name: str, threshold: float, ttl_seconds: float, max_entries: int):
+        self.model_name = model_name
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._answers: "OrderedDict[str, _Answer]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._model = None
+        self._load_failed = False
+        self._counters: Dict[str, int] = {"hits": 0, "misses": 0, "writes": 0}
+
+    # --- Embedding model (tải lười, giống chỉ mục cục bộ của MCP server) ---
+    def _get_model(self):
+        if self._model is not None or self._load_failed:
+            return self._model
+        with self._lock:
+            if self._model is None and not self._load_failed:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.model_name, device="cpu")
+                    log.info(f"Loaded semantic cache embedding model '{self.model_name}' on CPU.")
+                except Exception as e:
+                    self._load_failed = True
+                    log.warning(f"Semantic cache embedding model unavailable ({e}); semantic cache disabled.")
+        return self._model
+
+    def _embed(self, query: str):
+        model = self._get_model()
+        if model is None or np is None:
+            return None
+        return model.encode([query], normalize_embeddings=True, convert_to_numpy=True)[0].astype(np.float32)
+
+    # --- Public API ---
+    def lookup(self, query: str) -> Optional[Tuple[str, float]]:
+        """Returns (answer, similarity) of the closest fresh cached query above the threshold, or None."""
+        embedding = self._embed(query)
+        if embedding is None:
+            return None
+        numbers = _numbers(query)
+        params = _params(query)
+        now = time.time()
+        best: Optional[Tuple[str, float]] = None
+        with self._lock:
+            for key, entry in list(self._answers.items()):
+                if now - entry.stored_at > self.ttl_seconds:
+                    del self._answers[key]
+                    continue
+                if entry.numbers != numbers:
+                    continue
+                if params is not None and entry.params is not None and entry.params != params:
+                    continue
+                similarity = float(np.dot(entry.embedding, embedding))
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (entry.answer, similarity)
+            self._counters["hits" if best is not None else "misses"] += 1
+        return best
+
+    def store(self, query: str, answer: str) -> None:
+        embedding = self._embed(query)
+        if embedding is None or not answer:
+            return
+        key = coalescing_key(query)
+        with self._lock:
+            self._answers[key] = _Answer(query, _numbers(query), _params(query), embedding, answer, time.time())
+            self._answers.move_to_end(key)
+            while len(self._answers) > self.max_entries:
+                self._answers.popitem(last=False)
+            self._counters["writes"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counters)
+            stats["size"] = len(self._answers)
+        stats["threshold"] = self.threshold
+        stats["modelLoaded"] = self._model is not None
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+# None khi tắt: nơi gọi bỏ qua tầng ngữ nghĩa.
+semantic_answer_cache: Optional[SemanticAnswerCache] = (
+    SemanticAnswerCache(
+        model_name=settings.LLM_SEMANTIC_CACHE_MODEL,
+        threshold=settings.LLM_SEMANTIC_CACHE_THRESHOLD,
+        ttl_seconds=settings.LLM_SEMANTIC_CACHE_TTL_SECONDS,
+        max_entries=settings.LLM_SEMANTIC_CACHE_MAX_ENTRIES,
+    )
+    if settings.LLM_SEMANTIC_CACHE_ENABLED else None
+)
@@ -0,0 +1,106 @@
+# app/llms/tiered_llm.py
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from app.llms.cached_llm import CachedLLM
+from app.llms.router import ModelRouter, RouteDecision, estimate_tokens
+from app.observability.metrics import REGISTRY
+from app.observability.tracing import record_span
+
+LLM_CALL_SECONDS = REGISTRY.histogram(
+    "aicore_llm_call_duration_seconds", "Duration of one LLM call (cache hits included).", ["role", "tier", "step"]
+)
+# Ước lượng ~4 ký tự/token: CrewAI không trả usage thực tế cho lời gọi không có callback.
+LLM_TOKENS = REGISTRY.counter("aicore_llm_tokens", "Estimated LLM tokens.", ["role", "direction"])
+
+# Model được chọn cho lời gọi đang chạy trên thread này (LLM dùng chung cho mọi request).
+_thread_state = threading.local()
+
+
+@contextmanager
+def _use_model(model: str) -> Iterator[None]:
+    previous = getattr(_thread_state, "model", None)
+    _thread_state.model = model
+    try:
+        yield
+    finally:
+        _thread_state.model = previous
+
+
+class TieredLLM(CachedLLM):
+    """
+    CachedLLM whose model is chosen per call by a `ModelRouter`.
+
+    `self.model` stays the default (used when no router is set and by CrewAI for
+    context-window lookups); the routed model only replaces it in the completion
+    params and the cache key. A response the router rejects is retried one tier up.
+    """
+
+    def __init__(self, *args: Any, router: Optional[ModelRouter] = None, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.router = router
+
+    def active_model(self) -> str:
+        return getattr(_thread_state, "model", None) or self.model
+
+    def _prepare_completion_params(
+        self,
+        messages: Union[str, List[Dict[str, str]]],
+        tools: Optional[List[dict]] = None,
+    ) -> Dict[str, Any]:
+        params = super()._prepare_completion_params(messages, tools)
+        params["model"] = self.active_model()
+        return params
+
+    def call(
+        self,
+        messages: Union[str, List[Dict[str, str]]],
+        tools: Optional[List[dict]] = None,
+        callbacks: Optional[List[Any]] = None,
+        available_functions: Optional[Dict[str, Any]] = None,
+    ) -> Union[str, Any]:
+        if self.router is None:
+            return self._observed_call(None, messages, tools, callbacks, available_functions)
+
+        decision = self.router.route(self.llm_role, messages)
+        while True:
+            with _use_model(decision.model):
+                response = self._observed_call(decision, messages, tools, callbacks, available_functions)
+            reason = self.router.escalation_reason(decision, messages, response)
+            if reason is None:
+                return response
+            decision = self.router.escalate(decision, reason)
+
+    def _observed_call(
+        self,
+        decision: Optional[RouteDecision],
+        messages: Union[str, List[Dict[str, str]]],
+        tools: Optional[List[dict]],
+        callbacks: Optional[List[Any]],
+        available_functions: Optional[Dict[str, Any]],
+    ) -> Union[str, Any]:
+        """One call to the (routed) model, recorded as an `llm_call` span with estimated token counts."""
+        started = time.perf_counter()
+        response = super().call(messages, tools, callbacks, available_functions)
+        latency = time.perf_counter() - started
+
+        message_list = [{"role": "user", "content": messages}] if isinstance(messages, str) else messages
+        if decision is not None:
+            self.router.record(decision, response, latency)
+            step, tier, prompt_tokens = decision.step, decision.tier, decision.prompt_tokens
+        else:
+            step = ModelRouter.classify_step(self.llm_role, message_list)
+            tier = "fixed"
+            prompt_tokens = sum(estimate_tokens(str(m.get("content") or "")) for m in message_list)
+        completion_tokens = estimate_tokens(response) if isinstance(response, str) else 0
+
+        LLM_CALL_SECONDS.labels(self.llm_role, tier, step).observe(latency)
+        LLM_TOKENS.labels(self.llm_role, "prompt").inc(prompt_tokens)
+        LLM_TOKENS.labels(self.llm_role, "completion").inc(completion_tokens)
+        record_span(
+            "llm_call", latency, role=self.llm_role, tier=tier, step=step,
+            prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+        )
+        return response
@@ -13,28 +13,39 @@ log.info("========================================================")
 
 # 3. Import các thành phần khác
 log.info("Importing FastAPI...")
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 log.info("FastAPI imported successfully.")
 
 log.info("Importing API router from app.api.endpoints...")
 from app.api.endpoints import router as api_router
 log.info("API router imported successfully.")
 
+from app.crew import conference_session_pool
+from app.observability.metrics import REGISTRY, merge_expositions
 
-# 4. Khởi tạo ứng dụng FastAPI
+
+# 4. Lifespan của FastAPI: sở hữu các tài nguyên sống lâu (pool MCP session)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await conference_session_pool.start()
+    log.info("FastAPI startup complete. The application is fully configured and ready to accept requests.")
+    try:
+        yield
+    finally:
+        await conference_session_pool.close()
+
+# 5. Khởi tạo ứng dụng FastAPI
 log.info("Creating FastAPI app instance...")
 app = FastAPI(
     title="AI Core Service",
     description="Manages AI agent crews for the chatbot system.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 log.info("FastAPI app instance created.")
 
-# 5. Sử dụng sự kiện "startup" của FastAPI
-@app.on_event("startup")
-async def startup_event():
-    log.info("FastAPI 'startup' event triggered. The application is fully configured and ready to accept requests.")
-
 # 6. Gắn router vào ứng dụng
 log.info("Including API router into the app...")
 app.include_router(api_router, prefix="/api/v1")
@@ -46,4 +57,17 @@ def read_root():
     log.info("Root endpoint '/' was called.")
     return {"status": "AI Core Service is running"}
 
+# 8. Endpoint cho Prometheus: histogram thời gian từng giai đoạn, counter token và request.
+#    Các MCP server chạy stdio không có /metrics riêng: đọc resource 'metrics://prometheus'
+#    của từng server qua pool và gộp vào đây, phân biệt bằng nhãn mcp_slot.
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    body = REGISTRY.render()
+    try:
+        mcp_texts = await conference_session_pool.read_resource_all("metrics://prometheus")
+        body += merge_expositions({str(slot_id): text for slot_id, text in sorted(mcp_texts.items())}, "mcp_slot")
+    except Exception as e:
+        log.warning(f"Could not collect MCP server metrics: {e}")
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
+
 log.info("main.py file has been fully processed. Uvicorn will now take over.")
\ No newline at end of file
@@ -0,0 +1,265 @@
+# services/ai-core-py/app/mcp_client/session_pool.py
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+from app.observability.tracing import record_span
+
+import logging
+log = logging.getLogger(__name__)
+log.info(f"Module '{__name__}' is being imported and processed.")
+
+
+class MCPPoolExhaustedError(RuntimeError):
+    """Raised when no warm MCP session becomes available within the acquire timeout."""
+
+
+class _PooledSession:
+    """
+    One warm MCP server subprocess plus its initialized ClientSession.
+
+    The stdio transport is built on anyio cancel scopes, which must be entered and
+    exited by the same task. Each slot therefore owns a dedicated task that opens
+    the connection, parks until the slot is retired, and then tears it down.
+    """
+
+    def __init__(self, pool: "MCPSessionPool", slot_id: int):
+        self.pool = pool
+        self.slot_id = slot_id
+        self.session: Optional[ClientSession] = None
+        self.generation = 0
+        self.last_ok_at = 0.0
+        self.leases = 0
+        self.idle = False
+        # Đánh dấu bởi `discard`: không trả slot về pool mà tái tạo tiến trình MCP.
+        self.discarded = False
+        self._retire = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._own_connection(), name=f"mcp-pool-slot-{self.slot_id}")
+
+    def retire(self) -> None:
+        """Signals the owning task to close this connection (it will respawn unless the pool is closing)."""
+        self._retire.set()
+
+    async def wait_closed(self) -> None:
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _own_connection(self) -> None:
+        backoff = self.pool.respawn_backoff_seconds
+        while not self.pool.closing:
+            self._retire.clear()
+            started = time.perf_counter()
+            try:
+                async with stdio_client(self.pool.server_params) as (read, write):
+                    async with ClientSession(read, write) as session:
+                        await session.initialize()
+                        self.session = session
+                        self.generation += 1
+                        self.last_ok_at = time.monotonic()
+                        record_span("mcp_spawn", time.perf_counter() - started)
+                        log.info(
+                            f"MCP pool slot {self.slot_id} ready (generation {self.generation}) "
+                            f"in {time.perf_counter() - started:.2f}s."
+                        )
+                        backoff = self.pool.respawn_backoff_seconds
+                        self.pool._release_to_idle(self)
+                        await self._retire.wait()
+            except Exception as e:
+                log.error(f"MCP pool slot {self.slot_id} failed: {e}", exc_info=True)
+            finally:
+                self.session = None
+
+            if self.pool.closing:
+                break
+            log.warning(f"MCP pool slot {self.slot_id} is respawning in {backoff:.1f}s.")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self.pool.max_respawn_backoff_seconds)
+
+
+class MCPSessionPool:
+    """
+    Keeps a fixed number of warm MCP server subprocesses with initialized sessions.
+
+    Crew runs lease a session for their whole duration via `lease()`. Idle sessions
+    are pinged periodically; a session that fails its health check (or breaks while
+    leased) is retired and its slot respawns the subprocess in the background.
+    """
+
+    def __init__(
+        self,
+        server_params: StdioServerParameters,
+        size: int,
+        acquire_timeout_seconds: float = 30.0,
+        health_check_interval_seconds: float = 30.0,
+        ping_timeout_seconds: float = 5.0,
+        respawn_backoff_seconds: float = 0.5,
+        max_respawn_backoff_seconds: float = 30.0,
+    ):
+        if size < 1:
+            raise ValueError("MCP session pool size must be at least 1.")
+        self.server_params = server_params
+        self.size = size
+        self.acquire_timeout_seconds = acquire_timeout_seconds
+        self.health_check_interval_seconds = health_check_interval_seconds
+        self.ping_timeout_seconds = ping_timeout_seconds
+        self.respawn_backoff_seconds = respawn_backoff_seconds
+        self.max_respawn_backoff_seconds = max_respawn_backoff_seconds
+        self.closing = False
+        self._slots: List[_PooledSession] = []
+        self._idle: "asyncio.Queue[_PooledSession]" = asyncio.Queue()
+        self._health_task: Optional[asyncio.Task] = None
+        self._first_ready = asyncio.Event()
+
+    # --- Lifecycle ---
+    async def start(self, wait_ready: bool = True) -> None:
+        """Spawns all slots. With `wait_ready`, blocks until at least one session is usable."""
+        log.info(f"Starting MCP session pool with {self.size} warm session(s)...")
+        self._slots = [_PooledSession(self, slot_id) for slot_id in range(self.size)]
+        for slot in self._slots:
+            slot.start()
+        self._health_task = asyncio.create_task(self._health_loop(), name="mcp-pool-health")
+        if wait_ready:
+            await asyncio.wait_for(self._first_ready.wait(), timeout=self.acquire_timeout_seconds)
+        log.info("MCP session pool started.")
+
+    async def close(self) -> None:
+        log.info("Closing MCP session pool...")
+        self.closing = True
+        if self._health_task is not None:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+        for slot in self._slots:
+            slot.retire()
+        for slot in self._slots:
+            await slot.wait_closed()
+        log.info("MCP session pool closed.")
+
+    # --- Leasing ---
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[ClientSession]:
+        """
+        Leases a warm, healthy session for the duration of the `async with` block.
+        Raises MCPPoolExhaustedError if none becomes available in time.
+        """
+        slot = await self._acquire()
+        failed = False
+        try:
+            yield slot.session
+        except Exception:
+            failed = True
+            raise
+        finally:
+            if slot.discarded:
+                slot.discarded = False
+                slot.retire()
+            elif failed and not await self._ping(slot):
+                slot.retire()
+            else:
+                slot.last_ok_at = time.monotonic()
+                self._release_to_idle(slot)
+
+    def discard(self, session: ClientSession) -> None:
+        """
+        Marks a leased session so it is retired (and its server respawned) instead of being
+        returned to the pool, e.g. when a cancelled crew thread may still be using it.
+        """
+        for slot in self._slots:
+            if slot.session is session:
+                slot.discarded = True
+                return
+
+    async def _acquire(self) -> _PooledSession:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.acquire_timeout_seconds
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise MCPPoolExhaustedError(
+                    f"No MCP session became available within {self.acquire_timeout_seconds}s."
+                )
+            try:
+                slot = await asyncio.wait_for(self._idle.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                continue
+            slot.idle = False
+            if slot.session is None:
+                continue
+            # Chỉ ping lại nếu session đã "nguội" quá lâu, tránh thêm round trip cho mỗi request
+            stale = time.monotonic() - slot.last_ok_at > self.health_check_interval_seconds
+            if stale and not await self._ping(slot):
+                slot.retire()
+                continue
+            slot.leases += 1
+            return slot
+
+    def _release_to_idle(self, slot: _PooledSession) -> None:
+        # Một slot bị retire khi đang nằm trong hàng đợi sẽ tự quay lại sau khi respawn;
+        # cờ `idle` ngăn nó bị xếp hàng hai lần.
+        if not self.closing and slot.session is not None and not slot.idle:
+            slot.idle = True
+            self._idle.put_nowait(slot)
+            self._first_ready.set()
+
+    # --- Health checks ---
+    async def _ping(self, slot: _PooledSession) -> bool:
+        if slot.session is None:
+            return False
+        try:
+            await asyncio.wait_for(slot.session.send_ping(), timeout=self.ping_timeout_seconds)
+            slot.last_ok_at = time.monotonic()
+            return True
+        except Exception as e:
+            log.warning(f"MCP pool slot {slot.slot_id} failed health check: {e}")
+            return False
+
+    async def _health_loop(self) -> None:
+        while not self.closing:
+            await asyncio.sleep(self.health_check_interval_seconds)
+            # Chỉ kiểm tra các session đang rảnh; session đang được lease sẽ được kiểm tra khi trả về.
+            for _ in range(self._idle.qsize()):
+                try:
+                    slot = self._idle.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                slot.idle = False
+                if await self._ping(slot):
+                    self._release_to_idle(slot)
+                else:
+                    slot.retire()
+
+    # --- Resources ---
+    async def read_resource_all(self, uri: str) -> Dict[int, str]:
+        """
+        Reads `uri` from every running MCP server, leased or idle, and returns its text by slot id.
+        Slots that are down or do not answer within the ping timeout are left out.
+        """
+        async def read(slot: _PooledSession) -> str:
+            result = await asyncio.wait_for(slot.session.read_resource(uri), timeout=self.ping_timeout_seconds)
+            return "".join(getattr(content, "text", "") for content in result.contents)
+
+        # Một ClientSession nhận được nhiều request đồng thời, nên đọc cả session đang được lease.
+        slots = [slot for slot in self._slots if slot.session is not None]
+        results = await asyncio.gather(*(read(slot) for slot in slots), return_exceptions=True)
+        texts: Dict[int, str] = {}
+        for slot, result in zip(slots, results):
+            if isinstance(result, BaseException):
+                log.warning(f"MCP pool slot {slot.slot_id} could not read '{uri}': {result!r}")
+            else:
+                texts[slot.slot_id] = result
+        return texts
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "idle": self._idle.qsize(),
+            "ready": sum(1 for slot in self._slots if slot.session is not None),
+            "respawns": sum(max(slot.generation - 1, 0) for slot in self._slots),
+            "leases": sum(slot.leases for slot in self._slots),
+        }
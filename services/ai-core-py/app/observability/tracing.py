@@ -0,0 +1,95 @@
+# services/ai-core-py/app/observability/tracing.py
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.observability.metrics import REGISTRY
+
+import logging
+log = logging.getLogger(__name__)
+log.info(f"Module '{__name__}' is being imported and processed.")
+
+# Tiêu đề HTTP mang request id về cho gateway (để đối chiếu log hai phía).
+REQUEST_ID_HEADER = "X-Request-Id"
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "aicore_stage_duration_seconds",
+    "Duration of one stage of a chat request (MCP lease, crew build, LLM call, tool call, SSE...).",
+    ["stage"],
+)
+
+
+def new_request_id(conversation_id: str) -> str:
+    """Request id = conversation id + a short random suffix (one conversation has many requests)."""
+    return f"{conversation_id}:{uuid.uuid4().hex[:8]}"
+
+
+class RequestTrace:
+    """Spans recorded for one chat request; summarized in a single log line when the request ends."""
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        self._spans: List[Tuple[str, float, Dict[str, Any]]] = []
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float, attrs: Dict[str, Any]) -> None:
+        with self._lock:
+            self._spans.append((name, seconds, attrs))
+
+    def spans(self) -> List[Tuple[str, float, Dict[str, Any]]]:
+        with self._lock:
+            return list(self._spans)
+
+    def summary(self) -> str:
+        # Gộp theo tên span: "llm_call=3x/4.210s" dễ đọc hơn danh sách dài từng lời gọi.
+        totals: Dict[str, List[float]] = {}
+        for name, seconds, _ in self.spans():
+            totals.setdefault(name, []).append(seconds)
+        parts = [
+            f"{name}={len(values)}x/{sum(values):.3f}s" if len(values) > 1 else f"{name}={values[0]:.3f}s"
+            for name, values in totals.items()
+        ]
+        return f"request={self.request_id} total={time.perf_counter() - self.started:.3f}s " + " ".join(parts)
+
+
+# ContextVar thay cho thread-local: thấy được trong generator SSE và các task tạo từ endpoint.
+# Thread của executor (crew, LLM) không kế thừa context, nên phải gắn lại bằng `bind_trace`.
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def bind_trace(trace: Optional[RequestTrace]) -> Iterator[None]:
+    token = _current_trace.set(trace)
+    try:
+        yield
+    finally:
+        _current_trace.reset(token)
+
+
+def record_span(name: str, seconds: float, trace: Optional[RequestTrace] = None, **attrs: Any) -> None:
+    """Observes `seconds` in the stage histogram and appends the span to the request's trace."""
+    STAGE_SECONDS.labels(name).observe(seconds)
+    trace = trace or current_trace()
+    if trace is not None:
+        trace.add(name, seconds, attrs)
+    if log.isEnabledFor(logging.DEBUG):
+        details = " ".join(f"{key}={value}" for key, value in attrs.items())
+        log.debug(f"span request={trace.request_id if trace else '-'} {name}={seconds:.3f}s {details}")
+
+
+@contextmanager
+def span(name: str, trace: Optional[RequestTrace] = None, **attrs: Any) -> Iterator[Dict[str, Any]]:
+    """Times the block as one span. The yielded dict can be filled with attributes known only at the end."""
+    started = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        record_span(name, time.perf_counter() - started, trace, **attrs)
@@ -0,0 +1,303 @@
+# services/ai-core-py/app/query_compiler/compiler.py
+import calendar
+import re
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from app.config.settings import settings
+from app.routing.intent_router import normalize_query
+from app.query_compiler.gazetteer import (
+    ACCESS_TYPES,
+    CASE_SENSITIVE_COUNTRY_ALIASES,
+    CITIES,
+    CONTINENTS,
+    COUNTRIES,
+    DATE_CONTEXT_KEYS,
+    DETAIL_WORDS,
+    DIACRITIC_COUNTRY_ALIASES,
+    FILLER_WORDS,
+    FOLLOW_UP_WORDS,
+    KNOWN_ACRONYMS,
+    MONTHS,
+    TOPICS,
+)
+
+import logging
+log = logging.getLogger(__name__)
+log.info(f"Module '{__name__}' is being imported and processed.")
+
+# Thứ tự các khóa trong searchQuery đầu ra ('mode' luôn đứng đầu, phân trang đứng cuối).
+KEY_ORDER = [
+    "mode", "acronym", "topics", "cityStateProvince", "country", "continent", "rank", "source", "accessType",
+    "fromDate", "toDate", "subFromDate", "subToDate", "cameraReadyFromDate", "cameraReadyToDate",
+    "notificationFromDate", "notificationToDate", "registrationFromDate", "registrationToDate",
+    "perPage", "page",
+]
+MULTI_VALUED_KEYS = {"topics"}
+
+
+def _build_phrase_table() -> Dict[Tuple[str, ...], Tuple[str, str]]:
+    table: Dict[Tuple[str, ...], Tuple[str, str]] = {}
+    for key, vocabulary in (
+        ("accessType", ACCESS_TYPES),
+        ("topics", TOPICS),
+        ("cityStateProvince", CITIES),
+        ("continent", CONTINENTS),
+        ("country", COUNTRIES),
+    ):
+        for value, aliases in vocabulary.items():
+            for alias in aliases:
+                table[tuple(normalize_query(alias).split())] = (key, value)
+    return table
+
+
+_PHRASES = _build_phrase_table()
+_MAX_PHRASE_WORDS = max(len(phrase) for phrase in _PHRASES)
+_ACRONYMS_EXACT = set(KNOWN_ACRONYMS)
+_ACRONYMS_BY_UPPER = {acronym.upper(): acronym for acronym in KNOWN_ACRONYMS}
+_MONTH_ALIASES = {alias: month for month, aliases in MONTHS.items() for alias in aliases}
+_MONTH_ALT = "|".join(sorted(_MONTH_ALIASES, key=len, reverse=True))
+
+
+def _alternation(phrases: List[str]) -> str:
+    return r"\b(?:" + "|".join(re.escape(p) for p in sorted(phrases, key=len, reverse=True)) + r")\b"
+
+
+@dataclass
+class CompiledQuery:
+    search_query: str
+    confidence: float
+    reason: str
+    params: List[Tuple[str, str]] = field(default_factory=list)
+    unexplained: List[str] = field(default_factory=list)
+
+    @property
+    def confident(self) -> bool:
+        return bool(self.search_query) and self.confidence >= settings.QUERY_COMPILER_MIN_CONFIDENCE
+
+
+class _Scanner:
+    """Removes recognized spans from the normalized text while counting how many words they explained."""
+
+    def __init__(self, text: str):
+        self.text = f" {text} "
+        self.explained_words = 0
+
+    def take(
+        self, pattern: str, count: int = 0, accept: Optional[Callable[[re.Match], bool]] = None
+    ) -> List[re.Match]:
+        """Removes the matches of `pattern` (the first `count`, if set); with `accept`, only those it accepts."""
+        regex = re.compile(pattern)
+        matches = [m for m in regex.finditer(self.text) if accept is None or accept(m)]
+        if count:
+            matches = matches[:count]
+        if matches:
+            self.explained_words += sum(len(m.group(0).split()) for m in matches)
+            taken = {m.start() for m in matches}
+            self.text = regex.sub(lambda m: " " if m.start() in taken else m.group(0), self.text)
+        return matches
+
+
+class _Params:
+    def __init__(self):
+        self.values: Dict[str, List[str]] = {}
+        self.conflicts: List[str] = []
+
+    def add(self, key: str, value: str) -> None:
+        existing = self.values.setdefault(key, [])
+        if value in existing:
+            return
+        if existing and key not in MULTI_VALUED_KEYS:
+            self.conflicts.append(f"{key}={existing[0]}|{value}")
+        existing.append(value)
+
+    def set_range(self, keys: Tuple[str, str], start: date, end: date) -> None:
+        self.add(keys[0], start.isoformat())
+        self.add(keys[1], end.isoformat())
+
+    def ordered(self) -> List[Tuple[str, str]]:
+        return [(key, value) for key in KEY_ORDER for value in self.values.get(key, [])]
+
+
+def _valid_date(year: int, month: int, day: int = 1) -> bool:
+    # "thang 13", "31 thang 2": bỏ qua (không giải thích được) thay vì để date() ném ValueError.
+    return 1 <= year <= 9999 and 1 <= month <= 12 and 1 <= day <= calendar.monthrange(year, month)[1]
+
+
+def _iso_date(text: str) -> Optional[date]:
+    year, month, day = (int(part) for part in text.split("-"))
+    return date(year, month, day) if _valid_date(year, month, day) else None
+
+
+def _month_range(year: int, month: int) -> Tuple[date, date]:
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def _next_month(today: date) -> Tuple[int, int]:
+    return (today.year + 1, 1) if today.month == 12 else (today.year, today.month + 1)
+
+
+def _resolve_year_for_month(month: int, today: date) -> int:
+    # Tháng không kèm năm: hiểu là lần xuất hiện sắp tới của tháng đó.
+    return today.year if month >= today.month else today.year + 1
+
+
+def _extract_dates(scanner: _Scanner, params: _Params, keys: Tuple[str, str], today: date) -> None:
+    ranges: List[Tuple[date, date]] = []
+
+    for m in scanner.take(
+        r"\b(\d{4}-\d{2}-\d{2})\s+(?:to|den|until|au|al|bis|-)\s+(\d{4}-\d{2}-\d{2})\b",
+        accept=lambda m: _iso_date(m.group(1)) is not None and _iso_date(m.group(2)) is not None,
+    ):
+        ranges.append((_iso_date(m.group(1)), _iso_date(m.group(2))))
+    for m in scanner.take(
+        r"\b(?:on\s+|ngay\s+|le\s+)?(\d{4}-\d{2}-\d{2})\b", accept=lambda m: _iso_date(m.group(1)) is not None
+    ):
+        day = _iso_date(m.group(1))
+        ranges.append((day, day))
+
+    def day_range_year(m: re.Match) -> int:
+        month = int(m.group(3))
+        return int(m.group(4)) if m.group(4) else _resolve_year_for_month(month, today)
+
+    # "từ ngày 1 đến ngày 31 tháng 1 năm 2025"
+    for m in scanner.take(
+        r"\b(?:tu\s+)?(?:ngay\s+)?(\d{1,2})\s+(?:den|-)\s+(?:ngay\s+)?(\d{1,2})\s+thang\s+(\d{1,2})(?:\s+nam\s+(\d{4}))?\b",
+        accept=lambda m: all(_valid_date(day_range_year(m), int(m.group(3)), int(m.group(i))) for i in (1, 2)),
+    ):
+        month, year = int(m.group(3)), day_range_year(m)
+        ranges.append((date(year, month, int(m.group(1))), date(year, month, int(m.group(2)))))
+
+    for m in scanner.take(
+        r"\b(?:trong\s+|vao\s+)?thang\s+(\d{1,2})(?:\s+nam\s+(\d{4}))?\b",
+        accept=lambda m: _valid_date(int(m.group(2)) if m.group(2) else today.year, int(m.group(1))),
+    ):
+        month = int(m.group(1))
+        year = int(m.group(2)) if m.group(2) else _resolve_year_for_month(month, today)
+        ranges.append(_month_range(year, month))
+
+    # Tên tháng: bắt buộc có năm hoặc giới từ đứng trước để tránh nhầm "may"/"mar".
+    for m in scanner.take(
+        rf"\b(?:(?:in|en|vao|durante|im)\s+({_MONTH_ALT})(?:\s+(?:of\s+)?(\d{{4}}))?|({_MONTH_ALT})\s+(\d{{4}}))\b"
+    ):
+        alias = m.group(1) or m.group(3)
+        year_text = m.group(2) or m.group(4)
+        month = _MONTH_ALIASES[alias]
+        year = int(year_text) if year_text else _resolve_year_for_month(month, today)
+        ranges.append(_month_range(year, month))
+
+    relative = [
+        (r"\b(?:this year|nam nay|cette annee|este ano|dieses jahr)\b", lambda: (date(today.year, 1, 1), date(today.year, 12, 31))),
+        (r"\b(?:next year|nam sau|nam toi|l annee prochaine|annee prochaine|el proximo ano|proximo ano|nachstes jahr)\b",
+         lambda: (date(today.year + 1, 1, 1), date(today.year + 1, 12, 31))),
+        (r"\b(?:this month|thang nay|ce mois ci|ce mois|este mes|diesen monat)\b", lambda: _month_range(today.year, today.month)),
+        (r"\b(?:next month|thang sau|thang toi|le mois prochain|mois prochain|el proximo mes|proximo mes|nachsten monat)\b",
+         lambda: _month_range(*_next_month(today))),
+    ]
+    for pattern, resolve in relative:
+        for _ in scanner.take(pattern):
+            ranges.append(resolve())
+
+    for m in scanner.take(r"\b(?:in\s+|nam\s+|en\s+|trong\s+nam\s+|of\s+)?(20\d{2})\b"):
+        year = int(m.group(1))
+        ranges.append((date(year, 1, 1), date(year, 12, 31)))
+
+    for start, end in ranges:
+        params.set_range(keys, start, end)
+
+
+def compile_query(query: str, today: Optional[date] = None) -> CompiledQuery:
+    """
+    Compiles a natural-language conference request into the API's 'searchQuery' string
+    without an LLM. `confidence` is the share of meaningful words the compiler could
+    explain; anything it cannot fully account for should go to the worker agent.
+    """
+    today = today or date.today()
+    scanner = _Scanner(normalize_query(query))
+    params = _Params()
+
+    # 1. Các bí danh cần so khớp trên câu gốc (còn dấu hoặc phân biệt hoa thường).
+    folded = query.casefold()
+    for alias, country in DIACRITIC_COUNTRY_ALIASES.items():
+        if re.search(rf"(?<!\w){re.escape(alias)}(?!\w)", folded):
+            params.add("country", country)
+            scanner.take(rf"\b{re.escape(normalize_query(alias))}\b", count=1)
+    for alias, country in CASE_SENSITIVE_COUNTRY_ALIASES.items():
+        if re.search(rf"\b{alias}\b", query):
+            params.add("country", country)
+            scanner.take(rf"\b{alias.casefold()}\b", count=1)
+    for token in re.findall(r"\b[A-Za-z][A-Za-z0-9]{1,15}\b", query):
+        acronym = token if token in _ACRONYMS_EXACT else (_ACRONYMS_BY_UPPER.get(token) if token.isupper() else None)
+        if acronym:
+            params.add("acronym", acronym)
+            scanner.take(rf"\b{re.escape(token.casefold())}\b", count=1)
+
+    # 2. Chế độ chi tiết
+    if scanner.take(_alternation(DETAIL_WORDS)):
+        params.add("mode", "detail")
+
+    # 3. Xếp hạng và nguồn xếp hạng
+    for m in scanner.take(r"\bcore\s?(20\d{2})\b"):
+        params.add("source", f"CORE{m.group(1)}")
+    for m in scanner.take(r"\b(?:rank(?:ed|ing)?|xep hang|hang|class|rang|rango|core)\s+(a\*|a|b|c)(?=[\s])"):
+        params.add("rank", m.group(1).upper())
+    for _ in scanner.take(r"(?<=\s)a\*(?=\s)"):
+        params.add("rank", "A*")
+
+    # 4. Phân trang
+    for m in scanner.take(r"\b(?:page|trang|pagina|seite)\s+(\d{1,3})\b"):
+        params.add("page", m.group(1))
+    # Số lượng đứng trước danh từ "hội nghị" (có thể xen vài từ, vd. "top 10 NLP conferences").
+    for m in scanner.take(
+        r"\b(?:top\s+)?(\d{1,3})\b(?=(?:\s+\w+){0,3}?\s+(?:conferences?|hoi nghi|hoi thao|results?|ket qua|events?|conferencias?|konferenzen)\b)"
+    ):
+        params.add("perPage", m.group(1))
+    if "perPage" in params.values and "page" not in params.values:
+        params.add("page", "1")
+
+    # 5. Ngày tháng, áp vào cặp khóa theo ngữ cảnh (hạn nộp, camera-ready...) nếu có
+    date_keys = ("fromDate", "toDate")
+    for phrases, keys in DATE_CONTEXT_KEYS:
+        if scanner.take(_alternation(phrases)):
+            date_keys = keys
+            break
+    _extract_dates(scanner, params, date_keys, today)
+
+    # 6. Cụm từ trong từ điển (quốc gia, châu lục, thành phố, chủ đề, hình thức), khớp dài nhất trước
+    tokens = scanner.text.split()
+    leftover: List[str] = []
+    unexplained: List[str] = []
+    i = 0
+    while i < len(tokens):
+        for size in range(min(_MAX_PHRASE_WORDS, len(tokens) - i), 0, -1):
+            match = _PHRASES.get(tuple(tokens[i:i + size]))
+            if match:
+                params.add(*match)
+                scanner.explained_words += size
+                i += size
+                break
+        else:
+            leftover.append(tokens[i])
+            if tokens[i] not in FILLER_WORDS:
+                unexplained.append(tokens[i])
+            i += 1
+
+    # 7. Câu hỏi nối tiếp ("thêm 5 cái khác") cần ngữ cảnh hội thoại. Chỉ xét phần còn lại
+    #    để các cụm đã nhận diện như "trực tiếp" hay "next month" không bị hiểu nhầm.
+    if re.search(_alternation(FOLLOW_UP_WORDS), " ".join(leftover)):
+        return CompiledQuery("", 0.0, "follow-up request needs conversation context", unexplained=unexplained)
+
+    if params.conflicts:
+        return CompiledQuery("", 0.0, f"conflicting values: {params.conflicts}", unexplained=unexplained)
+
+    ordered = params.ordered()
+    filters = [key for key, _ in ordered if key not in ("mode", "perPage", "page")]
+    if not filters:
+        return CompiledQuery("", 0.0, "no search filter recognized", unexplained=unexplained)
+
+    explained = scanner.explained_words
+    confidence = explained / (explained + len(unexplained))
+    reason = "all words explained" if not unexplained else f"unexplained words: {unexplained[:5]}"
+    return CompiledQuery(urlencode(ordered), round(confidence, 3), reason, ordered, unexplained)
@@ -0,0 +1,245 @@
+# services/ai-core-py/app/query_compiler/gazetteer.py
+"""
+Multilingual vocabularies used by the query compiler.
+
+All aliases are written in normalized form (lowercase, no diacritics, see
+`app.routing.intent_router.normalize_query`); values are the English strings the
+conference API expects.
+"""
+
+COUNTRIES = {
+    "Vietnam": ["vietnam", "viet nam", "vn"],
+    "United States": ["united states", "united states of america", "usa", "hoa ky", "etats unis", "estados unidos", "vereinigte staaten", "america"],
+    "United Kingdom": ["united kingdom", "great britain", "britain", "england", "nuoc anh", "vuong quoc anh", "royaume uni", "reino unido", "angleterre"],
+    "Germany": ["germany", "duc", "allemagne", "alemania", "deutschland"],
+    "France": ["france", "phap", "francia", "frankreich"],
+    "Italy": ["italy", "nuoc y", "italie", "italia", "italien"],
+    "Spain": ["spain", "tay ban nha", "espagne", "espana", "spanien"],
+    "Portugal": ["portugal", "bo dao nha"],
+    "Netherlands": ["netherlands", "holland", "ha lan", "pays bas", "paises bajos", "niederlande"],
+    "Belgium": ["belgium", "nuoc bi", "belgique", "belgica", "belgien"],
+    "Switzerland": ["switzerland", "thuy si", "suisse", "suiza", "schweiz"],
+    "Austria": ["austria", "nuoc ao", "autriche", "osterreich"],
+    "Sweden": ["sweden", "thuy dien", "suede", "suecia", "schweden"],
+    "Norway": ["norway", "na uy", "norvege", "noruega", "norwegen"],
+    "Denmark": ["denmark", "dan mach", "danemark", "dinamarca"],
+    "Finland": ["finland", "phan lan", "finlande", "finlandia", "finnland"],
+    "Poland": ["poland", "ba lan", "pologne", "polonia", "polen"],
+    "Czech Republic": ["czech republic", "czechia", "cong hoa sec", "republique tcheque", "tchequie"],
+    "Greece": ["greece", "hy lap", "grece", "grecia", "griechenland"],
+    "Ireland": ["ireland", "ai len", "irlande", "irlanda", "irland"],
+    "Russia": ["russia", "nga", "russie", "rusia", "russland"],
+    "Turkey": ["turkey", "turkiye", "tho nhi ky", "turquie", "turquia", "turkei"],
+    "China": ["china", "trung quoc", "chine"],
+    "Japan": ["japan", "nhat ban", "japon"],
+    "South Korea": ["south korea", "korea", "han quoc", "coree du sud", "corea del sur", "sudkorea"],
+    "India": ["india", "an do", "inde", "indien"],
+    "Singapore": ["singapore", "singapour", "singapur"],
+    "Thailand": ["thailand", "thai lan", "thailande", "tailandia"],
+    "Malaysia": ["malaysia", "malaisie", "malasia"],
+    "Indonesia": ["indonesia", "indonesie"],
+    "Philippines": ["philippines", "phi lip pin", "philippin", "filipinas"],
+    "Taiwan": ["taiwan", "dai loan"],
+    "Hong Kong": ["hong kong", "hongkong"],
+    "United Arab Emirates": ["united arab emirates", "uae", "emirates", "cac tieu vuong quoc a rap thong nhat", "emirats arabes unis"],
+    "Saudi Arabia": ["saudi arabia", "a rap xe ut", "arabie saoudite"],
+    "Israel": ["israel"],
+    "Egypt": ["egypt", "ai cap", "egypte", "egipto"],
+    "South Africa": ["south africa", "nam phi", "afrique du sud", "sudafrica"],
+    "Morocco": ["morocco", "ma roc", "maroc", "marruecos"],
+    "Canada": ["canada"],
+    "Mexico": ["mexico", "mexique"],
+    "Brazil": ["brazil", "brasil", "bresil"],
+    "Argentina": ["argentina", "argentine"],
+    "Chile": ["chile", "chili"],
+    "Australia": ["australia", "nuoc uc", "australie", "australien"],
+    "New Zealand": ["new zealand", "nouvelle zelande", "nueva zelanda"],
+}
+
+# Viết tắt quốc gia chỉ được nhận khi viết HOA trong câu gốc (tránh nhầm "us" với đại từ).
+CASE_SENSITIVE_COUNTRY_ALIASES = {
+    "US": "United States",
+    "UK": "United Kingdom",
+}
+
+# Tên tiếng Việt ngắn, sau khi bỏ dấu sẽ trùng với từ thông dụng ("my", "y", "anh"...);
+# chỉ so khớp trên câu gốc còn dấu (đã casefold).
+DIACRITIC_COUNTRY_ALIASES = {
+    "mỹ": "United States",
+    "ý": "Italy",
+    "úc": "Australia",
+    "áo": "Austria",
+    "bỉ": "Belgium",
+    "séc": "Czech Republic",
+    "nhật": "Japan",
+    "anh quốc": "United Kingdom",
+}
+
+CONTINENTS = {
+    "Asia": ["asia", "chau a", "asie"],
+    "Europe": ["europe", "chau au", "europa"],
+    "North America": ["north america", "bac my", "amerique du nord", "america del norte", "nordamerika"],
+    "South America": ["south america", "nam my", "amerique du sud", "america del sur", "sudamerika"],
+    "Africa": ["africa", "chau phi", "afrique", "afrika"],
+    "Oceania": ["oceania", "chau dai duong", "oceanie", "ozeanien"],
+}
+
+CITIES = {
+    "Hanoi": ["hanoi", "ha noi"],
+    "Ho Chi Minh City": ["ho chi minh city", "ho chi minh", "tp hcm", "tphcm", "hcm", "sai gon", "saigon"],
+    "Da Nang": ["da nang", "danang"],
+    "Hue": ["hue"],
+    "Paris": ["paris"],
+    "Lyon": ["lyon"],
+    "London": ["london", "luan don", "londres"],
+    "Berlin": ["berlin"],
+    "Munich": ["munich", "munchen"],
+    "Vienna": ["vienna", "vienne", "wien", "viena"],
+    "Rome": ["rome", "roma"],
+    "Milan": ["milan", "milano"],
+    "Madrid": ["madrid"],
+    "Barcelona": ["barcelona", "barcelone"],
+    "Lisbon": ["lisbon", "lisbonne", "lisboa"],
+    "Amsterdam": ["amsterdam"],
+    "Prague": ["prague", "praha", "prag"],
+    "Stockholm": ["stockholm"],
+    "Copenhagen": ["copenhagen", "copenhague"],
+    "Helsinki": ["helsinki"],
+    "Zurich": ["zurich"],
+    "Tokyo": ["tokyo"],
+    "Kyoto": ["kyoto"],
+    "Osaka": ["osaka"],
+    "Seoul": ["seoul"],
+    "Beijing": ["beijing", "bac kinh", "pekin"],
+    "Shanghai": ["shanghai", "thuong hai"],
+    "Shenzhen": ["shenzhen", "tham quyen"],
+    "Taipei": ["taipei", "dai bac"],
+    "Bangkok": ["bangkok"],
+    "Kuala Lumpur": ["kuala lumpur"],
+    "Jakarta": ["jakarta"],
+    "Bali": ["bali"],
+    "Dubai": ["dubai"],
+    "New York": ["new york", "nyc"],
+    "San Francisco": ["san francisco"],
+    "Los Angeles": ["los angeles"],
+    "Boston": ["boston"],
+    "Seattle": ["seattle"],
+    "Chicago": ["chicago"],
+    "Honolulu": ["honolulu"],
+    "Toronto": ["toronto"],
+    "Vancouver": ["vancouver"],
+    "Montreal": ["montreal"],
+    "Sydney": ["sydney"],
+    "Melbourne": ["melbourne"],
+}
+
+TOPICS = {
+    "AI": ["ai"],
+    "Artificial Intelligence": ["artificial intelligence", "tri tue nhan tao", "intelligence artificielle", "inteligencia artificial", "kunstliche intelligenz"],
+    "Machine Learning": ["machine learning", "ml", "hoc may", "apprentissage automatique", "aprendizaje automatico"],
+    "Deep Learning": ["deep learning", "hoc sau", "apprentissage profond"],
+    "Natural Language Processing": ["natural language processing", "nlp", "xu ly ngon ngu tu nhien", "traitement du langage naturel"],
+    "Computer Vision": ["computer vision", "thi giac may tinh", "vision par ordinateur"],
+    "Data Science": ["data science", "khoa hoc du lieu", "science des donnees"],
+    "Data Mining": ["data mining", "khai pha du lieu"],
+    "Big Data": ["big data", "du lieu lon"],
+    "Databases": ["databases", "database", "co so du lieu"],
+    "Robotics": ["robotics", "robot", "robotique"],
+    "Cybersecurity": ["cybersecurity", "security", "an ninh mang", "bao mat", "cybersecurite", "securite"],
+    "Cryptography": ["cryptography", "mat ma", "cryptographie"],
+    "Software Engineering": ["software engineering", "ky nghe phan mem", "cong nghe phan mem", "genie logiciel"],
+    "Computer Networks": ["computer networks", "networking", "mang may tinh", "reseaux"],
+    "Internet of Things": ["internet of things", "iot", "internet van vat"],
+    "Cloud Computing": ["cloud computing", "dien toan dam may"],
+    "Distributed Systems": ["distributed systems", "he phan tan"],
+    "Human-Computer Interaction": ["human computer interaction", "hci", "tuong tac nguoi may"],
+    "Computer Graphics": ["computer graphics", "do hoa may tinh"],
+    "Bioinformatics": ["bioinformatics", "tin sinh hoc", "bioinformatique"],
+    "Information Retrieval": ["information retrieval", "truy hoi thong tin"],
+    "Blockchain": ["blockchain"],
+    "Quantum Computing": ["quantum computing", "dien toan luong tu", "informatique quantique"],
+    "Theoretical Computer Science": ["theoretical computer science", "theory of computation", "khoa hoc may tinh ly thuyet"],
+    "Embedded Systems": ["embedded systems", "he thong nhung"],
+    "Signal Processing": ["signal processing", "xu ly tin hieu"],
+    "Education Technology": ["education technology", "edtech", "cong nghe giao duc"],
+}
+
+ACCESS_TYPES = {
+    "Offline": ["offline", "in person", "in-person", "onsite", "on site", "truc tiep", "presentiel", "en presentiel", "presencial"],
+    "Online": ["online", "virtual", "truc tuyen", "en ligne", "virtuel", "virtuelle", "en linea"],
+    "Hybrid": ["hybrid", "ket hop", "hybride", "hibrido", "hibrida"],
+}
+
+# Viết tắt hội nghị phổ biến, theo đúng cách viết chuẩn.
+KNOWN_ACRONYMS = [
+    "AAAI", "IJCAI", "ICML", "NeurIPS", "ICLR", "CVPR", "ICCV", "ECCV", "ACL", "EMNLP", "NAACL", "COLING",
+    "EACL", "KDD", "WWW", "SIGIR", "SIGMOD", "VLDB", "ICDE", "CIKM", "WSDM", "RecSys", "SIGGRAPH", "CHI",
+    "UIST", "ICSE", "ASE", "ISSTA", "PLDI", "POPL", "OOPSLA", "CCS", "NDSS", "INFOCOM", "SIGCOMM",
+    "MobiCom", "NSDI", "OSDI", "SOSP", "EuroSys", "ISCA", "MICRO", "HPCA", "ASPLOS", "DAC", "ICRA", "IROS",
+    "AAMAS", "ECAI", "UAI", "AISTATS", "COLT", "ICDM", "PAKDD", "ECML", "ICCCI", "DaWaK", "ABZ",
+    "ACIIDS", "ICTAI", "ICASSP", "INTERSPEECH", "ISIT", "STOC", "FOCS", "SODA", "ICALP", "CAV", "LICS",
+    "CADE", "MEDES", "TAMC", "SOICT", "KSE", "RIVF", "ATC", "PRICAI", "ACCV", "ICPR", "BMVC", "WACV",
+]
+
+RANKS = ["A*", "A", "B", "C"]
+
+# Từ đệm / từ chức năng được coi là "đã hiểu" khi tính độ tin cậy.
+FILLER_WORDS = {
+    # English
+    "find", "search", "show", "list", "get", "give", "me", "us", "please", "conference", "conferences", "event",
+    "events", "about", "on", "in", "at", "the", "a", "an", "of", "for", "and", "or", "with", "to", "from", "any",
+    "all", "some", "which", "what", "are", "is", "there", "held", "taking", "place", "happening", "located",
+    "how", "many", "number", "count", "tell", "looking", "look", "information", "info", "related", "topic",
+    "topics", "i", "want", "need", "would", "like", "can", "you", "do", "have", "be", "will", "that", "tech",
+    "technology", "scientific", "international", "upcoming",
+    # Vietnamese (đã bỏ dấu)
+    "tim", "kiem", "tim kiem", "hoi", "nghi", "hoi nghi", "hoi thao", "ve", "tai", "o", "cac", "nhung", "cho",
+    "toi", "minh", "trong", "co", "nao", "bao", "nhieu", "to", "chuc", "dien", "ra", "duoc", "la", "gi", "nhe",
+    "giup", "hay", "liet", "ke", "thong", "tin", "chu", "de", "linh", "vuc", "nganh", "muon", "biet", "va",
+    "hoac", "ban", "oi", "xem", "nam", "thang", "ngay", "tu", "den", "quoc", "te", "khoa", "hoc", "bai", "nop",
+    # French / Spanish / German
+    "cherche", "chercher", "trouve", "trouver", "des", "les", "le", "la", "en", "sur", "dans", "et", "de", "du",
+    "conference", "conferences", "combien", "y", "il", "quelles", "quels", "buscar", "busca", "las", "los",
+    "el", "conferencia", "conferencias", "sobre", "suche", "konferenzen", "konferenz", "in", "uber", "und",
+}
+
+# Ngữ cảnh hạn chót: ngày tháng trong câu sẽ áp vào cặp khóa tương ứng thay vì fromDate/toDate.
+DATE_CONTEXT_KEYS = [
+    (["han nop bai", "han nop", "submission", "submit", "nop bai", "deadline", "soumission"], ("subFromDate", "subToDate")),
+    (["camera ready", "camera-ready", "ban cuoi"], ("cameraReadyFromDate", "cameraReadyToDate")),
+    (["notification", "thong bao ket qua", "ket qua"], ("notificationFromDate", "notificationToDate")),
+    (["registration", "dang ky", "inscription"], ("registrationFromDate", "registrationToDate")),
+]
+
+DETAIL_WORDS = [
+    "detail", "details", "detailed", "chi tiet", "call for papers", "cfp", "summary", "tom tat", "mo ta",
+    "description", "details complets", "detalles",
+]
+
+# Câu hỏi nối tiếp ("thêm 5 cái nữa") cần ngữ cảnh hội thoại: không tự biên dịch.
+FOLLOW_UP_WORDS = [
+    "more", "another", "other", "others", "different", "next", "them", "nua", "khac", "tiep", "tiep theo",
+    "autres", "encore", "mas", "otros", "weitere",
+]
+
+# Câu hỏi về các kết quả đã hiển thị ("cái nào trong số đó tổ chức online?"): trả lời từ kết quả đã lấy.
+RESULT_REFERENCE_WORDS = [
+    "them", "those", "these", "which of", "which one", "the first", "the second", "the third", "the last",
+    "first one", "second one", "third one", "last one", "chung", "nhung cai", "cai nao", "cai dau", "cai cuoi",
+    "trong so do", "ceux", "celles", "esos", "esas", "diese",
+]
+
+MONTHS = {
+    1: ["january", "jan", "janvier", "enero", "januar"],
+    2: ["february", "feb", "fevrier", "febrero", "februar"],
+    3: ["march", "mar", "mars", "marzo", "marz"],
+    4: ["april", "apr", "avril", "abril"],
+    5: ["may", "mai", "mayo"],
+    6: ["june", "jun", "juin", "junio", "juni"],
+    7: ["july", "jul", "juillet", "julio", "juli"],
+    8: ["august", "aug", "aout", "agosto"],
+    9: ["september", "sep", "sept", "septembre", "septiembre"],
+    10: ["october", "oct", "octobre", "octubre", "oktober"],
+    11: ["november", "nov", "novembre", "noviembre"],
+    12: ["december", "dec", "decembre", "diciembre", "dezember"],
+}
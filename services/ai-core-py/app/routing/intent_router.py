@@ -0,0 +1,140 @@
+# services/ai-core-py/app/routing/intent_router.py
+import asyncio
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import List
+
+from app.config.settings import settings
+from app.llms.gemini import sub_agent_llm
+
+import logging
+log = logging.getLogger(__name__)
+log.info(f"Module '{__name__}' is being imported and processed.")
+
+GREETING = "greeting"
+SMALL_TALK = "small_talk"
+CONFERENCE = "conference"
+UNKNOWN = "unknown"
+
+# Tất cả mẫu đều ở dạng đã chuẩn hóa: chữ thường, bỏ dấu, bỏ dấu câu (xem `normalize_query`).
+GREETING_PHRASES = {
+    "hello", "hi", "hey", "hi there", "hello there", "good morning", "good afternoon", "good evening",
+    "xin chao", "chao", "chao ban", "chao bot", "alo", "hello ban", "hi ban",
+    "bonjour", "salut", "bonsoir", "hola", "buenos dias", "hallo", "guten tag", "ciao",
+}
+# Cảm ơn / tạm biệt / xác nhận: không hợp với câu chào soạn sẵn nên đi qua LLM trực tiếp.
+CLOSING_PHRASES = {
+    "thanks", "thank you", "thank you so much", "cam on", "cam on ban", "cam on nhieu", "merci", "gracias", "danke",
+    "bye", "goodbye", "see you", "tam biet", "au revoir", "adios",
+    "ok", "okay", "oke", "great", "nice", "cool",
+}
+SMALL_TALK_PATTERNS = [
+    r"\bhow are you\b", r"\bwho are you\b", r"\bwhat can you do\b", r"\bwhat is your name\b",
+    r"\bban (la ai|ten gi|khoe khong|co khoe khong|lam duoc gi|giup duoc gi)\b",
+    r"\bcomment (ca va|vas tu)\b", r"\bqui es[- ]tu\b", r"\bcomo estas\b",
+]
+# Tín hiệu mạnh cho thấy câu hỏi cần tới crew + MCP.
+CONFERENCE_PATTERNS = [
+    r"\bconferen\w*", r"\bhoi nghi\b", r"\bhoi thao\b", r"\bsymposi\w*", r"\bworkshop\w*", r"\bsummit\w*",
+    r"\bcongres\w*", r"\bkonferenz\w*", r"\bcall for papers?\b", r"\bcfp\b", r"\bdeadline\w*", r"\bhan nop\b",
+    r"\bsubmission\w*", r"\bcamera[- ]ready\b", r"\bnotification\b", r"\bcore\s?20\d\d\b", r"\brank\w*\b",
+    r"\bhang [ab]\*?\b", r"\bbai bao\b", r"\bpaper\w*\b", r"\bvenue\w*\b", r"\bacm\b", r"\bieee\b",
+]
+# Viết tắt hội nghị kiểu ICML, NeurIPS, SIGGRAPH (kiểm tra trên chuỗi gốc, trước khi hạ chữ thường).
+ACRONYM_PATTERN = re.compile(r"\b(?:[A-Z]{3,}[a-zA-Z]*|[A-Z][a-z]+[A-Z]{2,}\w*)\b")
+
+_SMALL_TALK_RE = [re.compile(p) for p in SMALL_TALK_PATTERNS]
+_CONFERENCE_RE = [re.compile(p) for p in CONFERENCE_PATTERNS]
+
+CANNED_GREETING_VI = "Xin chào! Mình có thể giúp bạn tìm thông tin về các hội nghị công nghệ: thời gian, địa điểm, hạn nộp bài, xếp hạng... Bạn đang quan tâm hội nghị nào?"
+CANNED_GREETING_EN = "Hello! I can help you find information about tech conferences: dates, locations, submission deadlines, rankings and more. What are you looking for?"
+
+SMALL_TALK_SYSTEM_PROMPT = (
+    "You are the friendly assistant of a chatbot that helps users find information about technology "
+    "conferences. Reply briefly and warmly to the user's small talk, in the same language as the user. "
+    "If it fits, mention that you can help find conferences by topic, location, date, or ranking."
+)
+
+
+@dataclass
+class IntentDecision:
+    intent: str
+    confidence: float
+    reason: str
+
+    @property
+    def use_fast_path(self) -> bool:
+        return (
+            settings.INTENT_ROUTER_ENABLED
+            and self.intent in (GREETING, SMALL_TALK)
+            and self.confidence >= settings.INTENT_ROUTER_CONFIDENCE_THRESHOLD
+        )
+
+
+def normalize_query(query: str) -> str:
+    """Lowercases, strips diacritics (incl. Vietnamese 'đ') and punctuation, and collapses whitespace."""
+    text = query.casefold().replace("đ", "d")
+    text = "".join(c for c in unicodedata.normalize("NFD", text) if unicodedata.category(c) != "Mn")
+    text = re.sub(r"[^\w\s*-]", " ", text)
+    return " ".join(text.split())
+
+
+def classify_intent(query: str) -> IntentDecision:
+    """
+    Cheap rule-based pre-classifier. Anything that looks conference-related, or that
+    it is unsure about, is left for the crew; only clear greetings and chit-chat
+    are marked for the fast path.
+    """
+    normalized = normalize_query(query)
+    tokens: List[str] = normalized.split()
+
+    if not tokens:
+        return IntentDecision(GREETING, 0.9, "empty message")
+
+    conference_hits = [p.pattern for p in _CONFERENCE_RE if p.search(normalized)]
+    if ACRONYM_PATTERN.search(query):
+        conference_hits.append("acronym")
+    if conference_hits:
+        confidence = min(0.99, 0.8 + 0.05 * len(conference_hits))
+        return IntentDecision(CONFERENCE, confidence, f"conference signals: {conference_hits[:3]}")
+
+    if normalized in GREETING_PHRASES:
+        return IntentDecision(GREETING, 0.97, "exact greeting phrase")
+    if normalized in CLOSING_PHRASES:
+        return IntentDecision(SMALL_TALK, 0.95, "exact thanks/farewell phrase")
+
+    for pattern in _SMALL_TALK_RE:
+        if pattern.search(normalized) and len(tokens) <= 8:
+            return IntentDecision(SMALL_TALK, 0.9, f"small-talk pattern {pattern.pattern}")
+
+    # Lời chào theo sau bởi vài từ (vd. "hi there bot", "xin chao ban nhe").
+    for size in (3, 2, 1):
+        if " ".join(tokens[:size]) in GREETING_PHRASES:
+            remaining = len(tokens) - size
+            if remaining <= 2:
+                return IntentDecision(GREETING, 0.9 - 0.03 * remaining, "greeting prefix on a short message")
+            return IntentDecision(UNKNOWN, 0.5, "greeting prefix followed by a longer request")
+
+    return IntentDecision(UNKNOWN, 0.4, "no rule matched")
+
+
+_VIETNAMESE_CHARS = re.compile(r"[ăâđêôơưạảấầẩẫậắằẳẵặẹẻẽếềểễệỉịọỏốồổỗộớờởỡợụủứừửữựỳỵỷỹ]")
+
+
+def _looks_vietnamese(query: str) -> bool:
+    return bool(_VIETNAMESE_CHARS.search(query.casefold())) or normalize_query(query).startswith(("xin chao", "chao"))
+
+
+async def answer_small_talk(query: str, decision: IntentDecision) -> str:
+    """Answers greetings/chit-chat with a canned reply or a single direct LLM call, bypassing the crew."""
+    if decision.intent == GREETING and settings.INTENT_ROUTER_CANNED_GREETINGS:
+        return CANNED_GREETING_VI if _looks_vietnamese(query) else CANNED_GREETING_EN
+
+    messages = [
+        {"role": "system", "content": SMALL_TALK_SYSTEM_PROMPT},
+        {"role": "user", "content": query},
+    ]
+    # LLM.call là hàm đồng bộ; chạy trong thread riêng để không chặn event loop
+    # (to_thread sao chép context, nên lời gọi vẫn thuộc trace của request).
+    return await asyncio.to_thread(sub_agent_llm.call, messages)
@@ -0,0 +1,205 @@
+# services/ai-core-py/app/runtime/admission.py
+import asyncio
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+from app.config.settings import settings
+from app.runtime.cancellation import ClientDisconnected
+
+import logging
+log = logging.getLogger(__name__)
+log.info(f"Module '{__name__}' is being imported and processed.")
+
+# Thread pool riêng cho các lượt chạy crew (kickoff và lời gọi LLM tổng hợp), thay cho
+# executor mặc định của asyncio. Kích thước bằng số lượt chạy được phép đồng thời.
+crew_executor = ThreadPoolExecutor(
+    max_workers=settings.CREW_MAX_CONCURRENT_RUNS,
+    thread_name_prefix="crew-worker",
+)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot even be queued; the client should retry later."""
+
+    def __init__(self, reason: str, retry_after_seconds: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after_seconds = retry_after_seconds
+
+
+class AdmissionTicket:
+    """A request's place in the admission queue; holds a crew slot once granted."""
+
+    def __init__(self, controller: "AdmissionController", user_id: str):
+        self.user_id = user_id
+        self.enqueued_at = time.monotonic()
+        self._controller = controller
+        self._granted = asyncio.get_running_loop().create_future()
+        self._changed = asyncio.Event()
+        self._released = False
+
+    @property
+    def granted(self) -> bool:
+        return self._granted.done()
+
+    async def wait_for_slot(self, timeout_seconds: float, stop: Optional[asyncio.Event] = None) -> AsyncIterator[int]:
+        """
+        Yields this ticket's queue position whenever it changes, until a slot is granted.
+        Raises AdmissionRejected if no slot frees up within `timeout_seconds`, and
+        ClientDisconnected (leaving the queue) as soon as `stop` is set.
+        """
+        deadline = time.monotonic() + timeout_seconds
+        last_position = None
+        while not self.granted:
+            if stop is not None and stop.is_set():
+                self.cancel()
+                raise ClientDisconnected()
+            position = self._controller.position(self)
+            if position != last_position:
+                last_position = position
+                yield position
+            self._changed.clear()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._controller.timed_out += 1
+                self.cancel()
+                raise AdmissionRejected("Timed out waiting for a free crew worker.", self._controller.retry_after_seconds)
+            waiters = {asyncio.ensure_future(self._changed.wait())}
+            if stop is not None:
+                waiters.add(asyncio.ensure_future(stop.wait()))
+            try:
+                await asyncio.wait(waiters | {self._granted}, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for waiter in waiters:
+                    waiter.cancel()
+
+    def release(self) -> None:
+        """Frees the slot (or leaves the queue). Safe to call more than once."""
+        if self._released:
+            return
+        self._released = True
+        self._controller._on_release(self)
+
+    # Rời hàng đợi (client ngắt kết nối, hết thời gian chờ) hay trả slot đều như nhau.
+    cancel = release
+
+
+class AdmissionController:
+    """
+    Bounds how many crew runs execute at once and how many requests may wait.
+
+    Waiting requests are kept in one FIFO per user and served round-robin across
+    users, so one user sending a burst cannot starve everybody else. When the wait
+    queue (or the user's share of it) is full, new requests are rejected immediately.
+    """
+
+    def __init__(self, max_concurrent: int, max_queued: int, max_queued_per_user: int, retry_after_seconds: float):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.max_queued_per_user = max_queued_per_user
+        self.retry_after_seconds = retry_after_seconds
+        self._active = 0
+        self._waiting: "OrderedDict[str, Deque[AdmissionTicket]]" = OrderedDict()
+        self._queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def rejection_reason(self, user_id: str) -> Optional[str]:
+        """Returns why a new request from `user_id` would be rejected right now, or None."""
+        if self._active < self.max_concurrent and not self._queued:
+            return None
+        if self._queued >= self.max_queued:
+            return "The server is busy; the request queue is full."
+        if len(self._waiting.get(user_id, ())) >= self.max_queued_per_user:
+            return "Too many of your requests are already waiting."
+        return None
+
+    def check(self, user_id: str) -> None:
+        """Raises AdmissionRejected if a request from `user_id` cannot be admitted or queued."""
+        reason = self.rejection_reason(user_id)
+        if reason is not None:
+            self.rejected += 1
+            raise AdmissionRejected(reason, self.retry_after_seconds)
+
+    def enqueue(self, user_id: str) -> AdmissionTicket:
+        self.check(user_id)
+        ticket = AdmissionTicket(self, user_id)
+        if self._active < self.max_concurrent and not self._queued:
+            self._grant(ticket)
+        else:
+            self._waiting.setdefault(user_id, deque()).append(ticket)
+            self._queued += 1
+            self._notify_waiters()
+        return ticket
+
+    def position(self, ticket: AdmissionTicket) -> int:
+        """1-based number of the turn this ticket will get under round-robin service."""
+        queue = self._waiting.get(ticket.user_id)
+        if not queue or ticket not in queue:
+            return 0
+        index = queue.index(ticket)
+        users = list(self._waiting)
+        own_rank = users.index(ticket.user_id)
+        # Mỗi vòng phục vụ một request của mỗi người dùng; người đứng trước trong vòng được thêm một lượt.
+        ahead = index
+        for rank, user_id in enumerate(users):
+            if rank != own_rank:
+                ahead += min(len(self._waiting[user_id]), index + (1 if rank < own_rank else 0))
+        return ahead + 1
+
+    def _grant(self, ticket: AdmissionTicket) -> None:
+        self._active += 1
+        self.admitted += 1
+        ticket._granted.set_result(None)
+
+    def _on_release(self, ticket: AdmissionTicket) -> None:
+        if ticket.granted:
+            self._active -= 1
+        else:
+            queue = self._waiting.get(ticket.user_id)
+            if queue is not None and ticket in queue:
+                queue.remove(ticket)
+                self._queued -= 1
+                if not queue:
+                    del self._waiting[ticket.user_id]
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        while self._active < self.max_concurrent and self._waiting:
+            user_id, queue = next(iter(self._waiting.items()))
+            ticket = queue.popleft()
+            self._queued -= 1
+            if queue:
+                # Round-robin: người dùng vừa được phục vụ xuống cuối hàng.
+                self._waiting.move_to_end(user_id)
+            else:
+                del self._waiting[user_id]
+            self._grant(ticket)
+        self._notify_waiters()
+
+    def _notify_waiters(self) -> None:
+        for queue in self._waiting.values():
+            for ticket in queue:
+                ticket._changed.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "maxConcurrent": self.max_concurrent,
+            "active": self._active,
+            "queued": self._queued,
+            "waitingUsers": len(self._waiting),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timedOut": self.timed_out,
+        }
+
+
+admission_controller = AdmissionController(
+    max_concurrent=settings.CREW_MAX_CONCURRENT_RUNS,
+    max_queued=settings.CREW_MAX_QUEUED_REQUESTS,
+    max_queued_per_user=settings.CREW_MAX_QUEUED_PER_USER,
+    retry_after_seconds=settings.CREW_BUSY_RETRY_AFTER_SECONDS,
+)
@@ -0,0 +1,105 @@
+# services/ai-core-py/app/runtime/cancellation.py
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Optional
+
+from crewai.utilities.events import (
+    crewai_event_bus,
+    LLMCallStartedEvent,
+    LLMStreamChunkEvent,
+    ToolUsageStartedEvent,
+)
+
+import logging
+log = logging.getLogger(__name__)
+log.info(f"Module '{__name__}' is being imported and processed.")
+
+
+class ClientDisconnected(Exception):
+    """The SSE client went away before the answer was ready."""
+
+
+class CrewCancelled(BaseException):
+    """
+    Aborts a crew run at its next LLM or tool step.
+
+    Derives from BaseException on purpose: CrewAI's event bus, agent executor and tool
+    wrapper catch `Exception` and would otherwise turn it into an error message that
+    the agent simply retries.
+    """
+
+
+class CancellationToken:
+    """Thread-safe cancellation flag shared by the request, the kickoff thread and tool calls."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], Any]] = []
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str) -> None:
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        log.info(f"Crew run cancelled: {reason}")
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                log.warning(f"Cancellation callback failed: {e}")
+
+    def add_callback(self, callback: Callable[[], Any]) -> Callable[[], None]:
+        """Runs `callback` on cancellation (immediately if already cancelled); returns an unregister function."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._discard(callback)
+        callback()
+        return lambda: None
+
+    def _discard(self, callback: Callable[[], Any]) -> None:
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise CrewCancelled(self.reason)
+
+
+# --- Liên kết token với thread đang chạy kickoff (giống bind_event_stream) ---
+_thread_state = threading.local()
+
+
+def current_cancellation() -> Optional[CancellationToken]:
+    return getattr(_thread_state, "cancel_token", None)
+
+
+@contextmanager
+def bind_cancellation(token: Optional[CancellationToken]) -> Iterator[None]:
+    previous = current_cancellation()
+    _thread_state.cancel_token = token
+    try:
+        yield
+    finally:
+        _thread_state.cancel_token = previous
+
+
+# Trước mỗi lời gọi LLM, mỗi chunk stream và mỗi lần dùng tool, thread của crew kiểm tra
+# token của mình; ném CrewCancelled sẽ dừng kickoff thay vì tiếp tục tốn quota Gemini.
+def _check_cancelled(source: Any, event: Any) -> None:
+    token = current_cancellation()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+for _event_type in (LLMCallStartedEvent, LLMStreamChunkEvent, ToolUsageStartedEvent):
+    crewai_event_bus.register_handler(_event_type, _check_cancelled)
@@ -0,0 +1,187 @@
+# services/ai-core-py/app/runtime/cassette.py
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from app.config.settings import settings
+from app.llms.llm_cache import llm_cache_key
+
+import logging
+log = logging.getLogger(__name__)
+log.info(f"Module '{__name__}' is being imported and processed.")
+
+RECORD = "record"
+REPLAY = "replay"
+CASSETTE_VERSION = 1
+# Tham số do runtime thêm vào lời gọi tool, thay đổi theo từng lần chạy: không dùng để khớp.
+_VOLATILE_TOOL_ARGUMENTS = {"timeoutSeconds", "requestId"}
+_SAFE_NAME = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+class CassetteMiss(LookupError):
+    """Replay found no recorded interaction for a call (strict mode, or the cassette is exhausted)."""
+
+
+def _tool_key(name: str, arguments: Dict[str, Any]) -> str:
+    stable = {k: v for k, v in arguments.items() if k not in _VOLATILE_TOOL_ARGUMENTS}
+    material = json.dumps({"name": name, "arguments": stable}, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _llm_key(messages: Any, tools: Optional[List[dict]]) -> str:
+    # Không gồm model: một cassette vẫn khớp khi bộ định tuyến chọn tầng model khác.
+    return llm_cache_key("", None, messages, tools)
+
+
+class Cassette:
+    """
+    Every LLM request/response and MCP tool call of one chat request, with its latency.
+
+    In record mode, interactions are appended as they happen and `save()` writes them
+    as gzip-compressed JSON lines. In replay mode, each call is answered from the
+    recording instead of Gemini or the MCP server: by exact request hash first, then
+    (unless `strict`) by call order, so a run with edited prompts still replays.
+    Latency is replayed as recorded, or skipped with `zero_latency`.
+    """
+
+    def __init__(self, mode: str, path: str, meta: Optional[Dict[str, Any]] = None,
+                 entries: Optional[List[Dict[str, Any]]] = None, zero_latency: bool = False, strict: bool = False):
+        self.mode = mode
+        self.path = path
+        self.meta: Dict[str, Any] = dict(meta or {})
+        self.zero_latency = zero_latency
+        self.strict = strict
+        self._entries: List[Dict[str, Any]] = list(entries or [])
+        self._lock = threading.Lock()
+        # Trạng thái replay: hàng đợi theo key và theo thứ tự gọi, cho mỗi loại (llm / tool).
+        self._by_key: Dict[str, Deque[int]] = {}
+        self._in_order: Dict[str, Deque[int]] = {"llm": deque(), "tool": deque()}
+        self._used: set = set()
+        for index, entry in enumerate(self._entries):
+            self._by_key.setdefault(entry["key"], deque()).append(index)
+            self._in_order[entry["kind"]].append(index)
+
+    # --- Tạo / lưu / nạp ---
+    @classmethod
+    def recording(cls, request_id: str, **meta: Any) -> "Cassette":
+        path = os.path.join(settings.CASSETTE_DIR, f"{_SAFE_NAME.sub('_', request_id)}.jsonl.gz")
+        return cls(RECORD, path, meta={"requestId": request_id, **meta})
+
+    @classmethod
+    def load(cls, path: str, zero_latency: bool = False, strict: bool = False) -> "Cassette":
+        meta: Dict[str, Any] = {}
+        entries: List[Dict[str, Any]] = []
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                if record.get("kind") == "meta":
+                    meta = record
+                else:
+                    entries.append(record)
+        return cls(REPLAY, path, meta=meta, entries=entries, zero_latency=zero_latency, strict=strict)
+
+    @classmethod
+    def for_replay(cls, name: str) -> "Cassette":
+        """Loads a cassette by file name from CASSETTE_DIR (never an arbitrary path from a client)."""
+        path = os.path.join(settings.CASSETTE_DIR, os.path.basename(name))
+        return cls.load(
+            path,
+            zero_latency=settings.CASSETTE_REPLAY_LATENCY == "zero",
+            strict=settings.CASSETTE_REPLAY_STRICT,
+        )
+
+    def save(self, **meta: Any) -> Optional[str]:
+        if self.mode != RECORD:
+            return None
+        self.meta.update(meta)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._lock:
+            entries = list(self._entries)
+        with gzip.open(self.path, "wt", encoding="utf-8") as f:
+            header = {"kind": "meta", "version": CASSETTE_VERSION, "recordedAt": time.time(), **self.meta}
+            f.write(json.dumps(header, ensure_ascii=False) + "\n")
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+        log.info(f"Saved cassette with {len(entries)} interaction(s) to {self.path}")
+        return self.path
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == REPLAY
+
+    # --- Ghi ---
+    def _append(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            entry["seq"] = len(self._entries)
+            self._entries.append(entry)
+
+    def record_llm(self, role: str, messages: Any, tools: Optional[List[dict]], response: Any, latency: float) -> None:
+        self._append({
+            "kind": "llm", "key": _llm_key(messages, tools), "role": role, "latency": round(latency, 4),
+            "messages": messages, "tools": tools, "response": response,
+        })
+
+    def record_tool(self, name: str, arguments: Dict[str, Any], output: str, latency: float) -> None:
+        self._append({
+            "kind": "tool", "key": _tool_key(name, arguments), "name": name, "latency": round(latency, 4),
+            "arguments": {k: v for k, v in arguments.items() if k not in _VOLATILE_TOOL_ARGUMENTS}, "output": output,
+        })
+
+    # --- Phát lại ---
+    def _take(self, kind: str, key: str, description: str) -> Dict[str, Any]:
+        with self._lock:
+            index = self._pop_unused(self._by_key.get(key))
+            if index is None and not self.strict:
+                index = self._pop_unused(self._in_order[kind])
+                if index is not None:
+                    log.info(f"Cassette {os.path.basename(self.path)}: no exact match for {description}; replaying call #{index} in order.")
+            if index is None:
+                raise CassetteMiss(f"Cassette {os.path.basename(self.path)} has no recorded {description}.")
+            self._used.add(index)
+            return self._entries[index]
+
+    def _pop_unused(self, queue: Optional[Deque[int]]) -> Optional[int]:
+        while queue:
+            index = queue.popleft()
+            if index not in self._used:
+                return index
+        return None
+
+    def replay_llm(self, messages: Any, tools: Optional[List[dict]]) -> Dict[str, Any]:
+        return self._take("llm", _llm_key(messages, tools), "LLM call")
+
+    def replay_tool(self, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        return self._take("tool", _tool_key(name, arguments), f"'{name}' tool call")
+
+    def delay(self, entry: Dict[str, Any]) -> float:
+        return 0.0 if self.zero_latency else float(entry.get("latency") or 0.0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            kinds = [entry["kind"] for entry in self._entries]
+            return {"mode": self.mode, "llm": kinds.count("llm"), "tool": kinds.count("tool"), "replayed": len(self._used)}
+
+
+# --- Liên kết cassette với request (giống trace: ContextVar, gắn lại trong thread executor) ---
+_current_cassette: ContextVar[Optional[Cassette]] = ContextVar("cassette", default=None)
+
+
+def current_cassette() -> Optional[Cassette]:
+    return _current_cassette.get()
+
+
+@contextmanager
+def bind_cassette(cassette: Optional[Cassette]) -> Iterator[None]:
+    token = _current_cassette.set(cassette)
+    try:
+        yield
+    finally:
+        _current_cassette.reset(token)
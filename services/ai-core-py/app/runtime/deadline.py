@@ -0,0 +1,117 @@
+# services/ai-core-py/app/runtime/deadline.py
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Optional, Tuple
+
+from crewai.utilities.events import (
+    crewai_event_bus,
+    LLMCallStartedEvent,
+    ToolUsageFinishedEvent,
+)
+
+from app.config.settings import settings
+from app.runtime.cancellation import CrewCancelled
+
+import logging
+log = logging.getLogger(__name__)
+log.info(f"Module '{__name__}' is being imported and processed.")
+
+# Header cho phép gateway truyền ngân sách thời gian (mili giây) thay vì đặt trong body.
+DEADLINE_HEADER = "X-Request-Deadline-Ms"
+
+
+class DeadlineReached(CrewCancelled):
+    """The request's time budget is nearly spent; the crew stops so a partial answer can be returned."""
+
+
+class Deadline:
+    """
+    A per-request time budget, measured from when the request arrived.
+
+    Every blocking step (queue wait, LLM call, MCP call, upstream fetch) derives its
+    timeout from the remaining time. Tool outputs seen along the way are kept so a
+    partial answer can be built if the budget runs out.
+    """
+
+    def __init__(self, budget_seconds: float):
+        self.budget_seconds = budget_seconds
+        self.expires_at = time.monotonic() + budget_seconds
+        self._lock = threading.Lock()
+        self._findings: List[Tuple[str, str]] = []
+
+    @classmethod
+    def for_request(cls, body_deadline_ms: Optional[int], header_value: Optional[str]) -> "Deadline":
+        """Builds the deadline from the request body or header, capped at REQUEST_MAX_DEADLINE_SECONDS."""
+        budget_ms: Optional[float] = body_deadline_ms
+        if budget_ms is None and header_value:
+            try:
+                budget_ms = float(header_value)
+            except ValueError:
+                log.warning(f"Ignoring malformed {DEADLINE_HEADER} header: {header_value!r}")
+        budget = budget_ms / 1000.0 if budget_ms and budget_ms > 0 else settings.REQUEST_DEFAULT_DEADLINE_SECONDS
+        return cls(min(budget, settings.REQUEST_MAX_DEADLINE_SECONDS))
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def running_low(self) -> bool:
+        """True once only the reserve kept for the partial answer is left."""
+        return self.remaining() <= settings.DEADLINE_RESERVE_SECONDS
+
+    def timeout(self, cap: Optional[float] = None, floor: float = 1.0) -> float:
+        """Timeout for the next blocking step: the remaining time, bounded by `cap`, never below `floor`."""
+        remaining = self.remaining()
+        if cap is not None:
+            remaining = min(remaining, cap)
+        return max(remaining, floor)
+
+    # --- Kết quả trung gian cho câu trả lời một phần ---
+    def add_finding(self, source: str, text: str) -> None:
+        if text:
+            with self._lock:
+                self._findings.append((source, text))
+
+    def findings(self) -> List[Tuple[str, str]]:
+        with self._lock:
+            return list(self._findings)
+
+
+# --- Liên kết deadline với thread đang chạy kickoff (giống bind_cancellation) ---
+_thread_state = threading.local()
+
+
+def current_deadline() -> Optional[Deadline]:
+    return getattr(_thread_state, "deadline", None)
+
+
+@contextmanager
+def bind_deadline(deadline: Optional[Deadline], enforce: bool = True) -> Iterator[None]:
+    """
+    Binds `deadline` to the current thread. LLM calls then time out at the deadline; with
+    `enforce`, a call that would start inside the reserve is refused (DeadlineReached).
+    """
+    previous = (current_deadline(), getattr(_thread_state, "enforce", True))
+    _thread_state.deadline, _thread_state.enforce = deadline, enforce
+    try:
+        yield
+    finally:
+        _thread_state.deadline, _thread_state.enforce = previous
+
+
+def _on_llm_call_started(source: Any, event: LLMCallStartedEvent) -> None:
+    deadline = current_deadline()
+    if deadline is not None and getattr(_thread_state, "enforce", True) and deadline.running_low:
+        # Không bắt đầu thêm bước suy luận nào: phần thời gian còn lại dành cho câu trả lời một phần.
+        raise DeadlineReached(f"deadline reached with {deadline.remaining():.1f}s left")
+
+
+def _on_tool_finished(source: Any, event: ToolUsageFinishedEvent) -> None:
+    deadline = current_deadline()
+    if deadline is not None and event.output is not None:
+        deadline.add_finding(event.tool_name, str(event.output))
+
+
+crewai_event_bus.register_handler(LLMCallStartedEvent, _on_llm_call_started)
+crewai_event_bus.register_handler(ToolUsageFinishedEvent, _on_tool_finished)
@@ -0,0 +1,188 @@
+# services/ai-core-py/app/streaming/coalescer.py
+import asyncio
+import re
+import time
+import unicodedata
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from app.streaming.crew_events import CrewEventStream
+from app.runtime.cancellation import CancellationToken, ClientDisconnected
+
+import logging
+log = logging.getLogger(__name__)
+log.info(f"Module '{__name__}' is being imported and processed.")
+
+
+def coalescing_key(query: str) -> str:
+    """
+    Normalizes a chat query for coalescing: case, punctuation and whitespace are
+    ignored, but diacritics are kept (in Vietnamese they change the meaning).
+    """
+    text = unicodedata.normalize("NFC", query).casefold()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+class _Subscriber:
+    __slots__ = ("wakeup", "closed")
+
+    def __init__(self):
+        self.wakeup = asyncio.Event()
+        self.closed = False
+
+
+class SharedCrewRun:
+    """
+    One crew run whose SSE events can be consumed by several requests.
+
+    Events are buffered as they arrive, so a subscriber that joins late first
+    replays everything emitted so far and then follows the live stream. When the
+    last subscriber leaves before the run finishes, the run is cancelled.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        start: Callable[[CrewEventStream, CancellationToken], Awaitable[str]],
+        queue_size: int,
+    ):
+        self.key = key
+        self.started_at = time.monotonic()
+        self.cancel_token = CancellationToken()
+        self._events: List[Dict[str, Any]] = []
+        self._finished = False
+        self._subscribers: Set[_Subscriber] = set()
+        self._stream = CrewEventStream(asyncio.get_running_loop(), maxsize=queue_size)
+        self._task = asyncio.create_task(start(self._stream, self.cancel_token))
+        self._pump_task = asyncio.create_task(self._pump())
+
+    @property
+    def done(self) -> bool:
+        return self._finished or self.cancel_token.cancelled
+
+    def add_done_callback(self, callback: Callable[["SharedCrewRun"], None]) -> None:
+        self._pump_task.add_done_callback(lambda _: callback(self))
+
+    async def _pump(self) -> None:
+        try:
+            async for event in self._stream.events_until(self._task):
+                self._events.append(event)
+                self._wake_subscribers()
+        finally:
+            self._finished = True
+            self._wake_subscribers()
+
+    def _wake_subscribers(self) -> None:
+        for subscriber in self._subscribers:
+            subscriber.wakeup.set()
+
+    def cancel(self, reason: str) -> None:
+        """Stops the run: the crew thread aborts at its next LLM/tool step and the task is cancelled."""
+        self.cancel_token.cancel(reason)
+        self._task.cancel()
+
+    async def subscribe(self, stop: Optional[asyncio.Event] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yields every event of the run from the beginning until the run finishes.
+        Raises ClientDisconnected as soon as `stop` is set (the client went away).
+        """
+        subscriber = _Subscriber()
+        self._subscribers.add(subscriber)
+        stop_watch = asyncio.ensure_future(self._close_when(stop, subscriber)) if stop is not None else None
+        position = 0
+        try:
+            while True:
+                subscriber.wakeup.clear()
+                batch = self._events[position:]
+                position += len(batch)
+                for event in batch:
+                    yield event
+                if self._finished and position >= len(self._events):
+                    return
+                if subscriber.closed:
+                    raise ClientDisconnected()
+                await subscriber.wakeup.wait()
+        finally:
+            if stop_watch is not None:
+                stop_watch.cancel()
+            self._subscribers.discard(subscriber)
+            if not self._subscribers and not self._finished:
+                self.cancel("all clients disconnected")
+
+    @staticmethod
+    async def _close_when(stop: asyncio.Event, subscriber: _Subscriber) -> None:
+        await stop.wait()
+        subscriber.closed = True
+        subscriber.wakeup.set()
+
+    async def result(self) -> str:
+        # shield: một subscriber bị hủy không được hủy lượt chạy mà các subscriber khác đang chờ.
+        return await asyncio.shield(self._task)
+
+
+class ChatCoalescer:
+    """
+    Lets identical chat queries arriving within `window_seconds` of each other share
+    one crew run instead of each launching their own. When disabled, every request
+    gets a fresh, unshared run.
+    """
+
+    def __init__(self, enabled: bool, window_seconds: float):
+        self.enabled = enabled
+        self.window_seconds = window_seconds
+        self._runs: Dict[str, SharedCrewRun] = {}
+        self.runs_started = 0
+        self.requests_coalesced = 0
+
+    def joinable(self, query: str, scope: str = "") -> Optional[SharedCrewRun]:
+        """
+        Returns the in-flight run an identical query could join right now, if any.
+        Only runs started with the same `scope` (e.g. a conversation) can be joined.
+        """
+        if not self.enabled:
+            return None
+        run = self._runs.get(self._key(query, scope))
+        if run is not None and not run.done and time.monotonic() - run.started_at <= self.window_seconds:
+            return run
+        return None
+
+    def join_or_start(
+        self,
+        query: str,
+        start: Callable[[CrewEventStream, CancellationToken], Awaitable[str]],
+        queue_size: int,
+        scope: str = "",
+    ) -> Tuple[SharedCrewRun, bool]:
+        """Returns (run, started) where `started` is False when an in-flight run was joined."""
+        run = self.joinable(query, scope)
+        if run is not None:
+            self.requests_coalesced += 1
+            log.info(f"Coalesced chat request onto an in-flight crew run (key={run.key!r}).")
+            return run, False
+
+        key = self._key(query, scope)
+        run = SharedCrewRun(key, start, queue_size)
+        self.runs_started += 1
+        if self.enabled:
+            self._runs[key] = run
+            run.add_done_callback(self._forget)
+        return run, True
+
+    @staticmethod
+    def _key(query: str, scope: str) -> str:
+        return f"{scope}\x1f{coalescing_key(query)}" if scope else coalescing_key(query)
+
+    def _forget(self, run: SharedCrewRun) -> None:
+        if self._runs.get(run.key) is run:
+            del self._runs[run.key]
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.runs_started + self.requests_coalesced
+        return {
+            "enabled": self.enabled,
+            "windowSeconds": self.window_seconds,
+            "crewRuns": self.runs_started,
+            "coalescedRequests": self.requests_coalesced,
+            "inFlight": len(self._runs),
+            "coalescingRatio": round(self.requests_coalesced / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,205 @@
+# services/ai-core-py/app/streaming/crew_events.py
+import asyncio
+import json
+import threading
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+from crewai.utilities.events import (
+    crewai_event_bus,
+    LLMCallStartedEvent,
+    LLMStreamChunkEvent,
+    ToolUsageErrorEvent,
+    ToolUsageFinishedEvent,
+    ToolUsageStartedEvent,
+)
+
+import logging
+log = logging.getLogger(__name__)
+log.info(f"Module '{__name__}' is being imported and processed.")
+
+# Tên các tool mà CrewAI tự thêm cho manager khi allow_delegation=True.
+DELEGATION_TOOL_NAMES = {"Delegate work to coworker", "Ask question to coworker"}
+# Marker của định dạng ReAct; chỉ stream token sau marker này (câu trả lời cuối).
+FINAL_ANSWER_MARKER = "Final Answer:"
+# Giới hạn độ dài preview của output tool gửi cho client.
+TOOL_OUTPUT_PREVIEW_CHARS = 200
+
+class CrewEventStream:
+    """
+    Carries crew progress events from the executor thread running `kickoff` to the
+    async SSE generator in `invoke_chat`.
+
+    Events go through a bounded asyncio.Queue owned by the server event loop. Emitting
+    from the executor thread blocks for at most `put_timeout_seconds` when the client
+    is slow (backpressure), then drops the event rather than stalling the crew.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int = 256, put_timeout_seconds: float = 1.0):
+        self.loop = loop
+        self.put_timeout_seconds = put_timeout_seconds
+        self.dropped = 0
+        # Khi True, mọi token của LLM được stream (dùng khi LLM trả lời trực tiếp, không theo ReAct).
+        self.stream_all_tokens = False
+        self._queue: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=maxsize)
+        self._loop_thread_id = threading.get_ident()
+        # Trạng thái lọc token của lần gọi LLM hiện tại của manager
+        self._llm_text = ""
+        self._in_final_answer = False
+
+    # --- Producer side (any thread) ---
+    def emit(self, event: Dict[str, Any]) -> None:
+        self._put(event)
+
+    def _put(self, item: Any) -> None:
+        if threading.get_ident() == self._loop_thread_id:
+            # Gọi từ chính event loop (vd. MCPConferenceTool._arun): không được block.
+            try:
+                self._queue.put_nowait(item)
+            except asyncio.QueueFull:
+                self.dropped += 1
+            return
+        future = asyncio.run_coroutine_threadsafe(self._queue.put(item), self.loop)
+        try:
+            future.result(timeout=self.put_timeout_seconds)
+        except Exception:
+            future.cancel()
+            self.dropped += 1
+
+    # --- Consumer side (event loop) ---
+    async def events_until(self, task: "asyncio.Future[Any]") -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yields events as they arrive until `task` (the crew run) completes, then drains
+        whatever is still queued. Emitters wait for their put to land, so nothing
+        emitted before the crew returned can be missed.
+        """
+        while not task.done():
+            getter = asyncio.ensure_future(self._queue.get())
+            await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                yield getter.result()
+            else:
+                getter.cancel()
+        while not self._queue.empty():
+            yield self._queue.get_nowait()
+        if self.dropped:
+            log.warning(f"Crew event stream dropped {self.dropped} event(s) due to a slow consumer.")
+
+    # --- Manager token filtering ---
+    def _on_llm_call_started(self) -> None:
+        self._llm_text = ""
+        self._in_final_answer = self.stream_all_tokens
+
+    def _on_llm_chunk(self, chunk: str) -> None:
+        """Forwards only the tokens of the manager's 'Final Answer', not its ReAct scaffolding."""
+        if self._in_final_answer:
+            self.emit({"type": "token", "content": chunk})
+            return
+        self._llm_text += chunk
+        marker_at = self._llm_text.find(FINAL_ANSWER_MARKER)
+        if marker_at != -1:
+            self._in_final_answer = True
+            remainder = self._llm_text[marker_at + len(FINAL_ANSWER_MARKER):].lstrip()
+            if remainder:
+                self.emit({"type": "token", "content": remainder})
+
+
+# --- Liên kết stream với thread đang chạy kickoff ---
+# Event bus của CrewAI là singleton toàn cục và gọi handler đồng bộ trên thread phát
+# sự kiện, nên thread-local cho biết sự kiện thuộc về request nào.
+_thread_state = threading.local()
+
+
+def current_event_stream() -> Optional[CrewEventStream]:
+    return getattr(_thread_state, "event_stream", None)
+
+
+@contextmanager
+def bind_event_stream(stream: Optional[CrewEventStream]) -> Iterator[None]:
+    previous = current_event_stream()
+    _thread_state.event_stream = stream
+    try:
+        yield
+    finally:
+        _thread_state.event_stream = previous
+
+
+# LLM mà token của nó được stream cho client (manager tổng hợp câu trả lời cuối).
+_streamed_llms: list = []
+
+
+def stream_tokens_from(llm: Any) -> None:
+    """Registers an LLM whose final-answer tokens should be forwarded to the client."""
+    _streamed_llms.append(llm)
+
+
+def _is_streamed_llm(source: Any) -> bool:
+    return any(source is llm for llm in _streamed_llms)
+
+
+def _parse_tool_args(tool_args: Any) -> Dict[str, Any]:
+    if isinstance(tool_args, dict):
+        return tool_args
+    try:
+        parsed = json.loads(tool_args)
+        return parsed if isinstance(parsed, dict) else {}
+    except (TypeError, ValueError):
+        return {}
+
+
+@crewai_event_bus.on(ToolUsageStartedEvent)
+def _on_tool_started(source: Any, event: ToolUsageStartedEvent) -> None:
+    stream = current_event_stream()
+    if stream is None:
+        return
+    args = _parse_tool_args(event.tool_args)
+    if event.tool_name in DELEGATION_TOOL_NAMES:
+        stream.emit({
+            "type": "delegation",
+            "coworker": args.get("coworker"),
+            "task": args.get("task") or args.get("question"),
+        })
+    else:
+        stream.emit({
+            "type": "tool_start",
+            "tool": event.tool_name,
+            "agent": event.agent_role,
+            "searchQuery": args.get("searchQuery"),
+        })
+
+
+@crewai_event_bus.on(ToolUsageFinishedEvent)
+def _on_tool_finished(source: Any, event: ToolUsageFinishedEvent) -> None:
+    stream = current_event_stream()
+    if stream is None or event.tool_name in DELEGATION_TOOL_NAMES:
+        return
+    output = str(event.output) if event.output is not None else ""
+    stream.emit({
+        "type": "tool_finish",
+        "tool": event.tool_name,
+        "searchQuery": _parse_tool_args(event.tool_args).get("searchQuery"),
+        "duration_ms": int((event.finished_at - event.started_at).total_seconds() * 1000),
+        "from_cache": event.from_cache,
+        "preview": output[:TOOL_OUTPUT_PREVIEW_CHARS],
+    })
+
+
+@crewai_event_bus.on(ToolUsageErrorEvent)
+def _on_tool_error(source: Any, event: ToolUsageErrorEvent) -> None:
+    stream = current_event_stream()
+    if stream is not None:
+        stream.emit({"type": "tool_error", "tool": event.tool_name, "message": str(event.error)})
+
+
+@crewai_event_bus.on(LLMCallStartedEvent)
+def _on_llm_call_started(source: Any, event: LLMCallStartedEvent) -> None:
+    stream = current_event_stream()
+    if stream is not None and _is_streamed_llm(source):
+        stream._on_llm_call_started()
+
+
+@crewai_event_bus.on(LLMStreamChunkEvent)
+def _on_llm_chunk(source: Any, event: LLMStreamChunkEvent) -> None:
+    stream = current_event_stream()
+    if stream is not None and _is_streamed_llm(source) and event.chunk:
+        stream._on_llm_chunk(event.chunk)
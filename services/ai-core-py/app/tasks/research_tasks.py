@@ -12,4 +12,33 @@ conference_research_task = Task(
     expected_output=(
         "A comprehensive and helpful answer to the user. This could be a simple greeting, a direct answer to a question, or a formatted list of conferences provided by the specialist agent."
     ),
-)
\ No newline at end of file
+)
+
+# Prompt cho đường tắt: searchQuery đã được biên dịch cục bộ và tool đã chạy,
+# chỉ còn một lần gọi LLM để tổng hợp câu trả lời.
+direct_answer_prompt = (
+    "Answer the user's request: '{query}'.\n"
+    "A conference search was already run with the query string '{search_query}'. Its result was:\n"
+    "{tool_output}\n\n"
+    "Write a complete and helpful answer to the user, in the same language as the request, using only these results. "
+    "If the request asks how many conferences match, give the count. "
+    "If the result is empty or an error, say so plainly and suggest how the user could broaden the search."
+)
+
+# Prompt dùng khi ngân sách thời gian của request sắp hết: trả lời từ những gì crew đã thu thập được.
+partial_answer_prompt = (
+    "Answer the user's request: '{query}'.\n"
+    "There was not enough time to finish the full research. These are the results gathered so far:\n"
+    "{findings}\n\n"
+    "Write the best answer you can from these results only, in the same language as the request. "
+    "Keep it short, and say briefly that the answer may be incomplete."
+)
+
+# Prompt cho câu hỏi nối tiếp về các kết quả đã hiển thị trong hội thoại ("which of them are online?").
+follow_up_answer_prompt = (
+    "Answer the user's follow-up request: '{query}'.\n"
+    "Their previous request was: '{previous_query}'. The conference searches already run for it returned:\n"
+    "{results}\n\n"
+    "Answer in the same language as the request, using only these results. "
+    "If they do not contain what the user asks for, say so plainly and suggest asking for a new search."
+)
@@ -0,0 +1,71 @@
+# app/tools/conference_api_client.py
+import random
+import time
+from typing import Any, Dict, List
+
+import httpx
+from app.config.settings import settings
+
+import logging
+log = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class UpstreamError(Exception):
+    """The upstream API answered, but without a usable 'payload'."""
+
+
+class ConferenceAPIClient:
+    """
+    Client for the confhub conference API used by the in-process CrewAI tools.
+
+    CrewAI calls tool `_run` methods synchronously from its worker threads, so this
+    uses a thread-safe `httpx.Client`: one shared keep-alive pool, connect/read
+    deadlines on every request, and full-jitter retries for transport errors,
+    429 and 5xx responses.
+    """
+
+    def __init__(self):
+        self.base_url = settings.CONFERENCE_API_URL
+        self.max_retries = settings.CONFERENCE_API_MAX_RETRIES
+        self.backoff_base = settings.CONFERENCE_API_BACKOFF_BASE_SECONDS
+        self.backoff_max = settings.CONFERENCE_API_BACKOFF_MAX_SECONDS
+        self._client = httpx.Client(
+            timeout=httpx.Timeout(
+                settings.CONFERENCE_API_READ_TIMEOUT_SECONDS,
+                connect=settings.CONFERENCE_API_CONNECT_TIMEOUT_SECONDS,
+            ),
+            limits=httpx.Limits(max_connections=settings.CONFERENCE_API_MAX_CONNECTIONS),
+        )
+
+    def fetch_payload(self, params: Dict[str, List[str]]) -> Any:
+        """Fetches and returns the raw 'payload' for the given query params. Raises on failure."""
+        api_result = self._get_with_retries(params).json()
+        if "payload" not in api_result:
+            raise UpstreamError(api_result.get('errorMessage', 'Unknown error'))
+        return api_result["payload"]
+
+    def _get_with_retries(self, params: Dict[str, List[str]]) -> httpx.Response:
+        attempt = 0
+        while True:
+            try:
+                response = self._client.get(self.base_url, params=params)
+                if response.status_code not in RETRYABLE_STATUS_CODES or attempt >= self.max_retries:
+                    response.raise_for_status()
+                    return response
+                log.warning(f"Upstream returned {response.status_code} (attempt {attempt + 1}); retrying.")
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries:
+                    raise
+                log.warning(f"Upstream transport error (attempt {attempt + 1}): {e!r}; retrying.")
+            # "Full jitter": ngẫu nhiên trong [0, min(max, base * 2^attempt)] để tránh các retry dồn cục.
+            time.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt))))
+            attempt += 1
+
+    def close(self) -> None:
+        self._client.close()
+
+
+# Client dùng chung cho cả tiến trình để tái sử dụng kết nối keep-alive.
+conference_api_client = ConferenceAPIClient()
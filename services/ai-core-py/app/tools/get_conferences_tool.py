@@ -1,11 +1,18 @@
 # app/tools/get_conferences_tool.py
-import requests
+import httpx
 import json # Import thư viện json
 from typing import Type
 from urllib.parse import parse_qs
 from crewai.tools import BaseTool
 from pydantic import BaseModel, Field
-from app.config.settings import settings
+from app.tools.conference_api_client import UpstreamError, conference_api_client
+
+
+def _fetch_payload(searchQuery: str):
+    # Phân tích chuỗi searchQuery thành một dictionary rồi truyền vào `params`.
+    # Ví dụ: "rank=B&country=Vietnam" -> {'rank': ['B'], 'country': ['Vietnam']}
+    return conference_api_client.fetch_payload(parse_qs(searchQuery))
+
 
 class GetConferencesInput(BaseModel):
     searchQuery: str = Field(description="The user's specific query or topic to search for conferences.")
@@ -22,36 +29,20 @@ class GetConferencesTool(BaseTool):
 
     def _run(self, searchQuery: str) -> str:
         try:
-            # BƯỚC 1: Phân tích chuỗi searchQuery thành một dictionary.
-            # Ví dụ: "rank=B&country=Vietnam" -> {'rank': ['B'], 'country': ['Vietnam']}
-            params_dict = parse_qs(searchQuery)
-
-            # BƯỚC 2: Truyền dictionary đã phân tích vào tham số `params`.
-            # `requests` sẽ tự động tạo URL đúng: ...?rank=B&country=Vietnam
-            response = requests.get(
-                settings.CONFERENCE_API_URL,
-                params=params_dict
-            )
-            response.raise_for_status()
-            api_result = response.json()
-
-
-            # SỬA LỖI Ở ĐÂY:
-            # 1. Kiểm tra sự tồn tại của key "payload" thay vì "success".
-            # 2. Trả về nội dung của "payload" dưới dạng chuỗi JSON.
-            if "payload" in api_result and api_result["payload"]:
+            # Crew dùng tool MCP (có cache phản hồi ở MCP server); tool này gọi thẳng API.
+            payload = _fetch_payload(searchQuery)
+
+            if payload:
                 # Chuyển đổi list/dict trong payload thành một chuỗi JSON
                 # để agent có thể đọc và xử lý.
-                return json.dumps(api_result["payload"])
-            elif "payload" in api_result and not api_result["payload"]:
-                return "No conferences found matching your criteria."
-            else:
-                # Giữ lại logic báo lỗi nếu có errorMessage
-                return f"Error from API: {api_result.get('errorMessage', 'Unknown error')}"
-
-        except requests.exceptions.RequestException as e:
+                return json.dumps(payload)
+            return "No conferences found matching your criteria."
+
+        except UpstreamError as e:
+            return f"Error from API: {e}"
+        except httpx.HTTPError as e:
             return f"Error: Network error while fetching conferences: {e}"
         except Exception as e:
             return f"Error: An unexpected error occurred: {e}"
 
-get_conferences_tool = GetConferencesTool()
\ No newline at end of file
+get_conferences_tool = GetConferencesTool()
@@ -1,9 +1,158 @@
 import traceback
 import asyncio # <<< Thêm import asyncio
-from typing import Type, Any
+import time
+from datetime import timedelta
+from typing import Type, Any, Dict, List, Optional
 from crewai.tools import BaseTool
 from pydantic import BaseModel, Field
 from mcp import ClientSession
+from app.runtime.cancellation import CancellationToken, CrewCancelled
+from app.runtime.deadline import Deadline
+from app.observability.tracing import RequestTrace, current_trace, record_span, span
+from app.runtime.cassette import Cassette, current_cassette
+from app.conversation.store import ConversationTurn, current_turn, split_batch_output
+
+
+def extract_tool_text(result: Any) -> str:
+    """Returns the text of an MCP CallToolResult (or a bare content list)."""
+    content = getattr(result, "content", result)
+    if isinstance(content, list) and content:
+        texts = [item.text for item in content if getattr(item, "text", None)]
+        if texts:
+            return "\n".join(texts)
+        return str(content[0])
+    return str(result)
+
+
+async def call_conference_tool(
+    session: ClientSession,
+    searchQuery: str,
+    deadline: Optional[Deadline] = None,
+    trace: Optional[RequestTrace] = None,
+    cassette: Optional[Cassette] = None,
+    turn: Optional[ConversationTurn] = None,
+) -> str:
+    """
+    Calls the MCP server's 'get_conferences' tool and returns its text output.
+    With a `deadline`, the call times out at the remaining budget and the server is told
+    how long it may spend on the upstream fetch. The request id of the trace is forwarded
+    so the server's spans can be matched with ours. With a `cassette`, the call is
+    recorded, or answered from the recording without touching the MCP server.
+    The search and its output are added to the conversation `turn`, if any.
+    """
+    turn = turn or current_turn()
+    output = await _call_mcp_tool(
+        session, "get_conferences", {"searchQuery": searchQuery}, deadline, trace, cassette, searchQuery=searchQuery
+    )
+    if turn is not None:
+        turn.record_search(searchQuery, output)
+    return output
+
+
+async def call_conference_batch_tool(
+    session: ClientSession,
+    searchQueries: List[str],
+    deadline: Optional[Deadline] = None,
+    trace: Optional[RequestTrace] = None,
+    cassette: Optional[Cassette] = None,
+    turn: Optional[ConversationTurn] = None,
+) -> str:
+    """
+    Calls the MCP server's 'get_conferences_batch' tool: all `searchQueries` are fetched
+    concurrently by the server and returned as one merged result, labeled per search.
+    Deadline, trace, cassette and turn work as in `call_conference_tool`; each search
+    is recorded on the turn with its own section of the output.
+    """
+    turn = turn or current_turn()
+    output = await _call_mcp_tool(
+        session, "get_conferences_batch", {"searchQueries": list(searchQueries)}, deadline, trace, cassette,
+        searchQuery=" || ".join(searchQueries)
+    )
+    if turn is not None:
+        for searchQuery, section in split_batch_output(output):
+            turn.record_search(searchQuery, section)
+    return output
+
+
+async def call_local_search_tool(
+    session: ClientSession,
+    query: str = "",
+    filters: str = "",
+    limit: int = 5,
+    deadline: Optional[Deadline] = None,
+    trace: Optional[RequestTrace] = None,
+    cassette: Optional[Cassette] = None,
+) -> str:
+    """
+    Calls the MCP server's 'search_conferences_local' tool: a keyword + semantic search of
+    the server's local index, with no upstream API call. The index only holds conferences
+    seen before, so an empty result does not mean no conference matches.
+    Deadline, trace and cassette work as in `call_conference_tool`.
+    """
+    return await _call_mcp_tool(
+        session, "search_conferences_local", {"query": query, "filters": filters, "limit": limit},
+        deadline, trace, cassette, query=query, filters=filters
+    )
+
+
+async def call_count_tool(
+    session: ClientSession,
+    filters: str = "",
+    groupBy: str = "",
+    limit: int = 20,
+    deadline: Optional[Deadline] = None,
+    trace: Optional[RequestTrace] = None,
+    cassette: Optional[Cassette] = None,
+) -> str:
+    """
+    Calls the MCP server's 'count_conferences' tool: counts (optionally grouped) of the
+    conferences in the server's local index, without the records themselves. The counts
+    cover only the indexed conferences, as the output notes.
+    Deadline, trace and cassette work as in `call_conference_tool`.
+    """
+    return await _call_mcp_tool(
+        session, "count_conferences", {"filters": filters, "groupBy": groupBy, "limit": limit},
+        deadline, trace, cassette, filters=filters, groupBy=groupBy
+    )
+
+
+async def _call_mcp_tool(
+    session: ClientSession,
+    name: str,
+    arguments: Dict[str, Any],
+    deadline: Optional[Deadline] = None,
+    trace: Optional[RequestTrace] = None,
+    cassette: Optional[Cassette] = None,
+    **span_attributes: Any,
+) -> str:
+    trace = trace or current_trace()
+    cassette = cassette or current_cassette()
+    if cassette is not None and cassette.replaying:
+        entry = cassette.replay_tool(name, arguments)
+        delay = cassette.delay(entry)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        record_span("mcp_replay", delay, trace, **span_attributes)
+        return entry["output"]
+
+    read_timeout = None
+    if deadline is not None:
+        timeout = deadline.timeout()
+        arguments["timeoutSeconds"] = round(timeout, 2)
+        read_timeout = timedelta(seconds=timeout)
+    if trace is not None:
+        arguments["requestId"] = trace.request_id
+    started = time.perf_counter()
+    with span("mcp_call_tool", trace, **span_attributes):
+        result = await session.call_tool(
+            name=name,
+            arguments=arguments,
+            read_timeout_seconds=read_timeout
+        )
+    output = extract_tool_text(result)
+    if cassette is not None:
+        cassette.record_tool(name, arguments, output, time.perf_counter() - started)
+    return output
 
 class MCPConferenceTool(BaseTool):
     name: str = "Conference Search"
@@ -17,6 +166,16 @@ class MCPConferenceTool(BaseTool):
     # Thêm 2 thuộc tính mới
     session: ClientSession
     loop: asyncio.AbstractEventLoop # <<< Để lưu event loop chính
+    # Bị hủy khi client ngắt kết nối: lời gọi MCP đang chờ cũng bị hủy theo.
+    cancel_token: Optional[CancellationToken] = None
+    # Ngân sách thời gian của request: timeout của lời gọi MCP lấy theo thời gian còn lại.
+    deadline: Optional[Deadline] = None
+    # Trace của request: _arun chạy trên event loop chính, ngoài context của request.
+    trace: Optional[RequestTrace] = None
+    # Cassette của request (ghi / phát lại), cùng lý do như trace.
+    cassette: Optional[Cassette] = None
+    # Lượt hội thoại của request: ghi lại searchQuery và kết quả cho câu hỏi nối tiếp.
+    turn: Optional[ConversationTurn] = None
 
     class Config:
         arbitrary_types_allowed = True
@@ -28,42 +187,210 @@ class MCPConferenceTool(BaseTool):
         The synchronous entry point that CrewAI calls.
         This method safely schedules the async logic on the main event loop.
         """
+        return self._run_on_loop(self._arun, searchQuery)
+
+    def _run_on_loop(self, arun, *args: Any) -> str:
+        """Runs `arun(*args)` on the main event loop and blocks this (crew) thread for its result."""
+        if self.cancel_token is not None:
+            self.cancel_token.raise_if_cancelled()
+
         # Tạo một coroutine object từ hàm async của chúng ta
-        coro = self._arun(searchQuery)
+        coro = arun(*args)
         
         # Sử dụng run_coroutine_threadsafe để gửi coroutine này đến event loop
         # đang chạy ở thread chính và chờ kết quả.
         future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        unregister = self.cancel_token.add_callback(future.cancel) if self.cancel_token is not None else None
         
         # Lấy kết quả khi nó hoàn thành. Lệnh này sẽ block thread hiện tại (thread B)
         # cho đến khi coroutine chạy xong trên thread chính (loop A).
         try:
-            return future.result(timeout=60) # Thêm timeout để tránh treo vĩnh viễn
+            # Thêm timeout để tránh treo vĩnh viễn
+            return future.result(timeout=self.deadline.timeout(cap=60) if self.deadline is not None else 60)
         except Exception as e:
+            if self.cancel_token is not None and self.cancel_token.cancelled:
+                # Không trả lỗi về cho agent (nó sẽ thử lại), mà dừng hẳn lượt chạy.
+                raise CrewCancelled(self.cancel_token.reason) from e
             print(f"ERROR getting result from future: {e}")
             traceback.print_exc()
             return f"Error executing tool: {e}"
+        finally:
+            if unregister is not None:
+                unregister()
 
     async def _arun(self, searchQuery: str) -> str:
         """The actual async implementation of the tool's logic."""
         try:
-            result = await self.session.call_tool(
-                name="get_conferences",
-                arguments={"searchQuery": searchQuery}
-            )
-            
-            if isinstance(result, list) and result:
-                content = result[0]
-                if hasattr(content, 'text') and content.text:
-                    return content.text
-                return str(content)
-            return str(result)
+            return await call_conference_tool(self.session, searchQuery, self.deadline, self.trace, self.cassette, self.turn)
 
         except Exception as e:
             print(f"ERROR in MCPConferenceTool _arun: {e}")
             traceback.print_exc()
             return f"Error communicating with Conference MCP server: {e}"
 
+
+class MCPConferenceBatchTool(MCPConferenceTool):
+    """
+    Batch variant of the conference search: several searchQueries in one tool call, fetched
+    concurrently by the MCP server, so comparisons cost one agent step and about one
+    upstream round trip instead of one of each per search.
+    """
+    name: str = "Conference Batch Search"
+    description: str = (
+        "Runs several conference searches at once. Use this instead of repeated Conference Search calls "
+        "when a request compares or combines several searches (e.g. two countries, or several acronyms). "
+        "Returns one result with a section per searchQuery; conferences matching several searches are listed once."
+    )
+
+    class GetConferencesBatchInput(BaseModel):
+        searchQueries: List[str] = Field(
+            description="A list of URL-encoded query strings, one per search. E.g., ['topics=AI&country=Germany', 'topics=AI&country=France']"
+        )
+
+    args_schema: Type[BaseModel] = GetConferencesBatchInput
+
+    def _run(self, searchQueries: List[str]) -> str:
+        return self._run_on_loop(self._arun, searchQueries)
+
+    async def _arun(self, searchQueries: List[str]) -> str:
+        try:
+            return await call_conference_batch_tool(
+                self.session, searchQueries, self.deadline, self.trace, self.cassette, self.turn
+            )
+
+        except Exception as e:
+            print(f"ERROR in MCPConferenceBatchTool _arun: {e}")
+            traceback.print_exc()
+            return f"Error communicating with Conference MCP server: {e}"
+
+
+class MCPLocalConferenceSearchTool(MCPConferenceTool):
+    """
+    Free-text search of the MCP server's local conference index (keyword + semantic), for
+    vague descriptions that no searchQuery parameter expresses. Answers without an upstream
+    round trip, but only over conferences the server has already seen.
+    """
+    name: str = "Local Conference Search"
+    description: str = (
+        "Searches already-known conferences by free-text description (e.g. 'privacy in machine learning'), "
+        "matched against acronym, title, topics and summary. Fast, but covers only conferences indexed "
+        "from earlier searches, not the full database: if it finds nothing relevant, use Conference Search."
+    )
+
+    class SearchConferencesLocalInput(BaseModel):
+        query: str = Field(description="Free-text description of the conferences to find. E.g., 'federated learning privacy'")
+        filters: str = Field(
+            default="",
+            description="Optional URL-encoded query string with the same keys as Conference Search. E.g., 'country=Vietnam&rank=B'"
+        )
+        limit: int = Field(default=5, description="Maximum number of conferences to return.")
+
+    args_schema: Type[BaseModel] = SearchConferencesLocalInput
+
+    def _run(self, query: str, filters: str = "", limit: int = 5) -> str:
+        return self._run_on_loop(self._arun, query, filters, limit)
+
+    async def _arun(self, query: str, filters: str = "", limit: int = 5) -> str:
+        try:
+            return await call_local_search_tool(
+                self.session, query, filters, limit, self.deadline, self.trace, self.cassette
+            )
+
+        except Exception as e:
+            print(f"ERROR in MCPLocalConferenceSearchTool _arun: {e}")
+            traceback.print_exc()
+            return f"Error communicating with Conference MCP server: {e}"
+
+
+class MCPConferenceCountTool(MCPConferenceTool):
+    """
+    Counts of the MCP server's locally indexed conferences, optionally grouped by a field,
+    for "how many" and "which country has the most" questions that need no records.
+    """
+    name: str = "Conference Count"
+    description: str = (
+        "Counts already-known conferences matching optional filters, optionally grouped by country, continent, "
+        "rank, source, accessType, topics, year or month. Returns counts only, no records. The counts cover "
+        "only conferences indexed from earlier searches, not the full database: state this in the answer, "
+        "or use Conference Search when a complete total is needed."
+    )
+
+    class CountConferencesInput(BaseModel):
+        filters: str = Field(
+            default="",
+            description="Optional URL-encoded query string with the same keys as Conference Search. E.g., 'continent=Asia&accessType=Offline'"
+        )
+        groupBy: str = Field(default="", description="Optional field to group the count by. E.g., 'country'")
+        limit: int = Field(default=20, description="Maximum number of groups to return.")
+
+    args_schema: Type[BaseModel] = CountConferencesInput
+
+    def _run(self, filters: str = "", groupBy: str = "", limit: int = 20) -> str:
+        return self._run_on_loop(self._arun, filters, groupBy, limit)
+
+    async def _arun(self, filters: str = "", groupBy: str = "", limit: int = 20) -> str:
+        try:
+            return await call_count_tool(
+                self.session, filters, groupBy, limit, self.deadline, self.trace, self.cassette
+            )
+
+        except Exception as e:
+            print(f"ERROR in MCPConferenceCountTool _arun: {e}")
+            traceback.print_exc()
+            return f"Error communicating with Conference MCP server: {e}"
+
 # Sửa hàm factory để nhận cả session và loop
-def create_mcp_conference_tool(session: ClientSession, loop: asyncio.AbstractEventLoop) -> MCPConferenceTool:
-    return MCPConferenceTool(session=session, loop=loop)
\ No newline at end of file
+def create_mcp_conference_tool(
+    session: ClientSession,
+    loop: asyncio.AbstractEventLoop,
+    cancel_token: Optional[CancellationToken] = None,
+    deadline: Optional[Deadline] = None,
+    trace: Optional[RequestTrace] = None,
+    cassette: Optional[Cassette] = None,
+    turn: Optional[ConversationTurn] = None,
+) -> MCPConferenceTool:
+    return MCPConferenceTool(
+        session=session, loop=loop, cancel_token=cancel_token, deadline=deadline, trace=trace, cassette=cassette,
+        turn=turn
+    )
+
+
+def create_mcp_conference_batch_tool(
+    session: ClientSession,
+    loop: asyncio.AbstractEventLoop,
+    cancel_token: Optional[CancellationToken] = None,
+    deadline: Optional[Deadline] = None,
+    trace: Optional[RequestTrace] = None,
+    cassette: Optional[Cassette] = None,
+    turn: Optional[ConversationTurn] = None,
+) -> MCPConferenceBatchTool:
+    return MCPConferenceBatchTool(
+        session=session, loop=loop, cancel_token=cancel_token, deadline=deadline, trace=trace, cassette=cassette,
+        turn=turn
+    )
+
+
+def create_mcp_local_search_tool(
+    session: ClientSession,
+    loop: asyncio.AbstractEventLoop,
+    cancel_token: Optional[CancellationToken] = None,
+    deadline: Optional[Deadline] = None,
+    trace: Optional[RequestTrace] = None,
+    cassette: Optional[Cassette] = None,
+) -> MCPLocalConferenceSearchTool:
+    return MCPLocalConferenceSearchTool(
+        session=session, loop=loop, cancel_token=cancel_token, deadline=deadline, trace=trace, cassette=cassette
+    )
+
+
+def create_mcp_count_tool(
+    session: ClientSession,
+    loop: asyncio.AbstractEventLoop,
+    cancel_token: Optional[CancellationToken] = None,
+    deadline: Optional[Deadline] = None,
+    trace: Optional[RequestTrace] = None,
+    cassette: Optional[Cassette] = None,
+) -> MCPConferenceCountTool:
+    return MCPConferenceCountTool(
+        session=session, loop=loop, cancel_token=cancel_token, deadline=deadline, trace=trace, cassette=cassette
+    )
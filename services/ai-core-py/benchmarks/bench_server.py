@@ -0,0 +1,55 @@
+# services/ai-core-py/benchmarks/bench_server.py
+"""
+Runs the real AI Core app (FastAPI + warm MCP pool + crew) with Gemini replaced by
+`ScriptedLLM`. Started as a subprocess by `run_chat_benchmark`, so the driver's own
+memory and CPU stay out of the measurements.
+
+The conference API URL must already point at a stub (CONFERENCE_API_URL); the MCP
+server subprocesses inherit it.
+"""
+import argparse
+import os
+
+# Mặc định cho benchmark, đặt trước khi import app (settings đọc môi trường lúc import).
+# Mỗi giá trị vẫn có thể bị ghi đè bằng biến môi trường khi chạy.
+BENCHMARK_ENV_DEFAULTS = {
+    "GEMINI_API_KEY": "benchmark",
+    # Cache và giới hạn tốc độ sẽ che mất chi phí thật của pipeline.
+    "LLM_CACHE_ENABLED": "false",
+    "GEMINI_RATE_LIMIT_ENABLED": "false",
+    "CONFERENCE_CACHE_TTL_SECONDS": "0",
+    "CONFERENCE_CACHE_STALE_TTL_SECONDS": "0",
+    "LOCAL_INDEX_LEARN_FROM_UPSTREAM": "false",
+    "OTEL_SDK_DISABLED": "true",
+    "CREWAI_DISABLE_TELEMETRY": "true",
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the AI Core app with a scripted LLM.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8010)
+    parser.add_argument("--delegation-delay-ms", type=float, default=800.0)
+    parser.add_argument("--tool-args-delay-ms", type=float, default=600.0)
+    parser.add_argument("--synthesis-delay-ms", type=float, default=1200.0)
+    args = parser.parse_args()
+
+    for key, value in BENCHMARK_ENV_DEFAULTS.items():
+        os.environ.setdefault(key, value)
+
+    import uvicorn
+    from app.llms.router import DELEGATION, SYNTHESIS, TOOL_ARGS
+    from benchmarks.fake_llm import ScriptedLLM
+
+    ScriptedLLM({
+        DELEGATION: args.delegation_delay_ms / 1000,
+        TOOL_ARGS: args.tool_args_delay_ms / 1000,
+        SYNTHESIS: args.synthesis_delay_ms / 1000,
+    }).install()
+
+    from app.main import app
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
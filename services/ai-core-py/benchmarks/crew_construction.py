@@ -0,0 +1,93 @@
+# services/ai-core-py/benchmarks/crew_construction.py
+"""
+Per-request cost of building the research crew, without running it.
+
+Compares constructing a new worker Agent and Crew for every request (how crews were
+built before `CrewFactory`) with copying them from the factory's prebuilt templates,
+single-threaded and from several threads at once.
+
+Run from services/ai-core-py:
+    PYTHONPATH=. python -m benchmarks.crew_construction --iterations 2000 --threads 8
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+from benchmarks.bench_server import BENCHMARK_ENV_DEFAULTS
+
+
+def _timings(build: Callable[[], object], iterations: int) -> List[float]:
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        build()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def _report(label: str, timings: List[float]) -> None:
+    ordered = sorted(timings)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(f"{label:<32} mean {statistics.mean(timings) * 1000:7.3f} ms   p95 {p95 * 1000:7.3f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure per-request crew construction cost.")
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    for key, value in BENCHMARK_ENV_DEFAULTS.items():
+        os.environ.setdefault(key, value)
+
+    from crewai import Crew, Process
+    from mcp import ClientSession
+
+    from app.agents.host_agent import host_agent_manager
+    from app.agents.mcp_sub_agents import create_conference_researcher
+    from app.crew_factory import conference_crew_factory
+    from app.tasks.research_tasks import conference_research_task
+    from app.tools.mcp_conference_tool import create_mcp_conference_tool
+
+    # Tool không bao giờ được gọi: chỉ cần một session hợp lệ về kiểu.
+    session = ClientSession.__new__(ClientSession)
+    loop = asyncio.new_event_loop()
+
+    def per_request() -> Crew:
+        tool = create_mcp_conference_tool(session=session, loop=loop)
+        return Crew(
+            agents=[create_conference_researcher(tool)],
+            tasks=[conference_research_task],
+            process=Process.hierarchical,
+            manager_agent=host_agent_manager,
+            verbose=True,
+        )
+
+    def from_factory() -> Crew:
+        return conference_crew_factory.build(create_mcp_conference_tool(session=session, loop=loop))
+
+    # Khởi động: import lười và cache của pydantic/litellm không tính vào kết quả.
+    _timings(per_request, 20)
+    _timings(from_factory, 20)
+
+    print(f"{args.iterations} builds, 1 thread")
+    _report("new Agent + Crew per request", _timings(per_request, args.iterations))
+    _report("CrewFactory.build", _timings(from_factory, args.iterations))
+
+    print(f"{args.iterations} builds, {args.threads} threads")
+    for label, build in (("new Agent + Crew per request", per_request), ("CrewFactory.build", from_factory)):
+        per_thread = max(1, args.iterations // args.threads)
+        with ThreadPoolExecutor(args.threads) as pool:
+            started = time.perf_counter()
+            results = list(pool.map(lambda _: _timings(build, per_thread), range(args.threads)))
+            wall = time.perf_counter() - started
+        _report(label, [t for timings in results for t in timings])
+        print(f"{'':<32} {per_thread * args.threads / wall:,.0f} builds/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# services/ai-core-py/benchmarks/fake_llm.py
+"""
+Deterministic stand-in for Gemini, for offline benchmarks of the chat pipeline.
+
+`ScriptedLLM.install()` replaces `litellm.completion`, which every CrewAI LLM of the
+app ends up calling. Each call sleeps for the delay configured for its step and then
+answers with a scripted text through litellm's own `mock_response`, so streaming,
+events and parsing run exactly as with a live model:
+
+- manager, no tool result yet: delegates to the Conference Research Specialist;
+- worker, no tool result yet: calls 'Conference Search' with the locally compiled searchQuery;
+- any ReAct call that already has a tool result: a 'Final Answer' listing the acronyms found;
+- direct (non-ReAct) calls, e.g. the compiled-query synthesis: a plain answer.
+"""
+import json
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import litellm
+
+from app.llms.router import DELEGATION, MANAGER, REACT_MARKER, SYNTHESIS, TOOL_ARGS, WORKER, ModelRouter
+from app.query_compiler.compiler import compile_query
+
+MANAGER_ROLE_MARKER = "Chief AI Officer"
+RESEARCHER_ROLE = "Conference Research Specialist"
+DEFAULT_SEARCH_QUERY = "rank=A&perPage=5"
+
+_QUOTED_REQUEST = re.compile(r"request: '(.+?)'\.?(?:\n|$)", re.DOTALL | re.MULTILINE)
+_ACRONYM = re.compile(r'"acronym"\s*:\s*"([^"]+)"')
+_FOUND = re.compile(r"I found \d+ conference\(s\): [^\n]*")
+
+
+def _content(message: Any) -> str:
+    return str(message.get("content") or "") if isinstance(message, dict) else str(message)
+
+
+class ScriptedLLM:
+    """Answers LLM calls from a script, after a per-step delay (seconds)."""
+
+    def __init__(self, delays: Optional[Dict[str, float]] = None):
+        self.delays = {DELEGATION: 0.0, TOOL_ARGS: 0.0, SYNTHESIS: 0.0, **(delays or {})}
+        self.calls: Dict[str, int] = {DELEGATION: 0, TOOL_ARGS: 0, SYNTHESIS: 0}
+        self._lock = threading.Lock()
+        self._original = None
+
+    # --- Cài đặt / gỡ ---
+    def install(self) -> "ScriptedLLM":
+        if self._original is None:
+            self._original = litellm.completion
+            litellm.completion = self.completion
+        return self
+
+    def uninstall(self) -> None:
+        if self._original is not None:
+            litellm.completion = self._original
+            self._original = None
+
+    # --- Thay cho litellm.completion ---
+    def completion(self, **params: Any) -> Any:
+        messages = params.get("messages") or []
+        step = self.classify(messages)
+        with self._lock:
+            self.calls[step] += 1
+        if self.delays[step] > 0:
+            time.sleep(self.delays[step])
+        params["mock_response"] = self.respond(step, messages)
+        return self._original(**params)
+
+    @staticmethod
+    def classify(messages: List[Any]) -> str:
+        role = MANAGER if messages and MANAGER_ROLE_MARKER in _content(messages[0]) else WORKER
+        return ModelRouter.classify_step(role, messages)
+
+    def respond(self, step: str, messages: List[Any]) -> str:
+        text = "\n".join(_content(m) for m in messages)
+        quoted = _QUOTED_REQUEST.search(text)
+        query = quoted.group(1) if quoted else (_content(messages[-1]) if messages else "")
+
+        if step == DELEGATION:
+            action_input = {
+                "task": f"Find conferences matching the user's request: '{query}'.",
+                "context": f"The user asked: {query}",
+                "coworker": RESEARCHER_ROLE,
+            }
+            return (
+                "Thought: This request is about conferences, so I will delegate it to the specialist.\n"
+                "Action: Delegate work to coworker\n"
+                f"Action Input: {json.dumps(action_input, ensure_ascii=False)}"
+            )
+        if step == TOOL_ARGS:
+            compiled = compile_query(query)
+            search_query = compiled.search_query if compiled.search_query else DEFAULT_SEARCH_QUERY
+            return (
+                "Thought: I will search the conference database.\n"
+                "Action: Conference Search\n"
+                f"Action Input: {json.dumps({'searchQuery': search_query})}"
+            )
+
+        acronyms = list(dict.fromkeys(_ACRONYM.findall(text)))
+        relayed = _FOUND.search(text)
+        if acronyms:
+            found = f"I found {len(acronyms)} conference(s): {', '.join(acronyms)}."
+        elif relayed:
+            # Manager tổng hợp từ câu trả lời của worker (không còn JSON gốc trong Observation).
+            found = relayed.group(0)
+        else:
+            found = "I found no matching conferences."
+        if messages and REACT_MARKER in _content(messages[0]):
+            return f"Thought: I now know the final answer\nFinal Answer: {found}"
+        return found
@@ -0,0 +1,165 @@
+# services/ai-core-py/benchmarks/replay_cassette.py
+"""
+Records a chat request to a cassette, or replays a cassette through the real app.
+
+Both run the app in this process (httpx ASGI transport, MCP pool started as in the
+FastAPI lifespan), so a replay measures only our own code: FastAPI, SSE, crew
+orchestration, prompt building and parsing. Every LLM and MCP tool call is answered
+from the cassette, at the recorded latency or at zero latency.
+
+Run from services/ai-core-py:
+    # Offline recording: scripted LLM and the stub conference API stand in for Gemini and confhub.
+    PYTHONPATH=. python -m benchmarks.replay_cassette record "List conferences about AI in Germany"
+    # Recording against the real services (GEMINI_API_KEY and CONFERENCE_API_URL from the environment).
+    PYTHONPATH=. python -m benchmarks.replay_cassette record --live "Find rank A conferences in Vietnam"
+    # 500 replays, 8 at a time, without the recorded latency.
+    PYTHONPATH=. python -m benchmarks.replay_cassette replay cassettes/<file>.jsonl.gz --runs 500 --concurrency 8 --latency zero
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+from typing import List, Optional, Tuple
+
+import httpx
+
+from benchmarks.bench_server import BENCHMARK_ENV_DEFAULTS
+
+CHAT_PATH = "/api/v1/chat/invoke"
+
+
+def _percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+
+
+def _configure(mode: str, cassette_dir: str, latency: str = "original", strict: bool = False) -> None:
+    """Sets the app's settings through the environment; must run before `app` is imported."""
+    for key, value in BENCHMARK_ENV_DEFAULTS.items():
+        os.environ.setdefault(key, value)
+    os.environ["CASSETTE_MODE"] = mode
+    os.environ["CASSETTE_DIR"] = cassette_dir
+    os.environ["CASSETTE_REPLAY_LATENCY"] = latency
+    os.environ["CASSETTE_REPLAY_STRICT"] = str(strict).lower()
+    # Mỗi lần phát lại phải chạy riêng, không gộp với lần khác có cùng câu hỏi.
+    os.environ["CHAT_COALESCING_ENABLED"] = "false"
+
+
+async def _chat(client: httpx.AsyncClient, query: str, cassette: Optional[str] = None) -> Tuple[float, dict]:
+    """Sends one chat request and returns its duration and last SSE event."""
+    body = {"query": query, "user_id": f"replay-{uuid.uuid4().hex[:6]}", "conversation_id": uuid.uuid4().hex[:8]}
+    if cassette is not None:
+        body["cassette"] = cassette
+    started = time.perf_counter()
+    response = await client.post(CHAT_PATH, json=body)
+    elapsed = time.perf_counter() - started
+    events = [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+    last = events[-1] if events else {"type": "error", "message": f"HTTP {response.status_code}: {response.text[:200]}"}
+    return elapsed, last
+
+
+async def _with_app(work):
+    from app.main import app, lifespan
+
+    async with lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=None) as client:
+            return await work(client)
+
+
+def record(args: argparse.Namespace) -> None:
+    _configure("record", args.cassette_dir)
+    stub = None
+    if not args.live:
+        from benchmarks.stub_conference_api import StubConferenceAPI
+
+        stub = StubConferenceAPI(delay_seconds=args.api_delay_ms / 1000).start()
+        os.environ["CONFERENCE_API_URL"] = stub.url
+        from benchmarks.fake_llm import ScriptedLLM
+
+        ScriptedLLM().install()
+
+    before = set(os.listdir(args.cassette_dir)) if os.path.isdir(args.cassette_dir) else set()
+    try:
+        elapsed, last = asyncio.run(_with_app(lambda client: _chat(client, args.query)))
+    finally:
+        if stub is not None:
+            stub.stop()
+    written = sorted(set(os.listdir(args.cassette_dir)) - before) if os.path.isdir(args.cassette_dir) else []
+    print(f"Recorded in {elapsed:.2f}s, last event: {last.get('type')}: {str(last.get('message'))[:120]}")
+    for name in written:
+        print(f"Cassette: {os.path.join(args.cassette_dir, name)}")
+
+
+def replay(args: argparse.Namespace) -> None:
+    cassette_dir, name = os.path.split(os.path.abspath(args.cassette))
+    _configure("replay", cassette_dir, args.latency, args.strict)
+
+    from app.runtime.cassette import Cassette
+
+    recorded = Cassette.load(args.cassette)
+    query = recorded.meta.get("query")
+    if not query:
+        raise SystemExit(f"{args.cassette} has no recorded query.")
+
+    async def work(client: httpx.AsyncClient):
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def one() -> Tuple[float, dict]:
+            async with semaphore:
+                return await _chat(client, query, name)
+
+        # Một lần chạy khởi động: import lười và các cache của crewai không tính vào kết quả.
+        await _chat(client, query, name)
+        started = time.perf_counter()
+        results = await asyncio.gather(*(one() for _ in range(args.runs)))
+        return time.perf_counter() - started, results
+
+    wall, results = asyncio.run(_with_app(work))
+    durations = [elapsed for elapsed, _ in results]
+    answers = [last.get("message") for _, last in results if last.get("type") == "result"]
+    failures = len(results) - len(answers)
+    changed = sum(1 for answer in answers if answer != recorded.meta.get("answer"))
+
+    print(f"Cassette: {args.cassette} ({recorded.stats()['llm']} LLM call(s), {recorded.stats()['tool']} tool call(s))")
+    print(f"Runs: {len(results)} at concurrency {args.concurrency}, latency={args.latency}")
+    print(f"Throughput: {len(results) / wall * 60:.0f} runs/min ({wall:.2f}s wall)")
+    print(
+        f"Per run: mean {sum(durations) / len(durations) * 1000:.1f} ms, "
+        f"p50 {_percentile(durations, 50) * 1000:.1f} ms, p95 {_percentile(durations, 95) * 1000:.1f} ms"
+    )
+    print(f"Failures: {failures}, answers differing from the recording: {changed}")
+    if failures:
+        failed = next(last for _, last in results if last.get("type") != "result")
+        print(f"First failure: {failed}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Record or replay chat request cassettes.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = commands.add_parser("record", help="Run one chat request and save its LLM/tool traffic.")
+    record_parser.add_argument("query")
+    record_parser.add_argument("--cassette-dir", default="cassettes")
+    record_parser.add_argument("--live", action="store_true", help="Use the real Gemini and conference API.")
+    record_parser.add_argument("--api-delay-ms", type=float, default=150.0)
+    record_parser.set_defaults(handler=record)
+
+    replay_parser = commands.add_parser("replay", help="Replay a cassette through the app many times.")
+    replay_parser.add_argument("cassette")
+    replay_parser.add_argument("--runs", type=int, default=100)
+    replay_parser.add_argument("--concurrency", type=int, default=4)
+    replay_parser.add_argument("--latency", choices=["original", "zero"], default="zero")
+    replay_parser.add_argument("--strict", action="store_true", help="Fail calls that do not match the recording exactly.")
+    replay_parser.set_defaults(handler=replay)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
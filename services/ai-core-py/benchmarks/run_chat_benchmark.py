@@ -0,0 +1,345 @@
+# services/ai-core-py/benchmarks/run_chat_benchmark.py
+"""
+Offline load benchmark of POST /api/v1/chat/invoke (SSE), with no Gemini or confhub access.
+
+Starts the stub conference API in this process and the real app with a scripted LLM
+in a subprocess (`bench_server`), then runs a concurrency sweep: at each level,
+`--concurrency` clients send `--requests` chat requests in total, back to back.
+
+Reported per level: p50/p95/p99 time to first SSE event and total latency,
+requests/sec, memory growth per in-flight request (RSS of the server and its MCP
+subprocesses), and the mean duration and count per request of each pipeline stage,
+taken from the server's /metrics (MCP lease, crew build, LLM calls, tool calls...).
+
+Run from services/ai-core-py:
+    PYTHONPATH=. python -m benchmarks.run_chat_benchmark --concurrency 1,2,4,8 --requests 16
+    PYTHONPATH=. python -m benchmarks.run_chat_benchmark --path compiled --json-out bench.json
+Extra server settings can be passed as environment variables, e.g. --server-env MCP_POOL_SIZE=4.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.stub_conference_api import StubConferenceAPI
+
+# Câu hỏi mà bộ biên dịch truy vấn hiểu chắc chắn (dùng cho cả hai đường: crew và compiled).
+QUERIES = [
+    "Find rank A conferences in Vietnam",
+    "List conferences about Artificial Intelligence in Germany",
+    "Show me 5 rank B conferences in Asia",
+    "What conferences about machine learning are in Japan in 2025?",
+    "Which conferences in France are held online?",
+    "Tìm hội nghị hạng A* ở Mỹ",
+]
+
+_STAGE_LINE = re.compile(r'^aicore_stage_duration_seconds_(sum|count)\{stage="([^"]+)"\} (\S+)$')
+
+
+@dataclass
+class RequestResult:
+    ttfe: Optional[float]
+    total: float
+    outcome: str
+
+
+# --- Bộ nhớ: RSS của server và các tiến trình con (MCP server) ---
+def _descendants(pid: int) -> List[int]:
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # Trường thứ 4 là ppid; tên tiến trình (trường 2) có thể chứa khoảng trắng.
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    found, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        found.append(current)
+        stack.extend(children.get(current, []))
+    return found
+
+
+def _tree_rss_bytes(pid: int) -> Optional[int]:
+    if not os.path.isdir("/proc"):
+        return None
+    total = 0
+    for member in _descendants(pid):
+        try:
+            with open(f"/proc/{member}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            continue
+    return total
+
+
+class MemorySampler:
+    """Samples the RSS of a process tree in a background thread and keeps the peak."""
+
+    def __init__(self, pid: int, interval_seconds: float = 0.05):
+        self.pid = pid
+        self.interval_seconds = interval_seconds
+        self.peak: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self) -> "MemorySampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            rss = _tree_rss_bytes(self.pid)
+            if rss is not None:
+                self.peak = rss if self.peak is None else max(self.peak, rss)
+            self._stop.wait(self.interval_seconds)
+
+
+# --- Thống kê ---
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile; None for an empty list."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+async def scrape_stages(client: httpx.AsyncClient, base_url: str) -> Dict[str, Tuple[float, float]]:
+    """Returns {stage: (sum_seconds, count)} from the server's stage histogram."""
+    response = await client.get(f"{base_url}/metrics")
+    stages: Dict[str, List[float]] = {}
+    for line in response.text.splitlines():
+        match = _STAGE_LINE.match(line)
+        if match:
+            kind, stage, value = match.groups()
+            stages.setdefault(stage, [0.0, 0.0])[0 if kind == "sum" else 1] = float(value)
+    return {stage: (total, count) for stage, (total, count) in stages.items()}
+
+
+# --- Tải ---
+async def send_chat(client: httpx.AsyncClient, base_url: str, query: str) -> RequestResult:
+    body = {"query": query, "user_id": f"bench-{uuid.uuid4().hex[:8]}", "conversation_id": f"bench-{uuid.uuid4().hex}"}
+    started = time.perf_counter()
+    ttfe, outcome = None, "no_result"
+    try:
+        async with client.stream("POST", f"{base_url}/api/v1/chat/invoke", json=body) as response:
+            if response.status_code == 429:
+                return RequestResult(None, time.perf_counter() - started, "busy")
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                if ttfe is None:
+                    ttfe = time.perf_counter() - started
+                event_type = json.loads(line[len("data: "):]).get("type")
+                if event_type in ("result", "busy", "error"):
+                    outcome = event_type
+    except httpx.HTTPError as e:
+        outcome = f"http_error:{type(e).__name__}"
+    return RequestResult(ttfe, time.perf_counter() - started, outcome)
+
+
+async def run_level(client: httpx.AsyncClient, base_url: str, concurrency: int, total_requests: int) -> Tuple[List[RequestResult], float]:
+    """Closed loop: `concurrency` workers send requests back to back until `total_requests` are done."""
+    results: List[RequestResult] = []
+    counter = iter(range(total_requests))
+
+    async def worker() -> None:
+        for index in counter:
+            results.append(await send_chat(client, base_url, QUERIES[index % len(QUERIES)]))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results, time.perf_counter() - started
+
+
+def summarize_level(
+    concurrency: int,
+    results: List[RequestResult],
+    elapsed: float,
+    baseline_rss: Optional[int],
+    peak_rss: Optional[int],
+    stages_before: Dict[str, Tuple[float, float]],
+    stages_after: Dict[str, Tuple[float, float]],
+) -> dict:
+    ttfe = [r.ttfe for r in results if r.ttfe is not None]
+    totals = [r.total for r in results if r.outcome == "result"]
+    outcomes: Dict[str, int] = {}
+    for r in results:
+        outcomes[r.outcome] = outcomes.get(r.outcome, 0) + 1
+    stages = {}
+    for stage, (total, count) in sorted(stages_after.items()):
+        prev_total, prev_count = stages_before.get(stage, (0.0, 0.0))
+        calls = count - prev_count
+        if calls > 0:
+            stages[stage] = {
+                "meanMs": round(1000 * (total - prev_total) / calls, 1),
+                "perRequest": round(calls / len(results), 2),
+            }
+    per_in_flight = None
+    if baseline_rss is not None and peak_rss is not None:
+        per_in_flight = round(max(0, peak_rss - baseline_rss) / concurrency / 2**20, 2)
+
+    def ms(value: Optional[float]) -> Optional[float]:
+        return round(1000 * value, 1) if value is not None else None
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "outcomes": outcomes,
+        "requestsPerSecond": round(len(results) / elapsed, 2) if elapsed else 0.0,
+        "ttfeMs": {f"p{p}": ms(percentile(ttfe, p)) for p in (50, 95, 99)},
+        "totalMs": {f"p{p}": ms(percentile(totals, p)) for p in (50, 95, 99)},
+        "baselineRssMb": round(baseline_rss / 2**20, 1) if baseline_rss is not None else None,
+        "peakRssMb": round(peak_rss / 2**20, 1) if peak_rss is not None else None,
+        "memoryPerInFlightMb": per_in_flight,
+        "stages": stages,
+    }
+
+
+def print_report(levels: List[dict]) -> None:
+    header = (
+        f"{'conc':>4} {'reqs':>5} {'ok':>4} {'busy':>4} {'err':>4} {'rps':>7} "
+        f"{'ttfe p50':>9} {'p95':>8} {'p99':>8} {'total p50':>10} {'p95':>8} {'p99':>8} {'MB/inflight':>11}"
+    )
+    print("\n" + header)
+    print("-" * len(header))
+    for level in levels:
+        o = level["outcomes"]
+        errors = level["requests"] - o.get("result", 0) - o.get("busy", 0)
+        t, d = level["ttfeMs"], level["totalMs"]
+        print(
+            f"{level['concurrency']:>4} {level['requests']:>5} {o.get('result', 0):>4} {o.get('busy', 0):>4} {errors:>4} "
+            f"{level['requestsPerSecond']:>7} {t['p50'] or '-':>9} {t['p95'] or '-':>8} {t['p99'] or '-':>8} "
+            f"{d['p50'] or '-':>10} {d['p95'] or '-':>8} {d['p99'] or '-':>8} {level['memoryPerInFlightMb'] or '-':>11}"
+        )
+    for level in levels:
+        print(f"\nStages at concurrency {level['concurrency']} (mean ms, count per request):")
+        for stage, values in level["stages"].items():
+            print(f"  {stage:<18} {values['meanMs']:>9} ms  x{values['perRequest']}")
+
+
+# --- Điều phối ---
+def start_server(args: argparse.Namespace, api_url: str) -> subprocess.Popen:
+    env = {**os.environ, "CONFERENCE_API_URL": api_url}
+    env["PYTHONPATH"] = os.getcwd() + os.pathsep + env.get("PYTHONPATH", "")
+    if args.path == "crew":
+        env["QUERY_COMPILER_ENABLED"] = "false"
+    for item in args.server_env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    command = [
+        sys.executable, "-m", "benchmarks.bench_server",
+        "--port", str(args.port),
+        "--delegation-delay-ms", str(args.delegation_delay_ms),
+        "--tool-args-delay-ms", str(args.tool_args_delay_ms),
+        "--synthesis-delay-ms", str(args.synthesis_delay_ms),
+    ]
+    # Log của app rất nhiều (crew verbose): ghi ra file thay vì lẫn vào báo cáo.
+    log_file = open(args.server_log, "w")
+    return subprocess.Popen(command, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+
+
+async def wait_until_ready(client: httpx.AsyncClient, base_url: str, server: subprocess.Popen, timeout_seconds: float) -> None:
+    give_up_at = time.monotonic() + timeout_seconds
+    while time.monotonic() < give_up_at:
+        if server.poll() is not None:
+            raise RuntimeError(f"Benchmark server exited with code {server.returncode}; see the server log.")
+        try:
+            if (await client.get(f"{base_url}/")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.25)
+    raise RuntimeError(f"Benchmark server was not ready within {timeout_seconds}s.")
+
+
+async def run(args: argparse.Namespace) -> List[dict]:
+    stub = StubConferenceAPI(delay_seconds=args.api_delay_ms / 1000).start()
+    server = start_server(args, stub.url)
+    base_url = f"http://127.0.0.1:{args.port}"
+    levels: List[dict] = []
+    try:
+        timeout = httpx.Timeout(args.request_timeout, connect=10.0)
+        limits = httpx.Limits(max_connections=max(args.concurrency) + 4)
+        async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+            await wait_until_ready(client, base_url, server, args.startup_timeout)
+            print(f"Server ready (pid {server.pid}, log {args.server_log}); stub API at {stub.url}; path={args.path}")
+            if args.warmup:
+                await run_level(client, base_url, 1, args.warmup)
+
+            for concurrency in args.concurrency:
+                baseline = _tree_rss_bytes(server.pid)
+                stages_before = await scrape_stages(client, base_url)
+                with MemorySampler(server.pid) as sampler:
+                    results, elapsed = await run_level(client, base_url, concurrency, args.requests)
+                stages_after = await scrape_stages(client, base_url)
+                level = summarize_level(concurrency, results, elapsed, baseline, sampler.peak, stages_before, stages_after)
+                levels.append(level)
+                print(
+                    f"concurrency={concurrency}: {level['requestsPerSecond']} req/s, "
+                    f"ttfe p50={level['ttfeMs']['p50']} ms, total p50={level['totalMs']['p50']} ms, "
+                    f"outcomes={level['outcomes']}"
+                )
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        stub.stop()
+    return levels
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline concurrency sweep of the chat SSE endpoint.")
+    parser.add_argument("--concurrency", default="1,2,4,8", help="Comma-separated concurrency levels.")
+    parser.add_argument("--requests", type=int, default=16, help="Requests per concurrency level.")
+    parser.add_argument("--warmup", type=int, default=2, help="Sequential warm-up requests before the sweep.")
+    parser.add_argument("--path", choices=("crew", "compiled"), default="crew",
+                        help="'crew' disables the query compiler so every request runs the full crew.")
+    parser.add_argument("--delegation-delay-ms", type=float, default=800.0)
+    parser.add_argument("--tool-args-delay-ms", type=float, default=600.0)
+    parser.add_argument("--synthesis-delay-ms", type=float, default=1200.0)
+    parser.add_argument("--api-delay-ms", type=float, default=150.0, help="Latency of the stub conference API.")
+    parser.add_argument("--port", type=int, default=8010)
+    parser.add_argument("--server-env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra environment for the server (e.g. MCP_POOL_SIZE=4); repeatable.")
+    parser.add_argument("--server-log", default=os.path.join(tempfile.gettempdir(), "aicore_benchmark_server.log"))
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--request-timeout", type=float, default=300.0)
+    parser.add_argument("--json-out", help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+    args.concurrency = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    levels = asyncio.run(run(args))
+    print_report(levels)
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump({"config": {k: v for k, v in vars(args).items()}, "levels": levels}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
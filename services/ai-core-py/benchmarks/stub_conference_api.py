@@ -0,0 +1,127 @@
+# services/ai-core-py/benchmarks/stub_conference_api.py
+"""
+Local stand-in for the confhub conference API (CONFERENCE_API_URL).
+
+Serves the recorded payload in benchmarks/fixtures/conferences.json, filtered by the
+same query keys the agent builds (rank, country, continent, acronym, topics,
+accessType, keyword) and paginated with perPage/page, after a configurable delay.
+
+Standalone:
+    python -m benchmarks.stub_conference_api --port 8099 --delay-ms 150
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "conferences.json")
+
+# Khóa truy vấn -> hàm lấy giá trị tương ứng trong bản ghi để so khớp.
+_FILTERS = {
+    "rank": lambda r: [r.get("rank", "")],
+    "country": lambda r: [r.get("location", {}).get("country", "")],
+    "continent": lambda r: [r.get("location", {}).get("continent", "")],
+    "cityStateProvince": lambda r: [r.get("location", {}).get("cityStateProvince", "")],
+    "acronym": lambda r: [r.get("acronym", "")],
+    "topics": lambda r: r.get("topics", []),
+    "accessType": lambda r: [r.get("accessType", "")],
+}
+
+
+def _matches(record: Dict[str, Any], params: Dict[str, List[str]]) -> bool:
+    for key, values in params.items():
+        if key in _FILTERS:
+            candidates = {str(v).lower() for v in _FILTERS[key](record)}
+            if not any(value.lower() in candidates for value in values):
+                return False
+        elif key in ("keyword", "title"):
+            text = f"{record.get('title', '')} {record.get('acronym', '')} {' '.join(record.get('topics', []))}".lower()
+            if not all(value.lower() in text for value in values):
+                return False
+    return True
+
+
+class StubConferenceAPI:
+    """Threaded HTTP server answering like the conference API, for offline benchmarks."""
+
+    def __init__(self, fixture_path: str = DEFAULT_FIXTURE, delay_seconds: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        with open(fixture_path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.records: List[Dict[str, Any]] = data["payload"] if isinstance(data, dict) else data
+        self.delay_seconds = delay_seconds
+        self.requests = 0
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/database/api/v1/conference"
+
+    def start(self) -> "StubConferenceAPI":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-conference-api", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def search(self, params: Dict[str, List[str]]) -> Dict[str, Any]:
+        matched = [r for r in self.records if _matches(r, params)]
+        per_page = int((params.get("perPage") or ["5"])[0])
+        page = max(1, int((params.get("page") or ["1"])[0]))
+        start = (page - 1) * per_page
+        return {
+            "payload": matched[start:start + per_page],
+            "meta": {"totalItems": len(matched), "curPage": page, "perPage": per_page},
+        }
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests += 1
+                if stub.delay_seconds > 0:
+                    time.sleep(stub.delay_seconds)
+                try:
+                    body = json.dumps(stub.search(parse_qs(urlparse(self.path).query))).encode("utf-8")
+                    status = 200
+                except ValueError as e:
+                    body = json.dumps({"errorMessage": str(e)}).encode("utf-8")
+                    status = 400
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # Không ghi log từng request: làm nhiễu đầu ra của benchmark.
+                pass
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve recorded conference API payloads locally.")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--delay-ms", type=float, default=0.0)
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE)
+    args = parser.parse_args()
+    stub = StubConferenceAPI(args.fixture, args.delay_ms / 1000, port=args.port)
+    print(f"Stub conference API listening on {stub.url}")
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
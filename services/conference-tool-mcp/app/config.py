@@ -0,0 +1,113 @@
+# services/conference-tool-mcp/app/config.py
+"""
+Runtime configuration for the Conference MCP server, read from environment variables.
+"""
+import os
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+# --- Upstream API ---
+CONFERENCE_API_URL = os.getenv("CONFERENCE_API_URL", "https://confhub.ddns.net/database/api/v1/conference")
+
+# --- Response cache ---
+# Maximum number of query results kept in memory (LRU eviction beyond this)
+CACHE_MAX_ENTRIES = _env_int("CONFERENCE_CACHE_MAX_ENTRIES", 512)
+# How long a cached result is served as fresh
+CACHE_TTL_SECONDS = _env_float("CONFERENCE_CACHE_TTL_SECONDS", 300.0)
+# How long past its TTL an entry may still be served while it is revalidated in the background
+CACHE_STALE_TTL_SECONDS = _env_float("CONFERENCE_CACHE_STALE_TTL_SECONDS", 3600.0)
+# Optional SQLite file that lets the cache survive restarts (disabled when empty)
+CACHE_DB_PATH = os.getenv("CONFERENCE_CACHE_DB_PATH") or None
+
+# --- Upstream HTTP client ---
+CONFERENCE_API_CONNECT_TIMEOUT_SECONDS = _env_float("CONFERENCE_API_CONNECT_TIMEOUT_SECONDS", 5.0)
+CONFERENCE_API_READ_TIMEOUT_SECONDS = _env_float("CONFERENCE_API_READ_TIMEOUT_SECONDS", 20.0)
+# Retries after the first attempt, for transport errors, 429 and 5xx responses
+CONFERENCE_API_MAX_RETRIES = _env_int("CONFERENCE_API_MAX_RETRIES", 2)
+CONFERENCE_API_BACKOFF_BASE_SECONDS = _env_float("CONFERENCE_API_BACKOFF_BASE_SECONDS", 0.25)
+CONFERENCE_API_BACKOFF_MAX_SECONDS = _env_float("CONFERENCE_API_BACKOFF_MAX_SECONDS", 4.0)
+# Keep-alive connection pool shared by all tool calls
+CONFERENCE_API_MAX_CONNECTIONS = _env_int("CONFERENCE_API_MAX_CONNECTIONS", 20)
+CONFERENCE_API_MAX_KEEPALIVE_CONNECTIONS = _env_int("CONFERENCE_API_MAX_KEEPALIVE_CONNECTIONS", 10)
+
+# --- Hedged upstream requests ---
+# An attempt still running after the observed p95 latency gets a duplicate; the first answer wins
+CONFERENCE_API_HEDGE_ENABLED = os.getenv("CONFERENCE_API_HEDGE_ENABLED", "true").lower() == "true"
+CONFERENCE_API_HEDGE_PERCENTILE = _env_float("CONFERENCE_API_HEDGE_PERCENTILE", 0.95)
+# Successful attempts observed before hedging starts, and the shortest hedge delay
+CONFERENCE_API_HEDGE_MIN_SAMPLES = _env_int("CONFERENCE_API_HEDGE_MIN_SAMPLES", 20)
+CONFERENCE_API_HEDGE_MIN_DELAY_SECONDS = _env_float("CONFERENCE_API_HEDGE_MIN_DELAY_SECONDS", 0.2)
+# Largest share of attempts that may be hedged, so a slow upstream does not get twice the load
+CONFERENCE_API_HEDGE_MAX_RATIO = _env_float("CONFERENCE_API_HEDGE_MAX_RATIO", 0.1)
+
+# --- Streaming upstream responses ---
+# Parse the 'payload' array record by record as the body arrives, instead of buffering the whole body
+CONFERENCE_API_STREAMING_ENABLED = os.getenv("CONFERENCE_API_STREAMING_ENABLED", "true").lower() == "true"
+# With projection on, stop reading after this many records (0 = no record cap; the token budget still applies)
+CONFERENCE_API_STREAM_MAX_RECORDS = _env_int("CONFERENCE_API_STREAM_MAX_RECORDS", 0)
+
+# --- Upstream circuit breaker ---
+CIRCUIT_BREAKER_ENABLED = os.getenv("CIRCUIT_BREAKER_ENABLED", "true").lower() == "true"
+# Recent fetches considered, and how many are needed before the breaker can trip
+CIRCUIT_BREAKER_WINDOW = _env_int("CIRCUIT_BREAKER_WINDOW", 50)
+CIRCUIT_BREAKER_MIN_CALLS = _env_int("CIRCUIT_BREAKER_MIN_CALLS", 10)
+# Trip when this share of recent fetches failed (transport errors, 429, 5xx)...
+CIRCUIT_BREAKER_ERROR_RATE = _env_float("CIRCUIT_BREAKER_ERROR_RATE", 0.5)
+# ...or took at least CIRCUIT_BREAKER_SLOW_CALL_SECONDS
+CIRCUIT_BREAKER_SLOW_CALL_SECONDS = _env_float("CIRCUIT_BREAKER_SLOW_CALL_SECONDS", 10.0)
+CIRCUIT_BREAKER_SLOW_CALL_RATE = _env_float("CIRCUIT_BREAKER_SLOW_CALL_RATE", 0.8)
+# How long calls are rejected before probe calls are let through
+CIRCUIT_BREAKER_OPEN_SECONDS = _env_float("CIRCUIT_BREAKER_OPEN_SECONDS", 30.0)
+# Probe calls allowed at once while half-open; this many successes close the breaker
+CIRCUIT_BREAKER_HALF_OPEN_PROBES = _env_int("CIRCUIT_BREAKER_HALF_OPEN_PROBES", 1)
+
+# --- Batch tool (get_conferences_batch) ---
+# Most searchQueries accepted in one batch call; extra ones are reported as skipped
+BATCH_MAX_QUERIES = _env_int("CONFERENCE_BATCH_MAX_QUERIES", 8)
+# Searches of one batch call running against the upstream API at once
+BATCH_MAX_CONCURRENCY = _env_int("CONFERENCE_BATCH_MAX_CONCURRENCY", 4)
+
+# --- Next-page prefetch ---
+# After a full page N, fetch page N+1 in the background so "find 5 more" is served from memory
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "true").lower() == "true"
+# Prefetches running at once; further ones are skipped rather than queued
+PREFETCH_MAX_CONCURRENCY = _env_int("PREFETCH_MAX_CONCURRENCY", 2)
+# Prefetched pages kept waiting for their follow-up (LRU eviction beyond this)
+PREFETCH_MAX_ENTRIES = _env_int("PREFETCH_MAX_ENTRIES", 64)
+# How long a prefetched page waits for its follow-up
+PREFETCH_TTL_SECONDS = _env_float("PREFETCH_TTL_SECONDS", 120.0)
+# Query shapes (sorted filter keys joined by '+', e.g. 'country+rank') never prefetched, comma-separated
+PREFETCH_DISABLED_SHAPES = [s for s in os.getenv("PREFETCH_DISABLED_SHAPES", "").split(",") if s.strip()]
+# A shape is no longer prefetched once it has this many prefetches with a hit rate below the minimum (0 disables)
+PREFETCH_MIN_SAMPLES = _env_int("PREFETCH_MIN_SAMPLES", 20)
+PREFETCH_MIN_HIT_RATE = _env_float("PREFETCH_MIN_HIT_RATE", 0.1)
+
+# --- Local conference index (BM25 + dense vectors) ---
+_PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+LOCAL_INDEX_ENABLED = os.getenv("LOCAL_INDEX_ENABLED", "true").lower() == "true"
+# JSON snapshot of conference records (a list, or an API response with a 'payload' list)
+LOCAL_INDEX_SNAPSHOT_PATH = os.getenv("LOCAL_INDEX_SNAPSHOT_PATH", os.path.join(_PROJECT_ROOT, "data", "conferences_snapshot.json"))
+# CPU-only sentence-transformers model; multilingual so Vietnamese queries embed well
+LOCAL_INDEX_EMBEDDING_MODEL = os.getenv("LOCAL_INDEX_EMBEDDING_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+# Records fetched from the upstream API are added to the index as they arrive
+LOCAL_INDEX_LEARN_FROM_UPSTREAM = os.getenv("LOCAL_INDEX_LEARN_FROM_UPSTREAM", "true").lower() == "true"
+# Minimum interval between snapshot rewrites after incremental updates
+LOCAL_INDEX_AUTOSAVE_SECONDS = _env_float("LOCAL_INDEX_AUTOSAVE_SECONDS", 300.0)
+LOCAL_INDEX_MAX_RESULTS = _env_int("LOCAL_INDEX_MAX_RESULTS", 50)
+
+# --- Tool output projection ---
+# Records are reduced to a per-mode field whitelist and cleaned before reaching the LLM
+PROJECTION_ENABLED = os.getenv("PROJECTION_ENABLED", "true").lower() == "true"
+# 'json' (compact JSON) or 'table' (one line per conference)
+PROJECTION_FORMAT = os.getenv("PROJECTION_FORMAT", "json").lower()
+# Long text fields (summary, call for papers) are cut to this many characters
+PROJECTION_MAX_TEXT_CHARS = _env_int("PROJECTION_MAX_TEXT_CHARS", 400)
+# Hard cap on the estimated tokens of one tool result (0 disables trimming)
+PROJECTION_TOKEN_BUDGET = _env_int("PROJECTION_TOKEN_BUDGET", 3000)
@@ -0,0 +1,286 @@
+# services/conference-tool-mcp/app/http_client.py
+import asyncio
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+import logging
+log = logging.getLogger(__name__)
+
+from app.config import (
+    CONFERENCE_API_URL,
+    CONFERENCE_API_CONNECT_TIMEOUT_SECONDS,
+    CONFERENCE_API_READ_TIMEOUT_SECONDS,
+    CONFERENCE_API_MAX_RETRIES,
+    CONFERENCE_API_BACKOFF_BASE_SECONDS,
+    CONFERENCE_API_BACKOFF_MAX_SECONDS,
+    CONFERENCE_API_MAX_CONNECTIONS,
+    CONFERENCE_API_MAX_KEEPALIVE_CONNECTIONS,
+    CONFERENCE_API_HEDGE_ENABLED,
+    CONFERENCE_API_HEDGE_PERCENTILE,
+    CONFERENCE_API_HEDGE_MIN_SAMPLES,
+    CONFERENCE_API_HEDGE_MIN_DELAY_SECONDS,
+    CONFERENCE_API_HEDGE_MAX_RATIO,
+    CONFERENCE_API_STREAMING_ENABLED,
+    CIRCUIT_BREAKER_ENABLED,
+    CIRCUIT_BREAKER_WINDOW,
+    CIRCUIT_BREAKER_MIN_CALLS,
+    CIRCUIT_BREAKER_ERROR_RATE,
+    CIRCUIT_BREAKER_SLOW_CALL_SECONDS,
+    CIRCUIT_BREAKER_SLOW_CALL_RATE,
+    CIRCUIT_BREAKER_OPEN_SECONDS,
+    CIRCUIT_BREAKER_HALF_OPEN_PROBES,
+)
+from app.metrics import UPSTREAM_HEDGES, UPSTREAM_PAYLOAD_READS, UPSTREAM_RETRIES, UPSTREAM_SECONDS, log_span
+from app.resilience import CircuitBreaker, LatencyTracker
+from app.streaming import PayloadLimits, is_truncated, read_payload
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class UpstreamError(Exception):
+    """The upstream API answered, but without a usable 'payload'."""
+
+
+class UpstreamDeadlineExceeded(UpstreamError):
+    """The caller's time budget ran out before the upstream API answered."""
+
+
+class ConferenceAPIClient:
+    """
+    Async client for the confhub conference API.
+
+    A single instance shares one keep-alive connection pool across all tool calls,
+    bounds every request with connect/read deadlines, and retries transport errors,
+    429 and 5xx responses with full-jitter exponential backoff.
+
+    An attempt still running after the observed p95 latency is hedged with a second
+    identical GET (within a budget of CONFERENCE_API_HEDGE_MAX_RATIO of attempts), and
+    the first answer wins. A circuit breaker rejects fetches while the API is failing
+    or slow, so callers fail fast instead of waiting on it.
+
+    Response bodies are streamed: the 'payload' array is parsed record by record and
+    reading stops early at the caller's `PayloadLimits` (see app.streaming).
+    """
+
+    def __init__(
+        self,
+        base_url: str = CONFERENCE_API_URL,
+        connect_timeout: float = CONFERENCE_API_CONNECT_TIMEOUT_SECONDS,
+        read_timeout: float = CONFERENCE_API_READ_TIMEOUT_SECONDS,
+        max_retries: int = CONFERENCE_API_MAX_RETRIES,
+        backoff_base: float = CONFERENCE_API_BACKOFF_BASE_SECONDS,
+        backoff_max: float = CONFERENCE_API_BACKOFF_MAX_SECONDS,
+    ):
+        self.base_url = base_url
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.latencies = LatencyTracker()
+        self._attempts = 0
+        self._hedges = 0
+        self.breaker = CircuitBreaker(
+            "upstream",
+            enabled=CIRCUIT_BREAKER_ENABLED,
+            window=CIRCUIT_BREAKER_WINDOW,
+            min_calls=CIRCUIT_BREAKER_MIN_CALLS,
+            error_rate_threshold=CIRCUIT_BREAKER_ERROR_RATE,
+            slow_call_seconds=CIRCUIT_BREAKER_SLOW_CALL_SECONDS,
+            slow_call_rate_threshold=CIRCUIT_BREAKER_SLOW_CALL_RATE,
+            open_seconds=CIRCUIT_BREAKER_OPEN_SECONDS,
+            half_open_probes=CIRCUIT_BREAKER_HALF_OPEN_PROBES,
+        )
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=CONFERENCE_API_MAX_CONNECTIONS,
+                max_keepalive_connections=CONFERENCE_API_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+        )
+
+    async def fetch_payload(
+        self,
+        params: Dict[str, List[str]],
+        timeout_seconds: Optional[float] = None,
+        limits: Optional[PayloadLimits] = None,
+    ) -> Any:
+        """
+        Fetches and returns the 'payload' for the given query params. Raises on failure.
+        With `timeout_seconds` (the caller's remaining budget), attempts and retries stop at that deadline.
+        `limits` filters the fields of each record and caps how much of the payload is read.
+        Raises `CircuitOpenError` without contacting the API while the circuit breaker is open.
+        """
+        probe = self.breaker.acquire()
+        expires_at = time.monotonic() + timeout_seconds if timeout_seconds is not None else None
+        started = time.perf_counter()
+        outcome = "error"
+        upstream_failed: Optional[bool] = None
+        try:
+            response = await self._get_with_retries(params, expires_at)
+            upstream_failed = False
+            try:
+                if CONFERENCE_API_STREAMING_ENABLED:
+                    has_payload, payload, fields = await read_payload(response.aiter_bytes(), limits)
+                    UPSTREAM_PAYLOAD_READS.labels("cutoff" if is_truncated(payload) else "full").inc()
+                else:
+                    await response.aread()
+                    fields = response.json()
+                    has_payload, payload = "payload" in fields, fields.get("payload")
+            finally:
+                # Dừng sớm: đóng response khi chưa đọc hết thân, kết nối không được trả lại pool.
+                await response.aclose()
+            if not has_payload:
+                raise UpstreamError(fields.get('errorMessage', 'Unknown error'))
+            outcome = "ok"
+            return payload
+        except httpx.TransportError:
+            upstream_failed = True
+            raise
+        except httpx.HTTPStatusError as e:
+            # 4xx (trừ 429) là lỗi của câu truy vấn, không phải dấu hiệu upstream gặp sự cố.
+            upstream_failed = e.response.status_code in RETRYABLE_STATUS_CODES
+            raise
+        except UpstreamDeadlineExceeded:
+            # Hết ngân sách của caller: chỉ tính độ chậm, không tính là lỗi của upstream.
+            upstream_failed = False
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            if upstream_failed is None:
+                self.breaker.abandon(probe)
+            else:
+                self.breaker.record(probe, upstream_failed, elapsed)
+            UPSTREAM_SECONDS.labels(outcome).observe(elapsed)
+            log_span("upstream_fetch", elapsed, outcome=outcome)
+
+    def _attempt_timeout(self, expires_at: Optional[float]) -> httpx.Timeout:
+        if expires_at is None:
+            return httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+        remaining = expires_at - time.monotonic()
+        if remaining <= 0:
+            raise UpstreamDeadlineExceeded("Request deadline exceeded before the upstream API answered.")
+        return httpx.Timeout(min(self.read_timeout, remaining), connect=min(self.connect_timeout, remaining))
+
+    async def _get_with_retries(self, params: Dict[str, List[str]], expires_at: Optional[float] = None) -> httpx.Response:
+        attempt = 0
+        while True:
+            try:
+                response = await self._hedged_get(params, self._attempt_timeout(expires_at))
+                if response.status_code not in RETRYABLE_STATUS_CODES or attempt >= self.max_retries:
+                    if response.is_error:
+                        await response.aclose()
+                    response.raise_for_status()
+                    return response
+                await response.aclose()
+                log.warning(f"Upstream returned {response.status_code} (attempt {attempt + 1}); retrying.")
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries:
+                    raise
+                log.warning(f"Upstream transport error (attempt {attempt + 1}): {e!r}; retrying.")
+            delay = self._backoff_delay(attempt)
+            if expires_at is not None and time.monotonic() + delay >= expires_at:
+                # Không còn đủ thời gian cho một lần thử nữa: báo lỗi ngay thay vì chờ vô ích.
+                raise UpstreamDeadlineExceeded("Request deadline exceeded while retrying the upstream API.")
+            UPSTREAM_RETRIES.inc()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _hedged_get(self, params: Dict[str, List[str]], timeout: httpx.Timeout) -> httpx.Response:
+        """
+        One GET attempt. If it has not answered after the hedge delay, a second identical
+        GET is sent and whichever succeeds first is returned; the other is cancelled.
+        Returns once the response headers arrive; the caller reads (and closes) the body.
+        """
+        async def attempt() -> Tuple[httpx.Response, float]:
+            started = time.perf_counter()
+            request = self._client.build_request("GET", self.base_url, params=params, timeout=timeout)
+            response = await self._client.send(request, stream=True)
+            return response, time.perf_counter() - started
+
+        self._attempts += 1
+        first = asyncio.ensure_future(attempt())
+        tasks = [first]
+        try:
+            delay = self._hedge_delay()
+            if delay is not None:
+                done, _ = await asyncio.wait({first}, timeout=delay)
+                if not done:
+                    self._hedges += 1
+                    UPSTREAM_HEDGES.labels("sent").inc()
+                    log.info(f"Upstream attempt slower than {delay:.2f}s; sending a hedged request.")
+                    tasks.append(asyncio.ensure_future(attempt()))
+
+            pending = set(tasks)
+            winner = None
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=tasks.index):
+                    if task.exception() is not None:
+                        error = error or task.exception()
+                        continue
+                    response, elapsed = task.result()
+                    if response.status_code < 500:
+                        self.latencies.observe(elapsed)
+                    if len(tasks) > 1:
+                        UPSTREAM_HEDGES.labels("hedge_won" if task is not first else "first_won").inc()
+                    winner = task
+                    return response
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif task is not winner and not task.cancelled() and task.exception() is None:
+                    # Hai lần thử cùng xong: đóng response của lần thua để trả kết nối.
+                    await task.result()[0].aclose()
+
+    def _hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging an attempt, or None when this attempt must not be hedged."""
+        if not CONFERENCE_API_HEDGE_ENABLED or self.latencies.count() < CONFERENCE_API_HEDGE_MIN_SAMPLES:
+            return None
+        if self._hedges >= CONFERENCE_API_HEDGE_MAX_RATIO * self._attempts:
+            return None
+        return max(CONFERENCE_API_HEDGE_MIN_DELAY_SECONDS, self.latencies.percentile(CONFERENCE_API_HEDGE_PERCENTILE))
+
+    def stats(self) -> Dict[str, Any]:
+        p95 = self.latencies.percentile(CONFERENCE_API_HEDGE_PERCENTILE)
+        return {
+            "breaker": self.breaker.stats(),
+            "hedging": {
+                "enabled": CONFERENCE_API_HEDGE_ENABLED,
+                "attempts": self._attempts,
+                "hedged": self._hedges,
+                "latencySamples": self.latencies.count(),
+                "hedgeAfterSeconds": round(max(CONFERENCE_API_HEDGE_MIN_DELAY_SECONDS, p95), 3) if p95 is not None else None,
+            },
+        }
+
+    def _backoff_delay(self, attempt: int) -> float:
+        # "Full jitter": ngẫu nhiên trong [0, min(max, base * 2^attempt)] để tránh các retry dồn cục.
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+_api_client: Optional[ConferenceAPIClient] = None
+
+
+def get_api_client() -> ConferenceAPIClient:
+    """Returns the process-wide client, creating it on first use inside the running event loop."""
+    global _api_client
+    if _api_client is None:
+        _api_client = ConferenceAPIClient()
+    return _api_client
+
+
+async def close_api_client() -> None:
+    global _api_client
+    if _api_client is not None:
+        await _api_client.aclose()
+        _api_client = None
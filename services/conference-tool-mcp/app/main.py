@@ -1,7 +1,10 @@
+import json
 import logging
 import os
 import sys
+from contextlib import asynccontextmanager
 from datetime import datetime
+from typing import AsyncIterator, List, Optional
 
 # --- Thiết lập đường dẫn để giải quyết vấn đề import ---
 # Thêm thư mục cha của 'app' (tức là 'conference-tool-mcp') vào sys.path
@@ -35,7 +38,13 @@ logging.info(f"System Path: {sys.path}")
 
 try:
     from mcp.server.fastmcp import FastMCP
-    from app.tool_logic import get_conferences_from_api
+    from app.tool_logic import get_conferences_from_api, response_cache, search_conferences_in_index, local_index
+    from app.tool_logic import get_conferences_batch_from_api, page_prefetcher
+    from app.tool_logic import count_conferences_in_store, record_store, upstream_flights
+    from app.http_client import close_api_client, get_api_client
+    from app.metrics import REGISTRY, TOOL_SECONDS, request_context, timed
+    from starlette.requests import Request
+    from starlette.responses import PlainTextResponse
     logging.info("Successfully imported FastMCP and tool logic.")
 except ImportError as e:
     logging.error(f"Failed to import necessary modules: {e}", exc_info=True)
@@ -44,13 +53,31 @@ except ImportError as e:
 # 1. Khởi tạo FastMCP server với cấu hình host và port
 #    Chúng ta sẽ chạy nó trên cổng 8001 để tránh xung đột với ai-core-py (cổng 8000)
 logging.info("Initializing FastMCP server for HTTP transport...")
+
+# Lifespan chạy một lần cho cả tiến trình ở stdio, nhưng một lần cho mỗi session ở streamable-http:
+# chỉ đóng HTTP client dùng chung khi session cuối cùng kết thúc.
+_open_sessions = 0
+
+@asynccontextmanager
+async def lifespan(_: FastMCP) -> AsyncIterator[None]:
+    global _open_sessions
+    _open_sessions += 1
+    try:
+        yield
+    finally:
+        _open_sessions -= 1
+        if _open_sessions == 0:
+            await close_api_client()
+            logging.info("Upstream HTTP client closed.")
+
 server = FastMCP(
     name="ConferenceInformationService",
     instructions="A specialized service providing tools to search for and retrieve information about technology conferences.",
     # Thêm các thiết lập cho HTTP server
     host="127.0.0.1",
     port=8001,
-    streamable_http_path="/mcp" # Endpoint mà client sẽ gọi tới
+    streamable_http_path="/mcp", # Endpoint mà client sẽ gọi tới
+    lifespan=lifespan
 )
 logging.info(f"FastMCP server '{server.name}' configured for http://{server.settings.host}:{server.settings.port}{server.settings.streamable_http_path}")
 
@@ -59,19 +86,148 @@ logging.info(f"FastMCP server '{server.name}' configured for http://{server.sett
     title="Get Conferences",
     description="Searches for conferences by generating a URL-encoded query string."
 )
-def get_conferences(searchQuery: str) -> str:
+async def get_conferences(searchQuery: str, timeoutSeconds: Optional[float] = None, requestId: Optional[str] = None) -> str:
+    # Handler async: một lần gọi API chậm không còn chặn event loop của FastMCP.
+    # timeoutSeconds: thời gian còn lại của request phía client, giới hạn lần gọi API upstream.
+    # requestId: id request của ai-core, gắn vào các dòng log span để đối chiếu hai phía.
     logging.info(f"Tool 'get_conferences' called with searchQuery: {searchQuery}")
-    result = get_conferences_from_api(searchQuery)
+    with request_context(requestId), timed("tool_get_conferences", TOOL_SECONDS, "get_conferences"):
+        result = await get_conferences_from_api(searchQuery, timeoutSeconds)
     logging.info(f"Tool 'get_conferences' finished. Result preview: {result[:100]}...")
     return result
 
 logging.info("Tool 'get_conferences' has been registered.")
 
-# 3. Chạy server với transport là 'streamable-http'
+@server.tool(
+    title="Get Conferences (Batch)",
+    description=(
+        "Runs several get_conferences searches at once and returns one merged result with a "
+        "labeled section per search. 'searchQueries' is a list of URL-encoded query strings "
+        "(e.g. ['topics=AI&country=Germany', 'topics=AI&country=France']). Conferences matched "
+        "by more than one search are listed once."
+    )
+)
+async def get_conferences_batch(searchQueries: List[str], timeoutSeconds: Optional[float] = None, requestId: Optional[str] = None) -> str:
+    # Các searchQuery chạy song song (có giới hạn): N tra cứu tốn khoảng một lần độ trễ upstream.
+    logging.info(f"Tool 'get_conferences_batch' called with searchQueries: {searchQueries}")
+    with request_context(requestId), timed("tool_get_conferences_batch", TOOL_SECONDS, "get_conferences_batch"):
+        result = await get_conferences_batch_from_api(searchQueries, timeoutSeconds)
+    logging.info(f"Tool 'get_conferences_batch' finished. Result preview: {result[:100]}...")
+    return result
+
+logging.info("Tool 'get_conferences_batch' has been registered.")
+
+@server.tool(
+    title="Search Conferences (Local Index)",
+    description=(
+        "Searches the local conference index without calling the remote API. The index holds only "
+        "conferences from the snapshot and from earlier get_conferences results, not the full database. "
+        "'query' is free text matched against acronym, title, topics and summary (keyword + semantic). "
+        "'filters' is an optional URL-encoded query string with the same keys as get_conferences "
+        "(e.g. 'country=Vietnam&rank=B&fromDate=2025-01-01'). 'limit' is the maximum number of results."
+    )
+)
+async def search_conferences_local(query: str = "", filters: str = "", limit: int = 5) -> str:
+    logging.info(f"Tool 'search_conferences_local' called with query: {query!r}, filters: {filters!r}, limit: {limit}")
+    with timed("tool_search_conferences_local", TOOL_SECONDS, "search_conferences_local"):
+        result = await search_conferences_in_index(query, filters, limit)
+    logging.info(f"Tool 'search_conferences_local' finished. Result preview: {result[:100]}...")
+    return result
+
+logging.info("Tool 'search_conferences_local' has been registered.")
+
+@server.tool(
+    title="Count Conferences",
+    description=(
+        "Counts locally indexed conferences without returning the records. The counts cover only "
+        "conferences from the snapshot and from earlier get_conferences results, not the full database. "
+        "'filters' is an optional URL-encoded query string with the same keys as get_conferences "
+        "(e.g. 'accessType=Offline&continent=Asia'). 'groupBy' optionally breaks the count down by "
+        "one of: country, continent, rank, source, accessType, topics, year, month. "
+        "'limit' caps the number of groups returned."
+    )
+)
+async def count_conferences(filters: str = "", groupBy: str = "", limit: int = 20) -> str:
+    logging.info(f"Tool 'count_conferences' called with filters: {filters!r}, groupBy: {groupBy!r}, limit: {limit}")
+    with timed("tool_count_conferences", TOOL_SECONDS, "count_conferences"):
+        result = await count_conferences_in_store(filters, groupBy, limit)
+    logging.info(f"Tool 'count_conferences' finished. Result preview: {result[:100]}...")
+    return result
+
+logging.info("Tool 'count_conferences' has been registered.")
+
+# Hit/miss counters của cache, dùng để định cỡ CONFERENCE_CACHE_MAX_ENTRIES / TTL.
+@server.resource(
+    "stats://cache",
+    name="cache_stats",
+    description="Hit/miss/eviction counters of the upstream response cache.",
+    mime_type="application/json"
+)
+def cache_stats() -> str:
+    return json.dumps(response_cache.stats())
+
+@server.resource(
+    "stats://local-index",
+    name="local_index_stats",
+    description="Record and vector counts of the local conference index.",
+    mime_type="application/json"
+)
+def local_index_stats() -> str:
+    return json.dumps({**local_index.stats(), "recordStore": record_store.stats()})
+
+@server.resource(
+    "stats://coalescing",
+    name="coalescing_stats",
+    description="How many upstream lookups were shared with an identical in-flight request.",
+    mime_type="application/json"
+)
+def coalescing_stats() -> str:
+    return json.dumps(upstream_flights.stats())
+
+# Tỉ lệ trang lấy trước được dùng tới, theo shape truy vấn (để tắt prefetch cho các shape không đáng).
+@server.resource(
+    "stats://prefetch",
+    name="prefetch_stats",
+    description="Next-page prefetch counters and hit rate per query shape.",
+    mime_type="application/json"
+)
+def prefetch_stats() -> str:
+    return json.dumps(page_prefetcher.stats())
+
+# Trạng thái circuit breaker và hedging của API upstream.
+@server.resource(
+    "stats://upstream",
+    name="upstream_stats",
+    description="Upstream API circuit breaker state and hedged request counters.",
+    mime_type="application/json"
+)
+def upstream_stats() -> str:
+    return json.dumps(get_api_client().stats())
+
+# Histogram thời gian tool / API upstream theo định dạng Prometheus.
+@server.resource(
+    "metrics://prometheus",
+    name="prometheus_metrics",
+    description="Tool and upstream fetch latency histograms and cache counters, in Prometheus text format.",
+    mime_type="text/plain"
+)
+def prometheus_metrics() -> str:
+    return REGISTRY.render()
+
+logging.info("Resources 'stats://cache', 'stats://local-index', 'stats://coalescing', 'stats://prefetch', 'stats://upstream' and 'metrics://prometheus' have been registered.")
+
+# Ở chế độ HTTP, Prometheus scrape trực tiếp /metrics. Ở chế độ stdio, ai-core đọc resource ở trên
+# qua session trong pool và gộp vào /metrics của nó (nhãn mcp_slot).
+@server.custom_route("/metrics", methods=["GET"])
+async def metrics_endpoint(request: Request) -> PlainTextResponse:
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# 3. Chạy server. Mặc định là 'streamable-http'; ai-core-py spawn server với
+#    MCP_TRANSPORT=stdio để giữ các session "ấm" trong pool của nó.
 if __name__ == "__main__":
+    transport = os.getenv("MCP_TRANSPORT", "streamable-http")
     try:
-        logging.info("Server is now starting in Streamable HTTP mode...")
-        # THAY ĐỔI DUY NHẤT Ở ĐÂY
-        server.run(transport="streamable-http")
+        logging.info(f"Server is now starting in '{transport}' mode...")
+        server.run(transport=transport)
     except Exception as e:
         logging.error("A critical error occurred during server run", exc_info=True)
\ No newline at end of file
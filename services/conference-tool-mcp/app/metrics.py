@@ -0,0 +1,240 @@
+# services/conference-tool-mcp/app/metrics.py
+"""
+Minimal Prometheus-style metrics and request-scoped timing spans for the MCP server.
+
+Dependency-free, with the same API as ai-core's app.observability.metrics: metrics are
+created on `REGISTRY` and updated through `labels(...)` children. `REGISTRY.render()`
+produces the Prometheus text exposition format, served at /metrics (HTTP transport)
+and as the 'metrics://prometheus' resource (stdio transport, which ai-core reads from
+its pooled sessions and merges into its own /metrics).
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import logging
+log = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str, **kwargs: str):
+        """Returns the child for one label combination (created on first use, then cached)."""
+        key = tuple(str(v) for v in values) if values else tuple(str(kwargs[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._children[key] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            lines.extend(self._render_child(key, child))
+        return lines
+
+    def _render_child(self, key: Tuple[str, ...], child) -> List[str]:
+        raise NotImplementedError
+
+
+class _Value:
+    __slots__ = ("value", "lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self.lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def _render_child(self, key, child):
+        return [f"{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(child.value)}"]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def _render_child(self, key, child):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"]
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "count", "lock")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _render_child(self, key, child):
+        with child.lock:
+            counts, total, count = list(child.counts), child.sum, child.count
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            labels = _format_labels(self.labelnames, key, (("le", _format_value(bound)),))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, (('le', '+Inf'),))} {count}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds the process's metrics and renders them in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(
+        self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+TOOL_SECONDS = REGISTRY.histogram("mcp_tool_duration_seconds", "Duration of one MCP tool call.", ["tool"])
+UPSTREAM_SECONDS = REGISTRY.histogram(
+    "mcp_upstream_fetch_duration_seconds", "Duration of one upstream conference API fetch, retries included.", ["outcome"]
+)
+UPSTREAM_RETRIES = REGISTRY.counter("mcp_upstream_retries", "Retried upstream API attempts.")
+CACHE_LOOKUPS = REGISTRY.counter("mcp_cache_lookups", "Response cache lookups by result.", ["result"])
+PREFETCHES = REGISTRY.counter("mcp_prefetches", "Next-page prefetches by result.", ["result"])
+UPSTREAM_HEDGES = REGISTRY.counter(
+    "mcp_upstream_hedges", "Hedged upstream attempts: 'sent', and which attempt answered first.", ["result"]
+)
+UPSTREAM_PAYLOAD_READS = REGISTRY.counter(
+    "mcp_upstream_payload_reads", "Streamed upstream payloads: read 'full', or 'cutoff' early at a record/size cap.", ["read"]
+)
+CIRCUIT_STATE = REGISTRY.gauge("mcp_upstream_circuit_state", "Circuit breaker state: 0 closed, 1 half-open, 2 open.", ["circuit"])
+CIRCUIT_TRANSITIONS = REGISTRY.counter("mcp_upstream_circuit_transitions", "Circuit breaker state changes.", ["circuit", "state"])
+CIRCUIT_REJECTIONS = REGISTRY.counter("mcp_upstream_circuit_rejections", "Calls rejected by an open circuit breaker.", ["circuit"])
+
+
+# --- Span theo request ---
+# requestId do ai-core gửi kèm lời gọi tool, để ghép log hai tiến trình với nhau.
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+
+@contextmanager
+def request_context(request_id: Optional[str]) -> Iterator[None]:
+    token = _request_id.set(request_id)
+    try:
+        yield
+    finally:
+        _request_id.reset(token)
+
+
+def log_span(name: str, seconds: float, **attrs: object) -> None:
+    details = "".join(f" {key}={value}" for key, value in attrs.items())
+    log.info(f"span request={_request_id.get() or '-'} {name}={seconds:.3f}s{details}")
+
+
+@contextmanager
+def timed(name: str, histogram: Histogram, *labelvalues: str) -> Iterator[None]:
+    """Observes the block's duration in `histogram` and logs it as a span of the current request."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        histogram.labels(*labelvalues).observe(elapsed)
+        log_span(name, elapsed)
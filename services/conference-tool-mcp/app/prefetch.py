@@ -0,0 +1,193 @@
+# services/conference-tool-mcp/app/prefetch.py
+"""
+Speculative prefetch of the next result page of paginated conference searches.
+
+When page N of a query comes back full, page N+1 is fetched in the background and
+parked in a small short-TTL cache, so a "find 5 more" follow-up is answered without
+a cold upstream call. Prefetching is bounded by a concurrency cap (extra prefetches
+are skipped, not queued) and by the number of parked pages.
+
+Hit rates are tracked per query shape (the sorted filter keys, e.g. 'country+rank');
+shapes listed in PREFETCH_DISABLED_SHAPES, or whose hit rate stays below
+PREFETCH_MIN_HIT_RATE after PREFETCH_MIN_SAMPLES prefetches, are not prefetched.
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+from urllib.parse import parse_qsl, urlencode
+
+from app.metrics import PREFETCHES
+from app.response_cache import ResponseCache, canonical_query_key
+from app.streaming import is_truncated
+
+import logging
+log = logging.getLogger(__name__)
+
+# Số bản ghi mỗi trang của API khi searchQuery không ghi rõ perPage.
+DEFAULT_PER_PAGE = 5
+PAGING_KEYS = ("page", "perPage")
+
+
+def query_shape(searchQuery: str) -> str:
+    """The filter keys of a query, without paging: queries of one shape share prefetch statistics."""
+    keys = {key for key, _ in parse_qsl(searchQuery) if key not in PAGING_KEYS}
+    return "+".join(sorted(keys)) or "(none)"
+
+
+def next_page_query(searchQuery: str, payload: Any) -> Optional[str]:
+    """
+    The searchQuery of the page after this one, or None if this page was not full. Only
+    'page' changes: 'perPage' is kept if the query had it and not added otherwise, so the
+    follow-up the agent sends ("same filters, page=2") has the same cache key.
+    """
+    params = parse_qsl(searchQuery, keep_blank_values=False)
+    values = dict(params)
+    try:
+        page = max(1, int(values.get("page", 1)))
+        per_page = max(1, int(values.get("perPage", DEFAULT_PER_PAGE)))
+    except ValueError:
+        return None
+    # Trang bị cắt khi stream vẫn là trang đầy đủ ở upstream.
+    if not isinstance(payload, list) or (len(payload) < per_page and not is_truncated(payload)):
+        return None
+    following = [(k, v) for k, v in params if k != "page"]
+    return urlencode(following + [("page", page + 1)])
+
+
+class PagePrefetcher:
+    """
+    Prefetches page N+1 after a full page N and parks it for `ttl_seconds`.
+
+    `fetch(cache_key, searchQuery)` performs the upstream fetch; it should go through
+    the same single-flight group as regular lookups, so a follow-up arriving while the
+    prefetch is still running joins it instead of fetching twice.
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        max_concurrency: int,
+        max_entries: int,
+        ttl_seconds: float,
+        min_samples: int = 0,
+        min_hit_rate: float = 0.0,
+        disabled_shapes: Iterable[str] = (),
+    ):
+        self.enabled = enabled and max_concurrency > 0 and max_entries > 0
+        self.max_concurrency = max_concurrency
+        self.min_samples = min_samples
+        self.min_hit_rate = min_hit_rate
+        self._disabled_shapes = {shape.strip() for shape in disabled_shapes if shape.strip()}
+        self._parked = ResponseCache(max_entries=max(1, max_entries), ttl_seconds=ttl_seconds)
+        self._tasks: Dict[str, "asyncio.Task[Any]"] = {}
+        # Shape của từng trang đang chờ được dùng, để tính hit theo shape.
+        self._shapes_by_key: Dict[str, str] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    # --- Public API ---
+    def maybe_prefetch(
+        self,
+        searchQuery: str,
+        payload: Any,
+        is_cached: Callable[[str], bool],
+        fetch: Callable[[str, str], Awaitable[Any]],
+    ) -> None:
+        """Starts fetching the next page of `searchQuery` in the background if page N was full."""
+        if not self.enabled:
+            return
+        next_query = next_page_query(searchQuery, payload)
+        if next_query is None:
+            return
+        key = canonical_query_key(next_query)
+        if key in self._tasks or self._parked.contains(key) or is_cached(key):
+            return
+        shape = query_shape(searchQuery)
+        if not self._shape_enabled(shape):
+            self._count(shape, "skipped_shape")
+            return
+        if len(self._tasks) >= self.max_concurrency:
+            # Không xếp hàng: một prefetch đến muộn khó còn hữu ích.
+            self._count(shape, "skipped_busy")
+            return
+
+        async def run() -> Any:
+            try:
+                page = await fetch(key, next_query)
+                self._parked.set(key, page)
+                with self._lock:
+                    self._shapes_by_key[key] = shape
+                self._count(shape, "prefetched")
+                return page
+            except Exception as e:
+                self._count(shape, "errors")
+                log.info(f"Prefetch of '{next_query}' failed: {e}")
+                return None
+            finally:
+                self._tasks.pop(key, None)
+
+        self._tasks[key] = asyncio.ensure_future(run())
+        log.info(f"Prefetching next page: {next_query}")
+
+    async def take(self, cache_key: str, timeout_seconds: Optional[float] = None) -> Optional[Any]:
+        """
+        Returns (and removes) the prefetched page for `cache_key`, waiting for a prefetch
+        still in flight for up to `timeout_seconds`. Returns None when there is none.
+        """
+        task = self._tasks.get(cache_key)
+        if task is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(task), timeout_seconds)
+            except asyncio.TimeoutError:
+                return None
+        page = self._parked.pop(cache_key)
+        if page is None:
+            return None
+        with self._lock:
+            shape = self._shapes_by_key.pop(cache_key, "(unknown)")
+        self._count(shape, "hits")
+        return page
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            shapes = {shape: dict(counters) for shape, counters in self._stats.items()}
+        for shape, counters in shapes.items():
+            counters["hitRate"] = self._hit_rate(counters)
+            counters["enabled"] = self._shape_enabled(shape)
+        totals: Dict[str, Any] = {}
+        for counters in shapes.values():
+            for name, value in counters.items():
+                if isinstance(value, int) and not isinstance(value, bool):
+                    totals[name] = totals.get(name, 0) + value
+        totals["hitRate"] = self._hit_rate(totals)
+        return {
+            "enabled": self.enabled,
+            "inFlight": len(self._tasks),
+            "parked": self._parked.stats()["size"],
+            "totals": totals,
+            "shapes": shapes,
+        }
+
+    # --- Internals ---
+    @staticmethod
+    def _hit_rate(counters: Dict[str, Any]) -> float:
+        prefetched = counters.get("prefetched", 0)
+        return round(counters.get("hits", 0) / prefetched, 4) if prefetched else 0.0
+
+    def _shape_enabled(self, shape: str) -> bool:
+        if shape in self._disabled_shapes:
+            return False
+        if self.min_samples <= 0 or self.min_hit_rate <= 0:
+            return True
+        with self._lock:
+            counters = self._stats.get(shape, {})
+            prefetched = counters.get("prefetched", 0)
+            hits = counters.get("hits", 0)
+        # Đủ mẫu mà ít khi được dùng: prefetch shape này chỉ tốn lượt gọi upstream.
+        return prefetched < self.min_samples or hits / prefetched >= self.min_hit_rate
+
+    def _count(self, shape: str, name: str) -> None:
+        PREFETCHES.labels(name).inc()
+        with self._lock:
+            counters = self._stats.setdefault(shape, {})
+            counters[name] = counters.get(name, 0) + 1
@@ -0,0 +1,174 @@
+# services/conference-tool-mcp/app/projection.py
+"""
+Shrinks upstream conference payloads before they are returned to the agent.
+
+Records are projected to a per-mode field whitelist, cleaned of ids, nulls and
+empty values, long text is truncated, and the result is cut to a token budget.
+The output is either compact JSON or a one-line-per-record text table.
+"""
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.search.records import normalize_record
+from app.streaming import is_truncated
+
+# Trường được giữ lại theo từng chế độ truy vấn (mode). Tên trường là khóa cấp cao nhất của bản ghi upstream.
+FIELD_WHITELISTS: Dict[str, tuple] = {
+    "list": (
+        "title", "acronym", "location", "rank", "ranks", "rankSourceFoRData", "source",
+        "dates", "accessType", "topics", "researchFields", "link", "status",
+    ),
+    "detail": (
+        "title", "acronym", "location", "rank", "ranks", "rankSourceFoRData", "source",
+        "dates", "accessType", "topics", "researchFields", "link", "status", "publisher",
+        "summary", "callForPaper", "cfpLink", "impLink", "year", "fieldOfResearchs",
+    ),
+}
+# Các trường văn bản dài, sẽ bị cắt ngắn theo `max_text_chars`.
+LONG_TEXT_FIELDS = ("summary", "callForPaper", "description")
+# Trường định danh nội bộ, vô nghĩa với LLM nhưng tốn token.
+_ID_KEY = re.compile(r"^(_?id|.*Id|.*_id|uuid|createdAt|updatedAt|__v)$")
+_UUID_VALUE = re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")
+# Ước lượng thô: ~4 ký tự mỗi token, đủ chính xác để giữ ngân sách.
+CHARS_PER_TOKEN = 4
+
+TABLE_COLUMNS = ("acronym", "title", "location", "rank", "dates", "accessType", "topics", "link")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    if max_chars <= 0 or len(text) <= max_chars:
+        return text
+    return text[:max_chars].rstrip() + "…"
+
+
+def _clean(value: Any, max_text_chars: int, key: str = "") -> Any:
+    """Recursively drops ids, UUIDs, nulls and empty containers; truncates long strings."""
+    if isinstance(value, dict):
+        cleaned = {}
+        for k, v in value.items():
+            if _ID_KEY.match(k):
+                continue
+            v = _clean(v, max_text_chars, k)
+            if v not in (None, "", [], {}):
+                cleaned[k] = v
+        return cleaned
+    if isinstance(value, list):
+        items = [_clean(v, max_text_chars, key) for v in value]
+        return [v for v in items if v not in (None, "", [], {})]
+    if isinstance(value, str):
+        if _UUID_VALUE.match(value):
+            return None
+        limit = max_text_chars if key in LONG_TEXT_FIELDS else max_text_chars * 2
+        return _truncate(value.strip(), limit)
+    return value
+
+
+def project_record(record: Any, mode: str, max_text_chars: int) -> Any:
+    if not isinstance(record, dict):
+        return _clean(record, max_text_chars)
+    whitelist = FIELD_WHITELISTS.get(mode, FIELD_WHITELISTS["list"])
+    projected = {k: record[k] for k in whitelist if k in record}
+    # Lược đồ lạ (không khớp trường nào): giữ toàn bộ bản ghi, chỉ làm sạch.
+    return _clean(projected or record, max_text_chars)
+
+
+def _table_row(record: Any, mode: str, max_text_chars: int) -> str:
+    if not isinstance(record, dict):
+        return json.dumps(_clean(record, max_text_chars), ensure_ascii=False)
+    flat = normalize_record(record)
+    location = ", ".join(filter(None, [flat["cityStateProvince"], flat["country"]]))
+    rank = " ".join(filter(None, [flat["rank"], f"({flat['source']})" if flat["source"] else ""]))
+    dates = " → ".join(filter(None, [flat["fromDate"], flat["toDate"]]))
+    if flat["subToDate"]:
+        dates = f"{dates}; submission due {flat['subToDate']}" if dates else f"submission due {flat['subToDate']}"
+    cells = {
+        "acronym": flat["acronym"],
+        "title": flat["title"],
+        "location": location,
+        "rank": rank,
+        "dates": dates,
+        "accessType": flat["accessType"],
+        "topics": ", ".join(flat["topics"][:5]),
+        "link": flat["link"],
+    }
+    row = " | ".join(cells[c] or "-" for c in TABLE_COLUMNS)
+    if mode == "detail" and flat["summary"]:
+        row += f"\n    summary: {_truncate(' '.join(flat['summary'].split()), max_text_chars)}"
+    return row
+
+
+def _omitted_note(omitted: int, more_unread: bool = False) -> str:
+    # "N+": phần còn lại của trang không được đọc (dừng sớm khi stream), chỉ biết cận dưới.
+    count = f"{omitted + 1}+" if more_unread else str(omitted)
+    return (
+        f"({count} more conference(s) omitted to stay within the context budget; "
+        f"use a smaller perPage or request the next page to see them.)"
+    )
+
+
+def _render_record(record: Any, mode: str, output_format: str, max_text_chars: int) -> str:
+    if output_format == "table":
+        return _table_row(record, mode, max_text_chars)
+    return json.dumps(project_record(record, mode, max_text_chars), ensure_ascii=False, separators=(",", ":"))
+
+
+def budget_chars(token_budget: int, output_format: str) -> int:
+    """Characters available to records under `token_budget`, after the fixed table header or JSON brackets."""
+    fixed = len(" | ".join(TABLE_COLUMNS)) if output_format == "table" else 2
+    return token_budget * CHARS_PER_TOKEN - fixed
+
+
+def rendered_size(record: Any, mode: str = "list", output_format: str = "json", max_text_chars: int = 300) -> int:
+    """Characters one record adds to `render_payload` output, separator included."""
+    return len(_render_record(record, mode, output_format, max_text_chars)) + 1
+
+
+def render_payload(
+    payload: Any,
+    mode: str = "list",
+    output_format: str = "json",
+    max_text_chars: int = 300,
+    token_budget: int = 0,
+) -> Tuple[str, int, int]:
+    """
+    Renders a (non-empty) upstream payload for the LLM and returns (text, kept, omitted):
+    how many of the payload's records are in the text and how many were dropped.
+    `token_budget` <= 0 disables trimming; otherwise whole records are dropped from the end
+    until the estimate fits, and a note says how many were omitted. At least one record is
+    always kept. A truncated streamed payload (see app.streaming) also gets the note, with
+    the count as a lower bound.
+    """
+    records: List[Any] = payload if isinstance(payload, list) else [payload]
+    rendered = [_render_record(r, mode, output_format, max_text_chars) for r in records]
+
+    kept = len(rendered)
+    if token_budget > 0:
+        available = budget_chars(token_budget, output_format)
+        used = 0
+        for i, text in enumerate(rendered):
+            used += len(text) + 1
+            if used > available and i > 0:
+                kept = i
+                break
+    omitted = len(rendered) - kept
+    more_unread = is_truncated(payload)
+
+    if output_format == "table":
+        text = "\n".join([" | ".join(TABLE_COLUMNS)] + rendered[:kept])
+    elif isinstance(payload, list):
+        text = "[" + ",".join(rendered[:kept]) + "]"
+    else:
+        text = rendered[0]
+    if omitted or more_unread:
+        text += "\n" + _omitted_note(omitted, more_unread)
+    return text, kept, omitted
+
+
+def query_mode(params: Dict[str, List[str]]) -> str:
+    mode: Optional[str] = (params.get("mode") or [None])[0]
+    return "detail" if mode and mode.strip().lower() == "detail" else "list"
@@ -0,0 +1,195 @@
+# services/conference-tool-mcp/app/resilience.py
+"""
+Latency tracking and a circuit breaker for the upstream conference API.
+
+`LatencyTracker` keeps the latencies of recent successful attempts so the client can
+hedge an attempt that runs past the observed p95. `CircuitBreaker` watches the outcome
+of recent fetches and, when too many fail or are slow, rejects calls for a while
+instead of letting every request wait on a struggling upstream; after the open period
+a few probe calls decide whether it closes again.
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from app.metrics import CIRCUIT_REJECTIONS, CIRCUIT_STATE, CIRCUIT_TRANSITIONS
+
+import logging
+log = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+# Giá trị của gauge trạng thái: 0 = đóng (bình thường), 1 = nửa mở (đang thăm dò), 2 = mở (từ chối).
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """The circuit breaker rejected the call without contacting the upstream API."""
+
+    def __init__(self, retry_after_seconds: float):
+        super().__init__(f"The conference API is temporarily unavailable; retry in about {retry_after_seconds:.0f}s.")
+        self.retry_after_seconds = retry_after_seconds
+
+
+class LatencyTracker:
+    """Latencies of the most recent `window` samples, for percentile estimates."""
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._samples)
+
+    def percentile(self, p: float) -> Optional[float]:
+        with self._lock:
+            ordered = sorted(self._samples)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+class CircuitBreaker:
+    """
+    Trips after at least `min_calls` of the last `window` calls when their error rate
+    reaches `error_rate_threshold`, or the share slower than `slow_call_seconds` reaches
+    `slow_call_rate_threshold`. While open, `acquire()` raises `CircuitOpenError`. After
+    `open_seconds` the breaker is half-open: up to `half_open_probes` calls go through,
+    and it closes once that many succeed, or opens again on the first failure.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        enabled: bool = True,
+        window: int = 50,
+        min_calls: int = 10,
+        error_rate_threshold: float = 0.5,
+        slow_call_seconds: float = 10.0,
+        slow_call_rate_threshold: float = 0.8,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 1,
+    ):
+        self.name = name
+        self.enabled = enabled
+        self.min_calls = min_calls
+        self.error_rate_threshold = error_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.open_seconds = open_seconds
+        self.half_open_probes = max(1, half_open_probes)
+        # (lỗi?, chậm?) của các lần gọi gần nhất.
+        self._calls: Deque[Tuple[bool, bool]] = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._counters: Dict[str, int] = {"rejected": 0, "trips": 0}
+        self._lock = threading.Lock()
+        CIRCUIT_STATE.labels(name).set(STATE_VALUES[CLOSED])
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._advance()
+            return self._state
+
+    def acquire(self) -> bool:
+        """
+        Admits a call or raises `CircuitOpenError`. Returns True if the call is a
+        half-open probe; its outcome must be passed to `record` (or `abandon`).
+        """
+        if not self.enabled:
+            return False
+        with self._lock:
+            self._advance()
+            if self._state == CLOSED:
+                return False
+            if self._state == HALF_OPEN and self._probes_in_flight < self.half_open_probes:
+                self._probes_in_flight += 1
+                return True
+            self._counters["rejected"] += 1
+            retry_after = max(1.0, self._opened_at + self.open_seconds - time.monotonic())
+        CIRCUIT_REJECTIONS.labels(self.name).inc()
+        raise CircuitOpenError(retry_after)
+
+    def record(self, probe: bool, error: bool, seconds: float) -> None:
+        """Records the outcome of an admitted call."""
+        if not self.enabled:
+            return
+        slow = seconds >= self.slow_call_seconds
+        with self._lock:
+            if probe:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if self._state != HALF_OPEN:
+                    return
+                if error or slow:
+                    self._transition(OPEN)
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_probes:
+                    self._transition(CLOSED)
+                return
+            if self._state != CLOSED:
+                # Lần gọi bắt đầu trước khi mạch mở: không ảnh hưởng tới việc thăm dò.
+                return
+            self._calls.append((error, slow))
+            if len(self._calls) < self.min_calls:
+                return
+            errors = sum(1 for e, _ in self._calls if e) / len(self._calls)
+            slow_calls = sum(1 for _, s in self._calls if s) / len(self._calls)
+            if errors >= self.error_rate_threshold or slow_calls >= self.slow_call_rate_threshold:
+                log.warning(
+                    f"Circuit '{self.name}' opening: error rate {errors:.0%}, slow-call rate {slow_calls:.0%} "
+                    f"over the last {len(self._calls)} calls."
+                )
+                self._transition(OPEN)
+
+    def abandon(self, probe: bool) -> None:
+        """Releases a probe whose call ended without an outcome (e.g. the caller was cancelled)."""
+        if probe:
+            with self._lock:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._advance()
+            calls = list(self._calls)
+            stats: Dict[str, Any] = dict(self._counters)
+            stats.update(
+                enabled=self.enabled,
+                state=self._state,
+                windowCalls=len(calls),
+                errorRate=round(sum(1 for e, _ in calls if e) / len(calls), 4) if calls else 0.0,
+                slowCallRate=round(sum(1 for _, s in calls if s) / len(calls), 4) if calls else 0.0,
+                openForSeconds=round(max(0.0, self._opened_at + self.open_seconds - time.monotonic()), 1)
+                if self._state == OPEN else 0.0,
+            )
+        return stats
+
+    # --- Internals (caller holds the lock) ---
+    def _advance(self) -> None:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._transition(HALF_OPEN)
+
+    def _transition(self, state: str) -> None:
+        if state == self._state:
+            return
+        log.info(f"Circuit '{self.name}': {self._state} -> {state}")
+        self._state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self._counters["trips"] += 1
+        if state in (OPEN, HALF_OPEN):
+            self._probe_successes = 0
+        if state == CLOSED:
+            self._calls.clear()
+        CIRCUIT_STATE.labels(self.name).set(STATE_VALUES[state])
+        CIRCUIT_TRANSITIONS.labels(self.name, state).inc()
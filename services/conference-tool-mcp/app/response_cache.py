@@ -0,0 +1,202 @@
+# services/conference-tool-mcp/app/response_cache.py
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+import logging
+log = logging.getLogger(__name__)
+
+# Các key mang giá trị kiểu enum: so khớp không phân biệt hoa thường.
+ENUM_KEYS = {"mode", "rank", "source", "accessType", "country", "continent"}
+# Các key có thể lặp lại mà thứ tự không quan trọng (e.g. 'topics=AI&topics=ML').
+UNORDERED_KEYS = {"topics"}
+
+FRESH = "fresh"
+STALE = "stale"
+# Đã quá cả khoảng stale: chỉ trả về khi được yêu cầu, làm dữ liệu dự phòng lúc upstream không dùng được.
+EXPIRED = "expired"
+
+
+def canonical_query_key(searchQuery: str) -> str:
+    """
+    Builds a cache key from a URL-encoded query string so that equivalent queries collide.
+
+    Key order, '+' vs '%20', surrounding whitespace, the order of repeated 'topics'
+    and the case of enum-like values do not affect the key.
+    """
+    params = parse_qs(searchQuery, keep_blank_values=False)
+    canonical: List[Tuple[str, List[str]]] = []
+    for key in sorted(params):
+        values = [" ".join(v.split()) for v in params[key]]
+        values = [v for v in values if v]
+        if not values:
+            continue
+        if key in ENUM_KEYS:
+            values = [v.casefold() for v in values]
+        if key in UNORDERED_KEYS:
+            values = sorted(values, key=str.casefold)
+        canonical.append((key, values))
+    return json.dumps(canonical, ensure_ascii=False, separators=(",", ":"))
+
+
+class _Entry:
+    __slots__ = ("value", "stored_at", "expires_at")
+
+    def __init__(self, value: Any, stored_at: float, expires_at: float):
+        self.value = value
+        self.stored_at = stored_at
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """
+    A thread-safe LRU cache for upstream API results with per-entry TTL.
+
+    Entries past their TTL remain servable as "stale" for `stale_ttl_seconds` so the
+    caller can answer immediately and revalidate in the background. When `db_path`
+    is set, entries are written through to SQLite and reloaded after a restart.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        stale_ttl_seconds: float = 0.0,
+        db_path: Optional[str] = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stale_ttl_seconds = stale_ttl_seconds
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {
+            "hits": 0, "stale_hits": 0, "misses": 0, "disk_hits": 0, "evictions": 0, "writes": 0,
+        }
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._open_db(db_path)
+
+    # --- Public API ---
+    def get(self, key: str, allow_expired: bool = False) -> Tuple[Optional[Any], Optional[str]]:
+        """
+        Returns (value, FRESH | STALE) on a hit, or (None, None) on a miss.
+        With `allow_expired`, an entry past its stale window is kept and returned as
+        (value, EXPIRED) instead of being dropped; it still counts as a miss.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._db is not None:
+                entry = self._load_from_db(key)
+                if entry is not None:
+                    self._counters["disk_hits"] += 1
+                    self._insert(key, entry)
+            if entry is None or now >= entry.expires_at + self.stale_ttl_seconds:
+                self._counters["misses"] += 1
+                if entry is None:
+                    return None, None
+                if allow_expired:
+                    return entry.value, EXPIRED
+                self._drop(key)
+                return None, None
+            self._entries.move_to_end(key)
+            if now < entry.expires_at:
+                self._counters["hits"] += 1
+                return entry.value, FRESH
+            self._counters["stale_hits"] += 1
+            return entry.value, STALE
+
+    def contains(self, key: str) -> bool:
+        """True if `key` has a fresh in-memory entry. Does not touch LRU order or counters."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and time.time() < entry.expires_at
+
+    def pop(self, key: str) -> Optional[Any]:
+        """
+        Removes and returns the in-memory value for `key` if it is still servable, else None.
+        Unlike `get`, it does not count as a lookup in the hit/miss counters.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._drop(key)
+            if time.time() >= entry.expires_at + self.stale_ttl_seconds:
+                return None
+            return entry.value
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None, persist: bool = True) -> None:
+        """Stores `value`; with `persist` False it is kept in memory only, not written to SQLite."""
+        now = time.time()
+        entry = _Entry(value, now, now + (self.ttl_seconds if ttl_seconds is None else ttl_seconds))
+        with self._lock:
+            self._insert(key, entry)
+            self._counters["writes"] += 1
+            if self._db is not None and persist:
+                self._save_to_db(key, entry)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counters)
+            stats["size"] = len(self._entries)
+            stats["max_entries"] = self.max_entries
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["hits"] + stats["stale_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+    # --- In-memory LRU (caller holds the lock) ---
+    def _insert(self, key: str, entry: _Entry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _drop(self, key: str) -> None:
+        self._entries.pop(key, None)
+        if self._db is not None:
+            self._db.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+            self._db.commit()
+
+    # --- On-disk backing store (caller holds the lock) ---
+    def _open_db(self, db_path: str) -> None:
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL, expires_at REAL NOT NULL)"
+        )
+        # Dọn các entry đã hết hạn hẳn (quá cả khoảng stale) từ lần chạy trước.
+        self._db.execute(
+            "DELETE FROM response_cache WHERE expires_at + ? < ?", (self.stale_ttl_seconds, time.time())
+        )
+        self._db.commit()
+        log.info(f"Response cache backed by SQLite at {db_path}.")
+
+    def _load_from_db(self, key: str) -> Optional[_Entry]:
+        row = self._db.execute(
+            "SELECT value, stored_at, expires_at FROM response_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return _Entry(json.loads(row[0]), row[1], row[2])
+
+    def _save_to_db(self, key: str, entry: _Entry) -> None:
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, stored_at, expires_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(entry.value), entry.stored_at, entry.expires_at),
+            )
+            # Giới hạn kích thước trên đĩa theo cùng ngưỡng với bộ nhớ, bỏ các entry cũ nhất.
+            self._db.execute(
+                "DELETE FROM response_cache WHERE key NOT IN "
+                "(SELECT key FROM response_cache ORDER BY stored_at DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+            self._db.commit()
+        except sqlite3.Error as e:
+            log.warning(f"Failed to persist cache entry: {e}")
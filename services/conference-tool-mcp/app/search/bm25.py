@@ -0,0 +1,65 @@
+# services/conference-tool-mcp/app/search/bm25.py
+import math
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+class BM25Index:
+    """
+    Incremental Okapi BM25 inverted index.
+
+    Documents are added, replaced or removed by key; postings and document
+    frequencies are kept up to date, so no rebuild is needed after an update.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_terms: Dict[str, Counter] = {}
+        self._doc_lengths: Dict[str, int] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def upsert(self, doc_key: str, tokens: Iterable[str]) -> None:
+        self.remove(doc_key)
+        terms = Counter(tokens)
+        self._doc_terms[doc_key] = terms
+        length = sum(terms.values())
+        self._doc_lengths[doc_key] = length
+        self._total_length += length
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[doc_key] = tf
+
+    def remove(self, doc_key: str) -> None:
+        terms = self._doc_terms.pop(doc_key, None)
+        if terms is None:
+            return
+        self._total_length -= self._doc_lengths.pop(doc_key)
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_key, None)
+                if not postings:
+                    del self._postings[term]
+
+    def search(self, query_tokens: List[str], candidates: Optional[Set[str]] = None, limit: int = 50) -> List[Tuple[str, float]]:
+        """Scores documents containing at least one query term, optionally restricted to `candidates`."""
+        n_docs = len(self._doc_lengths)
+        if not n_docs or not query_tokens:
+            return []
+        avg_length = self._total_length / n_docs
+        scores: Dict[str, float] = {}
+        for term in set(query_tokens):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_key, tf in postings.items():
+                if candidates is not None and doc_key not in candidates:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_key] / avg_length)
+                scores[doc_key] = scores.get(doc_key, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
@@ -0,0 +1,190 @@
+# services/conference-tool-mcp/app/search/conference_index.py
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.search.bm25 import BM25Index
+from app.search.embeddings import LocalEmbedder, VectorIndex
+from app.search.records import (
+    date_sort_key,
+    load_snapshot_records,
+    normalize_record,
+    record_matches_filters,
+    searchable_text,
+    tokenize,
+)
+
+import logging
+log = logging.getLogger(__name__)
+
+# Trọng số trường cho BM25, thực hiện bằng cách lặp lại token của trường đó.
+FIELD_WEIGHTS = {"acronym": 3, "title": 2, "topics": 2, "summary": 1}
+# Hằng số k của Reciprocal Rank Fusion khi trộn kết quả BM25 và vector.
+RRF_K = 60
+
+
+class ConferenceIndex:
+    """
+    Local, in-process search index over conference records.
+
+    Combines a BM25 inverted index over acronym/title/topics/summary with a dense
+    embedding index, fused by reciprocal rank. The index is loaded from a JSON
+    snapshot and updated incrementally via `upsert_many`; the snapshot is rewritten
+    at most every `autosave_seconds` after changes.
+    """
+
+    def __init__(self, snapshot_path: Optional[str], embedder: Optional[LocalEmbedder], autosave_seconds: float = 300.0):
+        self.snapshot_path = snapshot_path
+        self.embedder = embedder
+        self.autosave_seconds = autosave_seconds
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._flat: Dict[str, Dict[str, Any]] = {}
+        self._text_hash: Dict[str, str] = {}
+        self._bm25 = BM25Index()
+        self._vectors: Optional[VectorIndex] = None
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._dirty = False
+        self._last_saved_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    # --- Loading and persistence ---
+    def ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            started = time.perf_counter()
+            records = load_snapshot_records(self.snapshot_path)
+            if records:
+                self.upsert_many(records, autosave=False)
+                self._dirty = False
+            self._loaded = True
+            log.info(f"Local conference index loaded {len(self._records)} record(s) in {time.perf_counter() - started:.2f}s.")
+
+    def save_snapshot(self) -> None:
+        if not self.snapshot_path:
+            return
+        with self._lock:
+            records = list(self._records.values())
+            self._dirty = False
+            self._last_saved_at = time.monotonic()
+        os.makedirs(os.path.dirname(self.snapshot_path) or ".", exist_ok=True)
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(records, f, ensure_ascii=False)
+        os.replace(tmp_path, self.snapshot_path)
+        log.info(f"Local conference index snapshot written ({len(records)} record(s)).")
+
+    # --- Incremental updates ---
+    def upsert_many(self, records: List[Dict[str, Any]], autosave: bool = True) -> int:
+        """Adds or replaces records; only records whose searchable text changed are re-embedded."""
+        to_embed: List[Tuple[str, str]] = []
+        with self._lock:
+            for record in records:
+                if not isinstance(record, dict):
+                    continue
+                flat = normalize_record(record)
+                doc_key = flat["id"]
+                self._records[doc_key] = record
+                self._flat[doc_key] = flat
+                self._bm25.upsert(doc_key, self._weighted_tokens(flat))
+                text = searchable_text(flat)
+                text_hash = hashlib.sha1(text.encode("utf-8")).hexdigest()
+                if self._text_hash.get(doc_key) != text_hash:
+                    self._text_hash[doc_key] = text_hash
+                    to_embed.append((doc_key, text))
+            self._dirty = self._dirty or bool(records)
+
+        if to_embed and self.embedder is not None:
+            vectors = self.embedder.encode([text for _, text in to_embed])
+            if vectors is not None:
+                with self._lock:
+                    if self._vectors is None:
+                        self._vectors = VectorIndex(vectors.shape[1])
+                    for (doc_key, _), vector in zip(to_embed, vectors):
+                        self._vectors.upsert(doc_key, vector)
+
+        if autosave and self._dirty and time.monotonic() - self._last_saved_at >= self.autosave_seconds:
+            self.save_snapshot()
+        return len(to_embed)
+
+    def remove(self, doc_key: str) -> None:
+        with self._lock:
+            self._records.pop(doc_key, None)
+            self._flat.pop(doc_key, None)
+            self._text_hash.pop(doc_key, None)
+            self._bm25.remove(doc_key)
+            if self._vectors is not None:
+                self._vectors.remove(doc_key)
+            self._dirty = True
+
+    @staticmethod
+    def _weighted_tokens(flat: Dict[str, Any]) -> List[str]:
+        tokens: List[str] = []
+        for field, weight in FIELD_WEIGHTS.items():
+            value = " ".join(flat[field]) if isinstance(flat[field], list) else flat[field]
+            tokens.extend(tokenize(value) * weight)
+        return tokens
+
+    # --- Search ---
+    def search(self, query: str, filters: Dict[str, List[str]], limit: int) -> Dict[str, Any]:
+        """
+        Hybrid search. `filters` are searchQuery-style (parsed with parse_qs) and restrict the
+        candidate set before ranking; with no free text, matches are ordered by start date.
+        """
+        self.ensure_loaded()
+        query = " ".join(filter(None, [query] + filters.get("keyword", [])))
+        with self._lock:
+            candidates = None
+            if any(key not in ("mode", "perPage", "page", "keyword") for key in filters):
+                candidates = {k for k, flat in self._flat.items() if record_matches_filters(flat, filters)}
+
+            if not query.strip():
+                keys = candidates if candidates is not None else self._flat.keys()
+                ranked = [(k, 0.0) for k in sorted(keys, key=lambda k: date_sort_key(self._flat[k]))]
+                return self._format(ranked[:limit], len(keys), "filter")
+
+            pool = max(limit * 4, 20)
+            lexical = self._bm25.search(tokenize(query), candidates, limit=pool)
+            semantic: List[Tuple[str, float]] = []
+            vectors = self._vectors
+
+        if vectors is not None and self.embedder is not None:
+            query_vector = self.embedder.encode([query])
+            if query_vector is not None:
+                with self._lock:
+                    semantic = vectors.search(query_vector[0], candidates, limit=pool)
+
+        fused: Dict[str, float] = {}
+        for ranking in (lexical, semantic):
+            for rank, (doc_key, _) in enumerate(ranking):
+                fused[doc_key] = fused.get(doc_key, 0.0) + 1.0 / (RRF_K + rank + 1)
+        ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:limit]
+        mode = "hybrid" if semantic else "bm25"
+        total = len(candidates) if candidates is not None else len(self._flat)
+        with self._lock:
+            return self._format(ranked, total, mode)
+
+    def _format(self, ranked: List[Tuple[str, float]], total_candidates: int, mode: str) -> Dict[str, Any]:
+        return {
+            "mode": mode,
+            "totalCandidates": total_candidates,
+            "results": [
+                {**self._records[doc_key], "_score": round(score, 5)}
+                for doc_key, score in ranked if doc_key in self._records
+            ],
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "records": len(self._records),
+            "vectors": len(self._vectors) if self._vectors is not None else 0,
+            "dirty": self._dirty,
+        }
@@ -0,0 +1,106 @@
+# services/conference-tool-mcp/app/search/embeddings.py
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+import logging
+log = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except ImportError:  # numpy đi kèm sentence-transformers; thiếu thì chỉ dùng BM25
+    np = None
+
+
+class LocalEmbedder:
+    """
+    Lazily loads a sentence-transformers model on CPU.
+
+    The dependency is optional: if it (or the model) is unavailable, `available`
+    becomes False and the index falls back to BM25-only ranking.
+    """
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self._model = None
+        self._load_failed = False
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return self._get_model() is not None
+
+    def _get_model(self):
+        if self._model is not None or self._load_failed:
+            return self._model
+        with self._lock:
+            if self._model is None and not self._load_failed:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.model_name, device="cpu")
+                    log.info(f"Loaded local embedding model '{self.model_name}' on CPU.")
+                except Exception as e:
+                    self._load_failed = True
+                    log.warning(f"Local embedding model unavailable ({e}); local search will use BM25 only.")
+        return self._model
+
+    def encode(self, texts: List[str]):
+        model = self._get_model()
+        if model is None or np is None:
+            return None
+        return model.encode(texts, normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+
+class VectorIndex:
+    """
+    Dense cosine-similarity index over L2-normalized embeddings held in one numpy matrix.
+    Upserts overwrite a document's row in place; removals free the row for reuse.
+    """
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self._matrix = np.zeros((0, dimension), dtype=np.float32)
+        self._row_of: Dict[str, int] = {}
+        self._key_of: List[Optional[str]] = []
+        self._free_rows: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def upsert(self, doc_key: str, vector) -> None:
+        row = self._row_of.get(doc_key)
+        if row is None:
+            if self._free_rows:
+                row = self._free_rows.pop()
+            else:
+                row = len(self._key_of)
+                self._key_of.append(None)
+                if row >= self._matrix.shape[0]:
+                    grown = np.zeros((max(16, row * 2), self.dimension), dtype=np.float32)
+                    grown[: self._matrix.shape[0]] = self._matrix
+                    self._matrix = grown
+            self._row_of[doc_key] = row
+            self._key_of[row] = doc_key
+        self._matrix[row] = vector
+
+    def remove(self, doc_key: str) -> None:
+        row = self._row_of.pop(doc_key, None)
+        if row is not None:
+            self._matrix[row] = 0.0
+            self._key_of[row] = None
+            self._free_rows.append(row)
+
+    def search(self, query_vector, candidates: Optional[Set[str]] = None, limit: int = 50) -> List[Tuple[str, float]]:
+        if not self._row_of:
+            return []
+        used = len(self._key_of)
+        scores = self._matrix[:used] @ query_vector
+        order = np.argsort(-scores)
+        results: List[Tuple[str, float]] = []
+        for row in order:
+            doc_key = self._key_of[row]
+            if doc_key is None or (candidates is not None and doc_key not in candidates):
+                continue
+            results.append((doc_key, float(scores[row])))
+            if len(results) >= limit:
+                break
+        return results
@@ -0,0 +1,309 @@
+# services/conference-tool-mcp/app/search/record_store.py
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.search.records import (
+    DATE_KEYS,
+    fold,
+    load_snapshot_records,
+    normalize_record,
+)
+
+import logging
+log = logging.getLogger(__name__)
+
+# Các trường dạng enum: lưu dưới dạng mã số nguyên (chuỗi được intern một lần).
+ENUM_FIELDS = ("country", "continent", "rank", "source", "accessType")
+# Các cặp ngày theo tiền tố khóa lọc ('' là ngày diễn ra hội nghị).
+DATE_PREFIXES = ("", "sub", "notification", "cameraReady", "registration")
+# Nhóm theo thời gian, tính trên ngày bắt đầu hội nghị.
+TIME_GROUPS = ("year", "month")
+# Các khóa không phải bộ lọc (phân trang, chế độ hiển thị).
+NON_FILTER_KEYS = ("mode", "perPage", "page")
+
+
+def _ordinal(value: str) -> int:
+    """ISO date (YYYY-MM-DD) -> proleptic ordinal; 0 when missing or malformed."""
+    try:
+        return date.fromisoformat(value[:10]).toordinal() if value else 0
+    except ValueError:
+        return 0
+
+
+def _date_keys(prefix: str) -> Tuple[str, str]:
+    return (f"{prefix}FromDate", f"{prefix}ToDate") if prefix else ("fromDate", "toDate")
+
+
+class _Interner:
+    """Maps case/accent-folded strings to small integer codes; code 0 is 'missing'."""
+
+    __slots__ = ("codes", "values")
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {"": 0}
+        self.values: List[str] = [""]
+
+    def code(self, value: str) -> int:
+        key = fold(value).strip()
+        code = self.codes.get(key)
+        if code is None:
+            code = len(self.values)
+            self.codes[key] = code
+            self.values.append(value)
+        return code
+
+    def lookup(self, value: str) -> Optional[int]:
+        return self.codes.get(fold(value).strip())
+
+
+class ConferenceRow:
+    """The few free-text fields kept per record (everything else lives in columns)."""
+
+    __slots__ = ("id", "acronym", "title", "search_text")
+
+    def __init__(self, doc_id: str, acronym: str, title: str):
+        self.id = doc_id
+        self.acronym = acronym
+        self.title = title
+        self.search_text = fold(f"{acronym} {title}")
+
+
+class ConferenceRecordStore:
+    """
+    Compact columnar store for counting and grouping conferences without materializing records.
+
+    Enum fields are stored as interned integer codes in `array` columns, topics as a
+    CSR-style pair of arrays, and dates as day ordinals. Inverted indexes (value code ->
+    row positions) and sorted date arrays are rebuilt lazily after writes, so reads only
+    touch precomputed structures.
+    """
+
+    def __init__(self, snapshot_path: Optional[str] = None):
+        self.snapshot_path = snapshot_path
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._rows: List[ConferenceRow] = []
+        self._positions: Dict[str, int] = {}
+        self._interners: Dict[str, _Interner] = {field: _Interner() for field in ENUM_FIELDS + ("topics",)}
+        self._enum_columns: Dict[str, array] = {field: array("I") for field in ENUM_FIELDS}
+        # Chủ đề: mỗi hàng có danh sách mã riêng, lưu gọn thành offsets + values.
+        self._topic_offsets = array("I", [0])
+        self._topic_values = array("I")
+        # Mỗi tiền tố ngày có hai cột: bắt đầu và kết thúc (đã lấp bằng nhau khi thiếu một đầu).
+        self._date_columns: Dict[str, Tuple[array, array]] = {
+            prefix: (array("i"), array("i")) for prefix in DATE_PREFIXES
+        }
+        self._postings: Dict[str, Dict[int, array]] = {}
+        self._sorted_dates: Dict[str, Tuple[Tuple[array, array], Tuple[array, array]]] = {}
+        self._indexes_stale = True
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    # --- Loading and updates ---
+    def ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            started = time.perf_counter()
+            self.upsert_many(load_snapshot_records(self.snapshot_path))
+            self._loaded = True
+            log.info(f"Conference record store loaded {len(self._rows)} record(s) in {time.perf_counter() - started:.2f}s.")
+
+    def upsert_many(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Adds or overwrites records in place; facet indexes are rebuilt on the next read."""
+        changed = 0
+        with self._lock:
+            for record in records:
+                if not isinstance(record, dict):
+                    continue
+                self._upsert(normalize_record(record))
+                changed += 1
+            if changed:
+                self._indexes_stale = True
+        return changed
+
+    def _upsert(self, flat: Dict[str, Any]) -> None:
+        position = self._positions.get(flat["id"])
+        row = ConferenceRow(flat["id"], flat["acronym"], flat["title"])
+        topics = sorted({self._interners["topics"].code(t) for t in flat["topics"]})
+
+        if position is None:
+            position = len(self._rows)
+            self._positions[flat["id"]] = position
+            self._rows.append(row)
+            for field in ENUM_FIELDS:
+                self._enum_columns[field].append(self._interners[field].code(flat[field]))
+            self._topic_values.extend(topics)
+            self._topic_offsets.append(len(self._topic_values))
+            for prefix, (starts, ends) in self._date_columns.items():
+                start, end = self._date_range(flat, prefix)
+                starts.append(start)
+                ends.append(end)
+            return
+
+        self._rows[position] = row
+        for field in ENUM_FIELDS:
+            self._enum_columns[field][position] = self._interners[field].code(flat[field])
+        for prefix, (starts, ends) in self._date_columns.items():
+            starts[position], ends[position] = self._date_range(flat, prefix)
+        lo, hi = self._topic_offsets[position], self._topic_offsets[position + 1]
+        if list(self._topic_values[lo:hi]) != topics:
+            # Hiếm khi xảy ra: dựng lại mảng chủ đề cho một hàng có số chủ đề thay đổi.
+            self._topic_values[lo:hi] = array("I", topics)
+            delta = len(topics) - (hi - lo)
+            for i in range(position + 1, len(self._topic_offsets)):
+                self._topic_offsets[i] += delta
+
+    @staticmethod
+    def _date_range(flat: Dict[str, Any], prefix: str) -> Tuple[int, int]:
+        from_key, to_key = _date_keys(prefix)
+        start, end = _ordinal(flat.get(from_key, "")), _ordinal(flat.get(to_key, ""))
+        return start or end, end or start
+
+    def _row_topics(self, position: int) -> array:
+        return self._topic_values[self._topic_offsets[position]:self._topic_offsets[position + 1]]
+
+    # --- Facet indexes ---
+    def _ensure_indexes(self) -> None:
+        if not self._indexes_stale:
+            return
+        started = time.perf_counter()
+        postings: Dict[str, Dict[int, array]] = {}
+        for field in ENUM_FIELDS:
+            field_postings: Dict[int, array] = {}
+            for position, code in enumerate(self._enum_columns[field]):
+                if code:
+                    field_postings.setdefault(code, array("I")).append(position)
+            postings[field] = field_postings
+        topic_postings: Dict[int, array] = {}
+        for position in range(len(self._rows)):
+            for code in self._row_topics(position):
+                topic_postings.setdefault(code, array("I")).append(position)
+        postings["topics"] = topic_postings
+
+        sorted_dates = {}
+        for prefix, (starts, ends) in self._date_columns.items():
+            sorted_dates[prefix] = (self._sorted_column(starts), self._sorted_column(ends))
+
+        self._postings = postings
+        self._sorted_dates = sorted_dates
+        self._indexes_stale = False
+        log.info(f"Conference facet indexes rebuilt for {len(self._rows)} row(s) in {(time.perf_counter() - started) * 1000:.1f}ms.")
+
+    @staticmethod
+    def _sorted_column(column: array) -> Tuple[array, array]:
+        """Returns (sorted ordinals, matching row positions), skipping missing dates."""
+        order = sorted((value, position) for position, value in enumerate(column) if value)
+        return array("i", (value for value, _ in order)), array("I", (position for _, position in order))
+
+    # --- Queries ---
+    def _candidates(self, filters: Dict[str, List[str]]) -> Tuple[Optional[Set[int]], List[str]]:
+        """
+        Resolves searchQuery-style filters to a set of row positions (None means 'all rows').
+        Returns the positions and the filter keys that the store cannot evaluate.
+        """
+        candidates: Optional[Set[int]] = None
+        ignored: List[str] = []
+
+        def narrow(positions: Iterable[int]) -> None:
+            nonlocal candidates
+            candidates = set(positions) if candidates is None else candidates.intersection(positions)
+
+        for key, values in filters.items():
+            if key in NON_FILTER_KEYS:
+                continue
+            if key in ENUM_FIELDS or key == "topics":
+                interner, field_postings = self._interners[key], self._postings[key]
+                matched: Set[int] = set()
+                for value in values:
+                    code = interner.lookup(value)
+                    if code:
+                        matched.update(field_postings.get(code, ()))
+                narrow(matched)
+            elif key in ("title", "keyword"):
+                needles = [fold(v) for v in values]
+                narrow(p for p, row in enumerate(self._rows) if all(n in row.search_text for n in needles))
+            elif key in DATE_KEYS:
+                ordinal = _ordinal(values[0])
+                if not ordinal:
+                    ignored.append(key)
+                    continue
+                is_from = key.endswith("FromDate") or key == "fromDate"
+                prefix = key[:-len("FromDate" if is_from else "ToDate")]
+                (sorted_starts, start_positions), (sorted_ends, end_positions) = self._sorted_dates[prefix]
+                if is_from:
+                    # Khoảng của bản ghi phải kết thúc sau mốc 'from' (giao nhau với khoảng yêu cầu).
+                    narrow(end_positions[bisect_left(sorted_ends, ordinal):])
+                else:
+                    narrow(start_positions[:bisect_right(sorted_starts, ordinal)])
+            else:
+                ignored.append(key)
+        return candidates, ignored
+
+    def count(self, filters: Dict[str, List[str]], group_by: str = "", limit: int = 20) -> Dict[str, Any]:
+        """
+        Counts records matching `filters` (parsed with parse_qs) and optionally groups them by
+        an enum field, 'topics', 'year' or 'month' (of the conference start date).
+        """
+        self.ensure_loaded()
+        with self._lock:
+            self._ensure_indexes()
+            candidates, ignored = self._candidates(filters)
+            total = len(self._rows) if candidates is None else len(candidates)
+            result: Dict[str, Any] = {"total": total, "indexedRecords": len(self._rows)}
+            if ignored:
+                result["ignoredFilters"] = ignored
+            if not group_by:
+                return result
+            if group_by not in ENUM_FIELDS + ("topics",) + TIME_GROUPS:
+                raise ValueError(
+                    f"Cannot group by '{group_by}'. Use one of: {', '.join(ENUM_FIELDS + ('topics',) + TIME_GROUPS)}."
+                )
+
+            counts = self._group_counts(group_by, candidates)
+            groups = sorted(counts.items(), key=lambda item: (-item[1], str(item[0])))
+            result["groupBy"] = group_by
+            result["groups"] = [{"value": value, "count": count} for value, count in groups[:limit]]
+            if len(groups) > limit:
+                result["otherGroups"] = len(groups) - limit
+            return result
+
+    def _group_counts(self, group_by: str, candidates: Optional[Set[int]]) -> Dict[str, int]:
+        if group_by in TIME_GROUPS:
+            starts = self._date_columns[""][0]
+            width = 4 if group_by == "year" else 7
+            positions = range(len(self._rows)) if candidates is None else candidates
+            # Đếm theo ordinal trước, chỉ đổi sang chuỗi ngày cho các giá trị phân biệt.
+            by_day = Counter(starts[p] for p in positions)
+            counts: Counter = Counter()
+            for ordinal, count in by_day.items():
+                if ordinal:
+                    counts[date.fromordinal(ordinal).isoformat()[:width]] += count
+            return dict(counts)
+
+        values = self._interners[group_by].values
+        if candidates is None:
+            # Không có bộ lọc: độ dài danh sách posting chính là số lượng.
+            return {values[code]: len(positions) for code, positions in self._postings[group_by].items()}
+        if group_by == "topics":
+            counts = Counter(code for p in candidates for code in self._row_topics(p))
+        else:
+            column = self._enum_columns[group_by]
+            counts = Counter(column[p] for p in candidates)
+        return {values[code]: count for code, count in counts.items() if code}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "records": len(self._rows),
+                "distinctValues": {field: len(interner.values) - 1 for field, interner in self._interners.items()},
+                "indexesStale": self._indexes_stale,
+            }
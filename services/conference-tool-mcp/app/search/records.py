@@ -0,0 +1,177 @@
+# services/conference-tool-mcp/app/search/records.py
+"""
+Helpers for reading conference records returned by the confhub API.
+
+The upstream schema has changed over time (flat fields vs. nested 'location',
+'ranks' and 'dates' lists), so every accessor here tolerates both shapes.
+"""
+import json
+import os
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional
+
+DATE_KEYS = ("fromDate", "toDate", "subFromDate", "subToDate", "notificationFromDate", "notificationToDate",
+             "cameraReadyFromDate", "cameraReadyToDate", "registrationFromDate", "registrationToDate")
+
+# Loại mốc thời gian upstream -> tiền tố khóa lọc tương ứng trong searchQuery.
+DATE_TYPE_PREFIXES = {
+    "conferencedates": "", "conference": "",
+    "submissiondate": "sub", "submission": "sub",
+    "notificationdate": "notification", "notification": "notification",
+    "camerareadydate": "cameraReady", "cameraready": "cameraReady",
+    "registrationdate": "registration", "registration": "registration",
+}
+
+# Trường định danh của bản ghi, theo thứ tự ưu tiên.
+ID_FIELDS = ("id", "conferenceId", "_id")
+# Mọi trường cấp cao nhất mà record_id/normalize_record đọc tới.
+RECORD_FIELDS = ID_FIELDS + (
+    "title", "name", "acronym", "topics", "researchFields", "fieldOfResearchs", "fieldsOfResearch",
+    "summary", "description", "callForPaper", "location", "locations", "ranks", "rankSourceFoRData",
+    "rank", "source", "accessType", "link", "url", "website", "dates", "conferenceDates",
+) + DATE_KEYS
+
+
+def fold(text: Any) -> str:
+    """Casefolds and strips diacritics so 'Việt Nam' and 'viet nam' compare equal."""
+    text = str(text).casefold().replace("đ", "d")
+    return "".join(c for c in unicodedata.normalize("NFD", text) if unicodedata.category(c) != "Mn")
+
+
+def tokenize(text: Any) -> List[str]:
+    return re.findall(r"\w+", fold(text)) if text else []
+
+
+def _first(record: Dict[str, Any], *names: str) -> Any:
+    for name in names:
+        value = record.get(name)
+        if value not in (None, "", []):
+            return value
+    return None
+
+
+def record_id(record: Dict[str, Any]) -> str:
+    value = _first(record, *ID_FIELDS)
+    if value is not None:
+        return str(value)
+    return f"{record.get('acronym', '')}|{record.get('title', '')}"
+
+
+def _as_list(value: Any) -> List[Any]:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _location(record: Dict[str, Any]) -> Dict[str, Any]:
+    location = _first(record, "location", "locations")
+    if isinstance(location, list):
+        location = location[0] if location else None
+    return location if isinstance(location, dict) else record
+
+
+def _names(values: Iterable[Any]) -> List[str]:
+    names = []
+    for value in values:
+        if isinstance(value, dict):
+            value = _first(value, "name", "title", "value")
+        if value:
+            names.append(str(value))
+    return names
+
+
+def normalize_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Flattens an upstream record into the canonical fields used by the local index and store."""
+    location = _location(record)
+    ranks = _as_list(_first(record, "ranks", "rankSourceFoRData"))
+    first_rank = ranks[0] if ranks and isinstance(ranks[0], dict) else {}
+
+    flat: Dict[str, Any] = {
+        "id": record_id(record),
+        "title": _first(record, "title", "name") or "",
+        "acronym": _first(record, "acronym") or "",
+        "topics": _names(_as_list(_first(record, "topics", "researchFields", "fieldOfResearchs", "fieldsOfResearch"))),
+        "summary": _first(record, "summary", "description", "callForPaper") or "",
+        "address": _first(location, "address") or "",
+        "cityStateProvince": _first(location, "cityStateProvince", "city") or "",
+        "country": _first(location, "country") or "",
+        "continent": _first(location, "continent", "region") or "",
+        "rank": _first(record, "rank") or _first(first_rank, "rank") or "",
+        "source": _first(record, "source") or _first(first_rank, "source") or "",
+        "accessType": _first(record, "accessType") or "",
+        "link": _first(record, "link", "url", "website") or "",
+    }
+
+    # Ngày: hoặc phẳng (fromDate/toDate/subFromDate...), hoặc một danh sách 'dates' có 'type'.
+    for key in DATE_KEYS:
+        value = _first(record, key)
+        flat[key] = str(value)[:10] if value else ""
+    for entry in _as_list(_first(record, "dates", "conferenceDates")):
+        if not isinstance(entry, dict):
+            continue
+        prefix = DATE_TYPE_PREFIXES.get(fold(entry.get("type") or "conferenceDates").replace(" ", ""))
+        if prefix is None:
+            continue
+        from_key, to_key = (f"{prefix}FromDate", f"{prefix}ToDate") if prefix else ("fromDate", "toDate")
+        if entry.get("fromDate") and not flat[from_key]:
+            flat[from_key] = str(entry["fromDate"])[:10]
+        if entry.get("toDate") and not flat[to_key]:
+            flat[to_key] = str(entry["toDate"])[:10]
+    return flat
+
+
+def load_snapshot_records(path: Optional[str]) -> List[Dict[str, Any]]:
+    """Reads a snapshot file: either a plain list of records or an API response with a 'payload' list."""
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    records = data.get("payload", []) if isinstance(data, dict) else data
+    return records if isinstance(records, list) else []
+
+
+def record_matches_filters(flat: Dict[str, Any], filters: Dict[str, List[str]]) -> bool:
+    """
+    Applies searchQuery-style filters (already parsed with parse_qs) to a normalized record.
+    Text fields match case- and accent-insensitively; 'topics' matches any listed topic;
+    date pairs keep records whose date range overlaps the requested range.
+    """
+    for key, values in filters.items():
+        if key in ("mode", "perPage", "page", "keyword"):
+            continue
+        if key == "topics":
+            record_topics = {fold(t) for t in flat["topics"]}
+            if not any(fold(v) in record_topics for v in values):
+                return False
+        elif key in ("title", "address"):
+            if not all(fold(v) in fold(flat[key]) for v in values):
+                return False
+        elif key.endswith("FromDate") or key == "fromDate":
+            to_key = key[:-8] + "ToDate" if key != "fromDate" else "toDate"
+            end = flat.get(to_key) or flat.get(key)
+            if not end or end < values[0]:
+                return False
+        elif key.endswith("ToDate") or key == "toDate":
+            from_key = key[:-6] + "FromDate" if key != "toDate" else "fromDate"
+            start = flat.get(from_key) or flat.get(key)
+            if not start or start > values[0]:
+                return False
+        elif key in flat:
+            if fold(flat[key]) not in {fold(v) for v in values}:
+                return False
+    return True
+
+
+def searchable_text(flat: Dict[str, Any]) -> str:
+    return " ".join(filter(None, [flat["acronym"], flat["title"], " ".join(flat["topics"]), flat["summary"]]))
+
+
+def date_sort_key(flat: Dict[str, Any]) -> str:
+    return flat.get("fromDate") or "9999-99-99"
+
+
+def parse_limit(value: Optional[int], default: int, maximum: int) -> int:
+    if not value or value < 1:
+        return default
+    return min(int(value), maximum)
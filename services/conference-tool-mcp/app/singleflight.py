@@ -0,0 +1,44 @@
+# services/conference-tool-mcp/app/singleflight.py
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+import logging
+log = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one in-flight execution.
+
+    The first caller for a key (the leader) starts `fn`; callers arriving while it is
+    still running await the same task. The task is shielded, so a caller being
+    cancelled does not abort the shared work for the others.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[str, "asyncio.Task[Any]"] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is not None:
+            self.followers += 1
+            log.info(f"[{self.name}] Coalesced call for key '{key}' onto an in-flight request.")
+            return await asyncio.shield(task)
+
+        self.leaders += 1
+        task = asyncio.ensure_future(fn())
+        self._calls[key] = task
+        task.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.leaders + self.followers
+        return {
+            "executions": self.leaders,
+            "coalesced": self.followers,
+            "inFlight": len(self._calls),
+            "coalescingRatio": round(self.followers / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,314 @@
+# services/conference-tool-mcp/app/streaming.py
+"""
+Incremental parsing of upstream API responses of the form {"payload": [...], ...}.
+
+Records of the 'payload' array are decoded one at a time as the body arrives, so
+only one record's object tree exists at a time before it is filtered down to the
+fields the server uses. Reading can stop once a record or size cap is reached: the
+rest of the body is never downloaded or parsed, and the returned page is marked
+as truncated.
+"""
+import codecs
+import json
+import re
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+import logging
+log = logging.getLogger(__name__)
+
+_WS = re.compile(r"[ \t\n\r]*")
+# Ký tự cần xét khi dò điểm kết thúc của một giá trị: trong chuỗi / ngoài chuỗi.
+_STRING_SPECIAL = re.compile(r'["\\]')
+_STRUCTURAL = re.compile(r'["{}\[\]]')
+
+# Trạng thái của bộ phân tích: vị trí hiện tại trong object cấp cao nhất / mảng payload.
+_START, _KEY, _VALUE, _AFTER_VALUE, _ITEMS_START, _ITEM, _ITEM_SEP, _DONE = range(8)
+
+
+class StreamedPayload(list):
+    """Payload records read from a response; `truncated` is True when reading stopped before the end of the array."""
+
+    def __init__(self, records: Iterable[Any] = (), truncated: bool = False):
+        super().__init__(records)
+        self.truncated = truncated
+
+
+def is_truncated(payload: Any) -> bool:
+    return getattr(payload, "truncated", False)
+
+
+class PayloadLimits:
+    """
+    What to keep while streaming a payload. `keep_fields` are the top-level record fields
+    kept (a record with none of them is kept whole); reading stops after `max_records`
+    records, or once the `measure(record)` sizes would add up to more than `max_size`
+    (the record that overflows is not kept). Zero disables a cap.
+    """
+    __slots__ = ("keep_fields", "max_records", "max_size", "measure")
+
+    def __init__(
+        self,
+        keep_fields: Iterable[str] = (),
+        max_records: int = 0,
+        max_size: int = 0,
+        measure: Optional[Callable[[Any], int]] = None,
+    ):
+        self.keep_fields = frozenset(keep_fields)
+        self.max_records = max_records
+        self.max_size = max_size if measure is not None else 0
+        self.measure = measure
+
+
+def filter_fields(record: Any, keep_fields: frozenset) -> Any:
+    if not keep_fields or not isinstance(record, dict):
+        return record
+    kept = {k: v for k, v in record.items() if k in keep_fields}
+    # Lược đồ lạ (không khớp trường nào): giữ nguyên bản ghi, như projection.
+    return kept or record
+
+
+class PayloadStreamParser:
+    """
+    Push parser for a JSON object body. `feed()` buffers body bytes; `records()` then yields
+    (record, json_chars) for each 'payload' array element completed so far. Other top-level
+    values are decoded whole into `fields`. A payload that is not an array is yielded as a
+    single record with `payload_is_list` False.
+
+    A value split across chunks is decoded once, when its end has arrived: the scan for
+    that end resumes where the previous chunk stopped, so a large record costs linear work.
+    """
+
+    def __init__(self, payload_key: str = "payload"):
+        self.payload_key = payload_key
+        self.fields: Dict[str, Any] = {}
+        self.has_payload = False
+        self.payload_is_list = True
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._pos = 0
+        self._final = False
+        self._state = _START
+        self._key: Optional[str] = None
+        # Dò dở điểm kết thúc của giá trị đang nhận: (offset từ đầu giá trị, độ sâu, đang trong chuỗi).
+        self._scan: Optional[Tuple[int, int, bool]] = None
+
+    @property
+    def done(self) -> bool:
+        return self._state == _DONE
+
+    def feed(self, data: bytes, final: bool = False) -> None:
+        text = self._utf8.decode(data, final)
+        # Bỏ phần đã phân tích: bộ đệm chỉ giữ một bản ghi dở dang cộng với dữ liệu mới.
+        self._buf = self._buf[self._pos:] + text if self._pos else self._buf + text
+        self._pos = 0
+        self._final = final
+
+    def more_records(self) -> Optional[bool]:
+        """After the last yielded record: True if another follows, False if the array ended, None if not yet known."""
+        if self._state in (_ITEMS_START, _ITEM):
+            return None
+        if self._state != _ITEM_SEP:
+            return False
+        pos = _WS.match(self._buf, self._pos).end()
+        if pos >= len(self._buf):
+            return None
+        return self._buf[pos] == ","
+
+    def records(self) -> Iterator[Tuple[Any, int]]:
+        buf = self._buf
+        while True:
+            pos = _WS.match(buf, self._pos).end()
+            if pos >= len(buf):
+                self._pos = pos
+                if self._final and self._state != _DONE:
+                    raise ValueError("Response body ended before the JSON object was complete.")
+                return
+            ch = buf[pos]
+            state = self._state
+            if state == _DONE:
+                raise ValueError("Unexpected data after the JSON object.")
+            if state == _START:
+                if ch != "{":
+                    raise ValueError("Expected a JSON object in the response body.")
+                self._pos, self._state = pos + 1, _KEY
+            elif state == _KEY:
+                if ch == "}":
+                    self._pos, self._state = pos + 1, _DONE
+                    continue
+                key, end = self._decode(buf, pos)
+                if end is None:
+                    return
+                colon = _WS.match(buf, end).end()
+                if colon >= len(buf):
+                    if self._final:
+                        raise ValueError("Response body ended before the JSON object was complete.")
+                    # Chờ thêm dữ liệu; khóa sẽ được giải mã lại từ đầu.
+                    return
+                if not isinstance(key, str) or buf[colon] != ":":
+                    raise ValueError(f"Malformed JSON object near position {pos}.")
+                self._key, self._pos, self._state = key, colon + 1, _VALUE
+            elif state == _VALUE:
+                if self._key == self.payload_key and ch == "[":
+                    self.has_payload = True
+                    self._pos, self._state = pos + 1, _ITEMS_START
+                    continue
+                value, end = self._decode_value(buf, pos)
+                if end is None:
+                    return
+                self._pos, self._state = end, _AFTER_VALUE
+                if self._key == self.payload_key:
+                    self.has_payload, self.payload_is_list = True, False
+                    yield value, end - pos
+                else:
+                    self.fields[self._key] = value
+            elif state == _AFTER_VALUE:
+                if ch not in ",}":
+                    raise ValueError(f"Malformed JSON object near position {pos}.")
+                self._pos, self._state = pos + 1, (_KEY if ch == "," else _DONE)
+            elif ch == "]" and state in (_ITEMS_START, _ITEM_SEP):
+                self._pos, self._state = pos + 1, _AFTER_VALUE
+            elif state == _ITEM_SEP:
+                if ch != ",":
+                    raise ValueError(f"Malformed payload array near position {pos}.")
+                self._pos, self._state = pos + 1, _ITEM
+            else:
+                value, end = self._decode_value(buf, pos)
+                if end is None:
+                    return
+                self._pos, self._state = end, _ITEM_SEP
+                yield value, end - pos
+
+    def _decode_value(self, buf: str, pos: int) -> Tuple[Any, Optional[int]]:
+        """Decodes the value at `pos` once it is complete, or returns (None, None) if it is not yet."""
+        if buf[pos] not in '{["':
+            # Số / literal: ngắn, giải mã thẳng.
+            return self._decode(buf, pos)
+        if self._scan is None:
+            # Trường hợp thường gặp: giá trị đã nằm trọn trong bộ đệm.
+            try:
+                return self._decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if self._final:
+                    raise
+        end = self._value_end(buf, pos)
+        if end is None:
+            if self._final:
+                raise ValueError("Response body ended before the JSON object was complete.")
+            return None, None
+        return self._decoder.raw_decode(buf, pos)
+
+    def _value_end(self, buf: str, pos: int) -> Optional[int]:
+        """End of the object, array or string starting at `pos`, scanning on from the last call."""
+        if self._scan is None:
+            offset, depth, in_string = 1, (0 if buf[pos] == '"' else 1), buf[pos] == '"'
+        else:
+            offset, depth, in_string = self._scan
+        i = pos + offset
+        while True:
+            m = (_STRING_SPECIAL if in_string else _STRUCTURAL).search(buf, i)
+            if m is None:
+                # Phần còn lại của bộ đệm không có ký tự cấu trúc: lần sau dò tiếp từ cuối bộ đệm.
+                self._scan = (len(buf) - pos, depth, in_string)
+                return None
+            ch, i = m.group(), m.end()
+            if in_string:
+                if ch == "\\":
+                    # Bỏ qua ký tự được escape (có thể nằm ở đoạn dữ liệu sau).
+                    i += 1
+                    if i > len(buf):
+                        self._scan = (i - pos, depth, in_string)
+                        return None
+                    continue
+                in_string = False
+            elif ch == '"':
+                in_string = True
+                continue
+            elif ch in "{[":
+                depth += 1
+                continue
+            else:
+                depth -= 1
+            if depth == 0:
+                self._scan = None
+                return i
+
+    def _decode(self, buf: str, pos: int) -> Tuple[Any, Optional[int]]:
+        """Decodes one JSON value at `pos`, or returns (None, None) if it is not complete yet."""
+        try:
+            value, end = self._decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if self._final:
+                raise
+            return None, None
+        if end == len(buf) and not self._final and buf[end - 1] not in '"}]':
+            # Số (hoặc literal) ở cuối bộ đệm có thể còn tiếp trong đoạn dữ liệu sau.
+            return None, None
+        return value, end
+
+
+async def read_payload(
+    chunks: AsyncIterator[bytes], limits: Optional[PayloadLimits] = None
+) -> Tuple[bool, Any, Dict[str, Any]]:
+    """
+    Streams a response body and returns (has_payload, payload, other top-level fields).
+    A list payload is returned as a list, or as a truncated `StreamedPayload` when a cap
+    stopped the read while more records followed. A record that would overflow `max_size`
+    is not kept (unless it is the first): only records that fit the budget are held in memory.
+    Raises ValueError on malformed JSON.
+    """
+    limits = limits or PayloadLimits()
+    chunks = chunks.__aiter__()
+    try:
+        return await _read(chunks, limits)
+    finally:
+        # Dừng sớm: đóng async generator ngay thay vì để event loop dọn sau.
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+async def _read(chunks: AsyncIterator[bytes], limits: PayloadLimits) -> Tuple[bool, Any, Dict[str, Any]]:
+    parser = PayloadStreamParser()
+    records = []
+    size = 0
+    capped = dropped = False
+    while not capped:
+        try:
+            parser.feed(await chunks.__anext__())
+        except StopAsyncIteration:
+            parser.feed(b"", final=True)
+        for record, _ in parser.records():
+            record = filter_fields(record, limits.keep_fields)
+            if not parser.payload_is_list:
+                return True, record, parser.fields
+            if limits.max_size:
+                size += limits.measure(record)
+                if size > limits.max_size and records:
+                    # Bản ghi vượt ngân sách sẽ không được hiển thị: không giữ trong bộ nhớ.
+                    capped = dropped = True
+                    break
+            records.append(record)
+            if (limits.max_records and len(records) >= limits.max_records) or (limits.max_size and size > limits.max_size):
+                capped = True
+                break
+        if parser.done:
+            break
+
+    if not capped:
+        return parser.has_payload, records, parser.fields
+    if dropped:
+        return True, StreamedPayload(records, truncated=True), parser.fields
+    more = parser.more_records()
+    while more is None and not parser.done:
+        # Chỉ đọc thêm đến khi biết còn bản ghi nào sau điểm dừng hay không.
+        try:
+            parser.feed(await chunks.__anext__())
+        except StopAsyncIteration:
+            parser.feed(b"", final=True)
+            more = parser.more_records()
+            break
+        more = parser.more_records()
+    if not more:
+        return True, records, parser.fields
+    return True, StreamedPayload(records, truncated=True), parser.fields
@@ -1,35 +1,429 @@
-import requests
+import asyncio
 import json
+from typing import Any, List, Optional, Tuple
 from urllib.parse import parse_qs
+import httpx
 from pydantic import BaseModel, Field
 
-# Bạn có thể cần một file config nhỏ ở đây hoặc đọc trực tiếp từ env
-CONFERENCE_API_URL = "https://confhub.ddns.net/database/api/v1/conference"
+import logging
+log = logging.getLogger(__name__)
+
+from app.config import (
+    BATCH_MAX_CONCURRENCY,
+    BATCH_MAX_QUERIES,
+    CACHE_MAX_ENTRIES,
+    CACHE_TTL_SECONDS,
+    CACHE_STALE_TTL_SECONDS,
+    CACHE_DB_PATH,
+    LOCAL_INDEX_ENABLED,
+    LOCAL_INDEX_SNAPSHOT_PATH,
+    LOCAL_INDEX_EMBEDDING_MODEL,
+    LOCAL_INDEX_LEARN_FROM_UPSTREAM,
+    LOCAL_INDEX_AUTOSAVE_SECONDS,
+    LOCAL_INDEX_MAX_RESULTS,
+    PROJECTION_ENABLED,
+    PROJECTION_FORMAT,
+    PROJECTION_MAX_TEXT_CHARS,
+    PROJECTION_TOKEN_BUDGET,
+    CONFERENCE_API_STREAM_MAX_RECORDS,
+    PREFETCH_ENABLED,
+    PREFETCH_MAX_CONCURRENCY,
+    PREFETCH_MAX_ENTRIES,
+    PREFETCH_TTL_SECONDS,
+    PREFETCH_DISABLED_SHAPES,
+    PREFETCH_MIN_SAMPLES,
+    PREFETCH_MIN_HIT_RATE,
+)
+from app.http_client import UpstreamDeadlineExceeded, UpstreamError, get_api_client
+from app.metrics import CACHE_LOOKUPS
+from app.resilience import CLOSED, CircuitOpenError
+from app.response_cache import ResponseCache, canonical_query_key, EXPIRED, STALE
+from app.projection import FIELD_WHITELISTS, budget_chars, query_mode, render_payload, rendered_size
+from app.singleflight import SingleFlight
+from app.prefetch import PagePrefetcher
+from app.search.conference_index import ConferenceIndex
+from app.search.embeddings import LocalEmbedder
+from app.search.record_store import ConferenceRecordStore
+from app.search.records import ID_FIELDS, RECORD_FIELDS, parse_limit, record_id
+from app.streaming import PayloadLimits, StreamedPayload, is_truncated
 
 class GetConferencesInput(BaseModel):
     """Input schema for the get_conferences tool."""
     searchQuery: str = Field(description="A URL-encoded query string to search for conferences. E.g., 'rank=B&country=Vietnam'")
 
-def get_conferences_from_api(searchQuery: str) -> str:
+
+# Cache kết quả từ API gốc, dùng chung cho mọi lần gọi tool trong tiến trình này.
+response_cache = ResponseCache(
+    max_entries=CACHE_MAX_ENTRIES,
+    ttl_seconds=CACHE_TTL_SECONDS,
+    stale_ttl_seconds=CACHE_STALE_TTL_SECONDS,
+    db_path=CACHE_DB_PATH,
+)
+
+# Chỉ mục cục bộ (BM25 + vector) phục vụ tool 'search_conferences_local'.
+local_index = ConferenceIndex(
+    snapshot_path=LOCAL_INDEX_SNAPSHOT_PATH,
+    embedder=LocalEmbedder(LOCAL_INDEX_EMBEDDING_MODEL),
+    autosave_seconds=LOCAL_INDEX_AUTOSAVE_SECONDS,
+)
+
+# Kho cột gọn nhẹ trên cùng snapshot, dùng để đếm/nhóm mà không dựng lại bản ghi.
+record_store = ConferenceRecordStore(snapshot_path=LOCAL_INDEX_SNAPSHOT_PATH)
+
+# Các lần gọi đồng thời với cùng searchQuery (đã chuẩn hóa) dùng chung một lần gọi upstream.
+upstream_flights = SingleFlight("upstream")
+
+# Trang kế tiếp của các tìm kiếm có phân trang, lấy trước ở nền cho câu hỏi "find 5 more".
+page_prefetcher = PagePrefetcher(
+    enabled=PREFETCH_ENABLED,
+    max_concurrency=PREFETCH_MAX_CONCURRENCY,
+    max_entries=PREFETCH_MAX_ENTRIES,
+    ttl_seconds=PREFETCH_TTL_SECONDS,
+    min_samples=PREFETCH_MIN_SAMPLES,
+    min_hit_rate=PREFETCH_MIN_HIT_RATE,
+    disabled_shapes=PREFETCH_DISABLED_SHAPES,
+)
+
+# Các task làm mới nền (stale-while-revalidate), giữ tham chiếu để task không bị GC.
+_revalidation_tasks: dict = {}
+
+
+def _payload_limits(searchQuery: str) -> Optional[PayloadLimits]:
     """
-    The core logic to fetch conference data from the external API.
-    This function is what the MCP tool will wrap.
+    What to keep while streaming the payload of a query: the fields projection shows plus
+    those used for ids and the local index, and no more records than the token budget can
+    show (the record past the budget is dropped and the page marked truncated, so the
+    omitted note gives a lower bound).
+    """
+    if not PROJECTION_ENABLED:
+        # Không rút gọn kết quả: trả về payload nguyên vẹn.
+        return None
+    mode = query_mode(parse_qs(searchQuery))
+    keep_fields = FIELD_WHITELISTS[mode] + ID_FIELDS
+    if LOCAL_INDEX_ENABLED and LOCAL_INDEX_LEARN_FROM_UPSTREAM:
+        keep_fields += RECORD_FIELDS
+    max_size = budget_chars(PROJECTION_TOKEN_BUDGET, PROJECTION_FORMAT) if PROJECTION_TOKEN_BUDGET > 0 else 0
+    return PayloadLimits(
+        keep_fields=keep_fields,
+        max_records=CONFERENCE_API_STREAM_MAX_RECORDS,
+        max_size=max_size,
+        measure=lambda record: rendered_size(record, mode, PROJECTION_FORMAT, PROJECTION_MAX_TEXT_CHARS),
+    )
+
+
+async def _fetch_payload(searchQuery: str):
+    """
+    Fetches and returns the 'payload' for a query, read within `_payload_limits`. Raises on any failure.
+    Uses the client's default timeouts: the fetch may be shared by callers with different deadlines.
+    """
+    payload = await get_api_client().fetch_payload(parse_qs(searchQuery), limits=_payload_limits(searchQuery))
+    if LOCAL_INDEX_ENABLED and LOCAL_INDEX_LEARN_FROM_UPSTREAM and isinstance(payload, list) and payload:
+        # Cập nhật chỉ mục cục bộ ở nền; embedding tốn CPU nên chạy ngoài event loop.
+        _schedule_index_update(payload)
+    return payload
+
+
+_index_update_tasks: set = set()
+
+PREFETCHED = "prefetched"
+
+EXPIRED_FALLBACK_NOTE = (
+    "(Note: the conference API is unavailable right now, so these are older cached results; "
+    "they may be out of date.)"
+)
+
+
+def _schedule_index_update(records: list) -> None:
+    async def update():
+        try:
+            await asyncio.to_thread(record_store.ensure_loaded)
+            await asyncio.to_thread(record_store.upsert_many, records)
+            await asyncio.to_thread(local_index.ensure_loaded)
+            await asyncio.to_thread(local_index.upsert_many, records)
+        except Exception as e:
+            log.warning(f"Failed to update local conference index: {e}")
+    task = asyncio.create_task(update())
+    _index_update_tasks.add(task)
+    task.add_done_callback(_index_update_tasks.discard)
+
+
+async def _fetch_and_store(cache_key: str, searchQuery: str, timeout_seconds: Optional[float] = None):
+    """
+    Fetches a query once for all concurrent callers and stores the result in the cache.
+    `timeout_seconds` bounds how long this caller waits, not the shared fetch: a caller that
+    joins with a longer budget is not failed by the leader's deadline, and a fetch that
+    outlives a caller keeps running (it is shielded) and still fills the cache.
     """
+    async def fetch():
+        payload = await _fetch_payload(searchQuery)
+        # SQLite chỉ lưu JSON thuần, sẽ mất dấu "đã cắt" của trang: chỉ giữ trong bộ nhớ.
+        response_cache.set(cache_key, payload, persist=not is_truncated(payload))
+        return payload
+    if timeout_seconds is None:
+        return await upstream_flights.do(cache_key, fetch)
+    try:
+        return await asyncio.wait_for(upstream_flights.do(cache_key, fetch), timeout_seconds)
+    except asyncio.TimeoutError:
+        raise UpstreamDeadlineExceeded(
+            f"Request deadline of {timeout_seconds:.1f}s exceeded while waiting for the upstream API."
+        )
+
+
+async def _revalidate(cache_key: str, searchQuery: str) -> None:
     try:
-        params_dict = parse_qs(searchQuery)
-        response = requests.get(CONFERENCE_API_URL, params=params_dict)
-        response.raise_for_status()
-        api_result = response.json()
+        await _fetch_and_store(cache_key, searchQuery)
+        log.info(f"Revalidated cached result for searchQuery: {searchQuery}")
+    except Exception as e:
+        log.warning(f"Background revalidation failed for searchQuery '{searchQuery}': {e}")
+    finally:
+        _revalidation_tasks.pop(cache_key, None)
+
+
+def _schedule_revalidation(cache_key: str, searchQuery: str) -> None:
+    if cache_key in _revalidation_tasks:
+        return
+    _revalidation_tasks[cache_key] = asyncio.create_task(_revalidate(cache_key, searchQuery))
+
 
-        if "payload" in api_result and api_result["payload"]:
+def _format_payload(
+    payload, searchQuery: str, token_budget: int = PROJECTION_TOKEN_BUDGET, note: Optional[str] = None
+) -> Tuple[str, int]:
+    """Returns the agent-facing text for a payload and how many of its records were omitted from it."""
+    omitted = 0
+    if payload:
+        if not PROJECTION_ENABLED:
             # Trả về chuỗi JSON để agent có thể xử lý
-            return json.dumps(api_result["payload"])
-        elif "payload" in api_result and not api_result["payload"]:
-            return "No conferences found matching the criteria."
+            text = json.dumps(payload)
         else:
-            return f"Error from API: {api_result.get('errorMessage', 'Unknown error')}"
+            # Cache giữ payload gốc; chỉ kết quả trả cho agent được rút gọn.
+            text, _, omitted = render_payload(
+                payload,
+                mode=query_mode(parse_qs(searchQuery)),
+                output_format=PROJECTION_FORMAT,
+                max_text_chars=PROJECTION_MAX_TEXT_CHARS,
+                token_budget=token_budget,
+            )
+    else:
+        text = "No conferences found matching the criteria."
+    return (f"{text}\n{note}" if note else text), omitted
 
-    except requests.exceptions.RequestException as e:
+
+def _error_text(e: Exception) -> str:
+    if isinstance(e, CircuitOpenError):
+        # Kết quả có cấu trúc, ngắn gọn: agent báo lại cho người dùng thay vì thử lại nhiều lần.
+        return (
+            f"Error: UPSTREAM_UNAVAILABLE: The conference database is temporarily unavailable "
+            f"(retry after ~{e.retry_after_seconds:.0f}s). Tell the user that conference search "
+            f"is down right now instead of retrying."
+        )
+    if isinstance(e, UpstreamError):
+        return f"Error from API: {e}"
+    if isinstance(e, httpx.HTTPError):
         return f"Error: Network error while fetching conferences: {e}"
+    return f"Error: An unexpected error occurred: {e}"
+
+
+async def _prefetch_fetch(cache_key: str, searchQuery: str):
+    # Cùng nhóm single-flight với lần gọi thường: câu hỏi nối tiếp đến sớm sẽ nhập vào lần prefetch.
+    return await upstream_flights.do(cache_key, lambda: _fetch_payload(searchQuery))
+
+
+def _upstream_unavailable(e: Exception) -> bool:
+    """True for failures that say nothing about the query itself: the API is down, slow or rejected by the breaker."""
+    if isinstance(e, UpstreamError):
+        return isinstance(e, UpstreamDeadlineExceeded)
+    return isinstance(e, (CircuitOpenError, httpx.HTTPError))
+
+
+async def _get_payload(searchQuery: str, timeout_seconds: Optional[float] = None) -> Tuple[Any, Optional[str]]:
+    """
+    Returns (payload, note) for a query from the cache, a prefetched page or the upstream API,
+    and starts prefetching the next page when this one was full. When the API is unavailable
+    and an expired cache entry exists, that entry is returned with a note saying it may be
+    out of date. Raises on any other failure.
+    """
+    cache_key = canonical_query_key(searchQuery)
+    cached, state = response_cache.get(cache_key, allow_expired=True)
+    expired = None
+    if state == EXPIRED:
+        expired, cached, state = cached, None, None
+    if state is None:
+        cached = await page_prefetcher.take(cache_key, timeout_seconds)
+        if cached is not None:
+            state = PREFETCHED
+            response_cache.set(cache_key, cached, persist=not is_truncated(cached))
+    CACHE_LOOKUPS.labels(state or "miss").inc()
+    if state is not None:
+        if state == STALE:
+            _schedule_revalidation(cache_key, searchQuery)
+        payload = cached
+    else:
+        try:
+            payload = await _fetch_and_store(cache_key, searchQuery, timeout_seconds)
+        except Exception as e:
+            if expired is None or not _upstream_unavailable(e):
+                raise
+            log.warning(f"Upstream unavailable ({e}); serving expired cached result for searchQuery: {searchQuery}")
+            CACHE_LOOKUPS.labels("expired_fallback").inc()
+            return expired, EXPIRED_FALLBACK_NOTE
+    if get_api_client().breaker.state == CLOSED:
+        # Mạch mở hoặc đang thăm dò: không tốn lượt gọi upstream cho việc đoán trước.
+        page_prefetcher.maybe_prefetch(searchQuery, payload, response_cache.contains, _prefetch_fetch)
+    return payload, None
+
+
+async def get_conferences_from_api(searchQuery: str, timeout_seconds: Optional[float] = None) -> str:
+    """
+    The core logic to fetch conference data from the external API.
+    This function is what the MCP tool will wrap.
+
+    Results are cached by canonicalized query; stale entries are returned
+    immediately while a background refresh brings them up to date. Concurrent
+    misses for the same canonical query share a single upstream fetch.
+    `timeout_seconds` is the caller's remaining time budget for the upstream fetch.
+    """
+    try:
+        payload, note = await _get_payload(searchQuery, timeout_seconds)
+        return _format_payload(payload, searchQuery, note=note)[0]
+    except Exception as e:
+        return _error_text(e)
+
+
+async def get_conferences_batch_from_api(searchQueries: List[str], timeout_seconds: Optional[float] = None) -> str:
+    """
+    Runs several get_conferences searches concurrently (at most BATCH_MAX_CONCURRENCY at
+    a time) and returns one result with a labeled section per searchQuery.
+
+    Identical queries (after canonicalization) are fetched once. A conference matched
+    by more than one search is listed only in the first section and named in the later
+    ones. The projection token budget is shared between the sections, and a failed
+    search only turns its own section into an error.
+    """
+    queries: List[str] = []
+    seen_keys = set()
+    for searchQuery in searchQueries:
+        key = canonical_query_key(searchQuery)
+        if searchQuery.strip() and key not in seen_keys:
+            seen_keys.add(key)
+            queries.append(searchQuery)
+    skipped = queries[BATCH_MAX_QUERIES:]
+    queries = queries[:BATCH_MAX_QUERIES]
+    if not queries:
+        return "Error: No searchQuery given."
+
+    semaphore = asyncio.Semaphore(max(1, BATCH_MAX_CONCURRENCY))
+
+    async def fetch(searchQuery: str) -> Tuple[Any, Optional[str], Optional[Exception]]:
+        async with semaphore:
+            try:
+                return (*await _get_payload(searchQuery, timeout_seconds), None)
+            except Exception as e:
+                return None, None, e
+
+    results = await asyncio.gather(*(fetch(q) for q in queries))
+
+    token_budget = PROJECTION_TOKEN_BUDGET // len(queries) if PROJECTION_TOKEN_BUDGET > 0 else 0
+    shown = {}
+    sections = []
+    for i, (searchQuery, (payload, note, error)) in enumerate(zip(queries, results), start=1):
+        label = f"## Search {i}: {searchQuery}"
+        if error is not None:
+            sections.append(f"{label}\n{_error_text(error)}")
+            continue
+        records = payload if isinstance(payload, list) else ([payload] if payload else [])
+        fresh, repeated = [], []
+        for record in records:
+            rid = record_id(record) if isinstance(record, dict) else json.dumps(record, sort_keys=True)
+            if rid in shown:
+                repeated.append((record, shown[rid]))
+            else:
+                shown[rid] = i
+                fresh.append((rid, record))
+        count = f"{len(records)}+" if is_truncated(payload) else str(len(records))
+        header = f"{label} ({count} conference(s))"
+        fresh_records = StreamedPayload((record for _, record in fresh), truncated=is_truncated(payload))
+        body, omitted = _format_payload(fresh_records, searchQuery, token_budget) if fresh else ("", 0)
+        for rid, _ in fresh[len(fresh) - omitted:] if omitted else []:
+            # Bị cắt bởi ngân sách token: một tìm kiếm sau vẫn được liệt kê bản ghi này.
+            del shown[rid]
+        if repeated:
+            names = ", ".join(
+                f"{(r.get('acronym') or r.get('title') or '?') if isinstance(r, dict) else '?'} (Search {first})"
+                for r, first in repeated
+            )
+            body = f"{body}\nAlso matched, listed above: {names}".strip()
+        body = body or _format_payload([], searchQuery)[0]
+        sections.append(f"{header}\n{body}\n{note}" if note else f"{header}\n{body}")
+
+    if skipped:
+        sections.append(f"(Skipped {len(skipped)} search(es) beyond the limit of {BATCH_MAX_QUERIES}: {', '.join(skipped)})")
+    return "\n\n".join(sections)
+
+
+async def search_conferences_in_index(query: str, filters: str, limit: int) -> str:
+    """
+    Answers filter + semantic queries from the local conference index, with no network
+    access. `filters` uses the same key=value syntax as the get_conferences searchQuery.
+    Results are projected like get_conferences output, followed by a note on how much of
+    the database the index covers.
+    """
+    if not LOCAL_INDEX_ENABLED:
+        return "Error: The local conference index is disabled."
+    try:
+        result = await asyncio.to_thread(
+            local_index.search,
+            query,
+            parse_qs(filters),
+            parse_limit(limit, default=5, maximum=LOCAL_INDEX_MAX_RESULTS),
+        )
+        indexed = local_index.stats()["records"]
+        if not result["results"]:
+            return (
+                f"No conferences found matching the criteria in the local index ({indexed} conference(s) indexed). "
+                f"The index is not the full conference database: use get_conferences to search it."
+            )
+        # Điểm xếp hạng chỉ dùng để sắp thứ tự, không có nghĩa với LLM.
+        records = [{k: v for k, v in record.items() if k != "_score"} for record in result["results"]]
+        if PROJECTION_ENABLED:
+            text, _, _ = render_payload(
+                records,
+                mode=query_mode(parse_qs(filters)),
+                output_format=PROJECTION_FORMAT,
+                max_text_chars=PROJECTION_MAX_TEXT_CHARS,
+                token_budget=PROJECTION_TOKEN_BUDGET,
+            )
+        else:
+            text = json.dumps(records)
+        return (
+            f"{text}\n(Local index: {len(records)} of {result['totalCandidates']} matching conference(s), out of "
+            f"{indexed} indexed from the snapshot and earlier searches; not the full conference database.)"
+        )
+    except Exception as e:
+        return f"Error: An unexpected error occurred while searching the local index: {e}"
+
+
+async def count_conferences_in_store(filters: str, groupBy: str, limit: int) -> str:
+    """
+    Counts (and optionally groups) locally known conferences matching `filters`,
+    using the columnar record store's facet indexes instead of the full payload.
+    The result carries a note that the counts cover only the indexed records, so they
+    are not mistaken for totals of the full conference database.
+    """
+    if not LOCAL_INDEX_ENABLED:
+        return "Error: The local conference index is disabled."
+    try:
+        result = await asyncio.to_thread(
+            record_store.count,
+            parse_qs(filters),
+            groupBy.strip(),
+            parse_limit(limit, default=20, maximum=LOCAL_INDEX_MAX_RESULTS),
+        )
+        result["note"] = (
+            f"Counts cover only the {result['indexedRecords']} conference(s) indexed from the snapshot and "
+            "earlier searches, not the full conference database. Use get_conferences for complete totals."
+        )
+        return json.dumps(result)
+    except ValueError as e:
+        return f"Error: {e}"
     except Exception as e:
-        return f"Error: An unexpected error occurred: {e}"
\ No newline at end of file
+        return f"Error: An unexpected error occurred while counting conferences: {e}"
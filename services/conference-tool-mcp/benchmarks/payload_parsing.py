@@ -0,0 +1,137 @@
+# services/conference-tool-mcp/benchmarks/payload_parsing.py
+"""
+Cost of turning one large upstream response body into get_conferences output.
+
+Compares the buffered path (parse the whole body with json.loads, then project and
+trim it) with the streaming path in app.streaming (parse the 'payload' array record
+by record, keep only the used fields, stop reading at the token budget), for time
+per call and peak Python memory (tracemalloc).
+
+Bodies are recorded API responses passed with --body (e.g. saved with
+`curl "$CONFERENCE_API_URL?perPage=500&mode=detail" > page.json`); without --body,
+pages of --records records are built from the recorded conferences in the ai-core
+benchmark fixture.
+
+Run from services/conference-tool-mcp:
+    python -m benchmarks.payload_parsing --records 100 500 --iterations 50
+"""
+import argparse
+import asyncio
+import copy
+import json
+import os
+import statistics
+import time
+import tracemalloc
+from typing import Any, AsyncIterator, Callable, Dict, List, Tuple
+
+from app.projection import FIELD_WHITELISTS, budget_chars, render_payload, rendered_size
+from app.search.records import ID_FIELDS
+from app.streaming import PayloadLimits, read_payload
+
+DEFAULT_FIXTURE = os.path.join(
+    os.path.dirname(__file__), "..", "..", "ai-core-py", "benchmarks", "fixtures", "conferences.json"
+)
+# Cỡ đoạn dữ liệu mà httpx thường trả về từ một lần đọc socket.
+CHUNK_BYTES = 16 * 1024
+
+
+def _fixture_body(path: str, records: int) -> bytes:
+    """A response body with `records` records, cycling through the recorded ones with unique ids."""
+    with open(path, encoding="utf-8") as f:
+        recorded = json.load(f)["payload"]
+    payload = []
+    for i in range(records):
+        record = copy.deepcopy(recorded[i % len(recorded)])
+        record["id"] = f"{record.get('id', 'record')}-{i}"
+        payload.append(record)
+    meta = {"totalItems": records, "curPage": 1, "perPage": records}
+    return json.dumps({"payload": payload, "meta": meta}).encode("utf-8")
+
+
+async def _chunks(body: bytes) -> AsyncIterator[bytes]:
+    for start in range(0, len(body), CHUNK_BYTES):
+        yield body[start:start + CHUNK_BYTES]
+
+
+def _buffered(body: bytes, mode: str, output_format: str, token_budget: int) -> str:
+    payload = json.loads(body)["payload"]
+    return render_payload(payload, mode, output_format, 400, token_budget)[0]
+
+
+async def _streamed(body: bytes, mode: str, output_format: str, token_budget: int, capped: bool) -> str:
+    limits = PayloadLimits(
+        keep_fields=FIELD_WHITELISTS[mode] + ID_FIELDS,
+        max_size=budget_chars(token_budget, output_format) if capped else 0,
+        measure=lambda record: rendered_size(record, mode, output_format, 400),
+    )
+    _, payload, _ = await read_payload(_chunks(body), limits)
+    return render_payload(payload, mode, output_format, 400, token_budget)[0]
+
+
+def _measure(run: Callable[[], Any], iterations: int) -> Tuple[List[float], int]:
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return timings, peak
+
+
+def _report(label: str, timings: List[float], peak: int) -> None:
+    ordered = sorted(timings)
+    p95 = ordered[max(0, int(len(ordered) * 0.95) - 1)]
+    print(
+        f"  {label:<28} mean {statistics.mean(timings) * 1000:8.2f} ms   p95 {p95 * 1000:8.2f} ms"
+        f"   peak {peak / 1024:9.1f} KiB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare buffered and streaming parsing of upstream payloads.")
+    parser.add_argument("--body", nargs="*", default=[], help="Recorded API response bodies (JSON files).")
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE)
+    parser.add_argument("--records", type=int, nargs="*", default=[100, 500])
+    parser.add_argument("--mode", choices=sorted(FIELD_WHITELISTS), default="detail")
+    parser.add_argument("--format", choices=["json", "table"], default="json")
+    parser.add_argument("--token-budget", type=int, default=3000)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    bodies: Dict[str, bytes] = {}
+    for path in args.body:
+        with open(path, "rb") as f:
+            bodies[os.path.basename(path)] = f.read()
+    if not bodies:
+        for records in args.records:
+            bodies[f"{records} records"] = _fixture_body(args.fixture, records)
+
+    loop = asyncio.new_event_loop()
+    paths = {
+        "buffered (json.loads)": lambda body: _buffered(body, args.mode, args.format, args.token_budget),
+        "streamed, no cap": lambda body: loop.run_until_complete(
+            _streamed(body, args.mode, args.format, args.token_budget, capped=False)
+        ),
+        "streamed, token-budget cap": lambda body: loop.run_until_complete(
+            _streamed(body, args.mode, args.format, args.token_budget, capped=True)
+        ),
+    }
+    print(f"mode={args.mode} format={args.format} token budget={args.token_budget}, {args.iterations} iterations")
+    for name, body in bodies.items():
+        print(f"{name} ({len(body) / 1024:,.0f} KiB body)")
+        outputs = set()
+        for label, path in paths.items():
+            # Khởi động: import lười và cache của regex không tính vào kết quả.
+            outputs.add(path(body).split("\n(")[0])
+            _report(label, *_measure(lambda: path(body), args.iterations))
+        if len(outputs) != 1:
+            print("  WARNING: the paths returned different records")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# services/conference-tool-mcp/benchmarks/prefetch_hits.py
+"""
+Whether "next page" follow-ups are answered from the prefetched page.
+
+For each first-page query, waits for the background prefetch of page 2, then sends the
+follow-up an agent would write (the same query with page=2, perPage only if the first
+query had it) and times it. A follow-up that misses the parked page costs a full
+upstream round trip (--api-delay-ms) and is reported.
+
+Runs against the stub conference API of the ai-core benchmarks. Run from
+services/conference-tool-mcp:
+    python -m benchmarks.prefetch_hits --api-delay-ms 300
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import List, Tuple
+
+AI_CORE_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "ai-core-py")
+
+# (truy vấn trang đầu, truy vấn nối tiếp tự nhiên của agent)
+FOLLOW_UPS: List[Tuple[str, str]] = [
+    ("rank=A%2A", "rank=A%2A&page=2"),
+    ("continent=Asia", "page=2&continent=Asia"),
+    ("topics=Artificial+Intelligence&perPage=2", "topics=Artificial+Intelligence&perPage=2&page=2"),
+]
+
+
+async def _run(delay_seconds: float) -> int:
+    from app.tool_logic import get_conferences_from_api, page_prefetcher
+
+    misses = 0
+    for first, follow_up in FOLLOW_UPS:
+        await get_conferences_from_api(first)
+        # Chờ prefetch trang 2 chạy xong ở nền.
+        await asyncio.sleep(delay_seconds * 2 + 0.1)
+        started = time.perf_counter()
+        await get_conferences_from_api(follow_up)
+        elapsed = time.perf_counter() - started
+        hit = elapsed < delay_seconds / 2
+        misses += not hit
+        print(f"  {follow_up:<52} {elapsed * 1000:8.1f} ms   {'prefetched' if hit else 'MISS'}")
+    print(f"prefetch stats: {page_prefetcher.stats()}")
+    return misses
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check that natural next-page follow-ups hit prefetched pages.")
+    parser.add_argument("--api-delay-ms", type=float, default=300)
+    args = parser.parse_args()
+
+    sys.path.insert(0, AI_CORE_DIR)
+    from benchmarks.stub_conference_api import StubConferenceAPI
+
+    delay_seconds = args.api_delay_ms / 1000
+    stub = StubConferenceAPI(delay_seconds=delay_seconds).start()
+    # Tắt cache phản hồi: trang 2 chỉ có thể nhanh nhờ prefetch.
+    os.environ.update(
+        CONFERENCE_API_URL=stub.url,
+        CONFERENCE_CACHE_TTL_SECONDS="0",
+        CONFERENCE_CACHE_STALE_TTL_SECONDS="0",
+        LOCAL_INDEX_ENABLED="false",
+        PREFETCH_ENABLED="true",
+        PREFETCH_MIN_SAMPLES="0",
+    )
+    try:
+        misses = asyncio.run(_run(delay_seconds))
+    finally:
+        stub.stop()
+    if misses:
+        print(f"WARNING: {misses} follow-up(s) missed the prefetched page")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()